@@ -11,9 +11,45 @@
 .PARAMETER Execute
     Run installation immediately
 .PARAMETER DryRun
-    Simulate installation
+    Show the install plan without making changes (cannot be combined with -Execute)
+.PARAMETER Format
+    Output format of the -DryRun plan: text or json
 .PARAMETER NoGui
     Run in CLI mode
+.PARAMETER Jobs
+    Number of modules to install in parallel
+.PARAMETER Prefetch
+    Number of winget packages to download concurrently ahead of installing them
+.PARAMETER Force
+    Reinstall modules the install journal records as completed
+.PARAMETER InProcess
+    Run install.py of modules marked "inProcess" inside the setup process
+.PARAMETER ExportBundle
+    Write the resolved plan with its scripts and installers to an offline bundle (.zip)
+.PARAMETER FromBundle
+    Install from an offline bundle made with -ExportBundle
+.PARAMETER Status
+    Show what is installed, and which version, then exit
+.PARAMETER Cache
+    Installer cache command: stats or prune
+.PARAMETER RebuildIndex
+    Rescan modules/ instead of using the cached catalog index
+.PARAMETER LogLevel
+    Minimum log level: debug, info, success, warn or error
+.PARAMETER LogFormat
+    Console output format: text or json
+.PARAMETER LogDir
+    Directory for run.jsonl and per-module log files
+.PARAMETER Trace
+    Write install timings to this file in Chrome trace format
+.PARAMETER ProfileStartup
+    Report time spent in each startup phase
+.PARAMETER Record
+    Record every external command (command, exit code, output, duration) to this JSONL file
+.PARAMETER Replay
+    Serve external commands from a -Record file instead of running them
+.PARAMETER ReplayScale
+    Multiply replayed durations by this factor (0: no waiting)
 .EXAMPLE
     .\omss.ps1
 .EXAMPLE
@@ -27,7 +63,29 @@ param(
     [string]$Modules,
     [switch]$Execute,
     [switch]$DryRun,
-    [switch]$NoGui
+    [ValidateSet("text", "json")]
+    [string]$Format,
+    [switch]$NoGui,
+    [int]$Jobs,
+    [int]$Prefetch,
+    [switch]$Force,
+    [switch]$InProcess,
+    [string]$ExportBundle,
+    [string]$FromBundle,
+    [switch]$Status,
+    [ValidateSet("stats", "prune")]
+    [string]$Cache,
+    [switch]$RebuildIndex,
+    [ValidateSet("debug", "info", "success", "warn", "error")]
+    [string]$LogLevel,
+    [ValidateSet("text", "json")]
+    [string]$LogFormat,
+    [string]$LogDir,
+    [string]$Trace,
+    [switch]$ProfileStartup,
+    [string]$Record,
+    [string]$Replay,
+    [double]$ReplayScale
 )
 
 $ScriptDir = Split-Path -Parent $MyInvocation.MyCommand.Path
@@ -61,10 +119,95 @@ if ($DryRun) {
     $args += "--dry-run"
 }
 
+if ($Format) {
+    $args += "--format"
+    $args += $Format
+}
+
 if ($NoGui) {
     $args += "--no-gui"
 }
 
+if ($Jobs) {
+    $args += "--jobs"
+    $args += $Jobs
+}
+
+if ($Prefetch) {
+    $args += "--prefetch"
+    $args += $Prefetch
+}
+
+if ($Force) {
+    $args += "--force"
+}
+
+if ($InProcess) {
+    $args += "--in-process"
+}
+
+if ($ExportBundle) {
+    $args += "--export-bundle"
+    $args += $ExportBundle
+}
+
+if ($FromBundle) {
+    $args += "--from-bundle"
+    $args += $FromBundle
+}
+
+if ($Status) {
+    $args += "--status"
+}
+
+if ($Cache) {
+    $args += "--cache"
+    $args += $Cache
+}
+
+if ($RebuildIndex) {
+    $args += "--rebuild-index"
+}
+
+if ($LogLevel) {
+    $args += "--log-level"
+    $args += $LogLevel
+}
+
+if ($LogFormat) {
+    $args += "--log-format"
+    $args += $LogFormat
+}
+
+if ($LogDir) {
+    $args += "--log-dir"
+    $args += $LogDir
+}
+
+if ($Trace) {
+    $args += "--trace"
+    $args += $Trace
+}
+
+if ($ProfileStartup) {
+    $args += "--profile-startup"
+}
+
+if ($Record) {
+    $args += "--record"
+    $args += $Record
+}
+
+if ($Replay) {
+    $args += "--replay"
+    $args += $Replay
+}
+
+if ($PSBoundParameters.ContainsKey("ReplayScale")) {
+    $args += "--replay-scale"
+    $args += $ReplayScale
+}
+
 # Run setup
 Set-Location $ScriptDir
 if ($args.Count -gt 0) {
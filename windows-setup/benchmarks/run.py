@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for catalog loading, dependency resolution, presets and the TUI.
+
+Generates synthetic catalogs (see synthetic.py), times each operation and
+writes the medians to a JSON file. With --compare, results are checked
+against an earlier file and the run fails if anything got slower than
+the threshold allows.
+
+    python benchmarks/run.py --out bench.json
+    python benchmarks/run.py --compare bench.json --threshold 0.2
+"""
+
+import sys
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import argparse
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).parent.resolve()
+WINDOWS_SETUP_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(WINDOWS_SETUP_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+import synthetic
+from core import logger
+from core.module import ModuleManager
+
+DEFAULT_SIZES = (100, 1000, 10000)
+# Differences below this are timer noise, whatever the ratio
+NOISE_FLOOR = 0.002
+
+def measure(fn, repeat):
+    """Median seconds of repeat calls to fn"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def bench_manager(root, repeat):
+    results = {}
+
+    def cold():
+        ModuleManager(root, rebuild_index=True)
+    results["manager_init_cold"] = measure(cold, repeat)
+    # Leaves a fresh catalog index behind for the warm runs
+    ModuleManager(root)
+    results["manager_init_warm"] = measure(lambda: ModuleManager(root), repeat)
+
+    manager = ModuleManager(root)
+    presets = sorted((Path(root) / "presets").glob("*.json"))
+
+    def load_all():
+        manager.load_preset(presets[0])
+        for preset in presets[1:]:
+            manager.load_preset(preset, clear_selection=False)
+    results["load_preset"] = measure(load_all, repeat) / len(presets)
+    load_all()
+    results["resolve_dependencies"] = measure(manager.resolve_dependencies, repeat)
+
+    samples = []
+    for _ in range(repeat):
+        load_all()
+        started = time.perf_counter()
+        for preset in presets:
+            manager.unload_preset(preset)
+        samples.append(time.perf_counter() - started)
+    results["unload_preset"] = statistics.median(samples) / len(presets)
+
+    manager.search_index = None
+    results["search_index_build"] = measure(lambda: (setattr(manager, "search_index", None), manager.search("python")), repeat)
+    results["search_query"] = measure(lambda: manager.search("python tools"), repeat)
+    return results
+
+async def _bench_tui(root, repeat):
+    from core.tui import SetupApp, ModuleTree
+    results = {}
+    manager = ModuleManager(root)
+    app = SetupApp(manager)
+    async with app.run_test(size=(160, 50)) as pilot:
+        tree = app.query_one(ModuleTree)
+        await pilot.pause()
+
+        async def timed(action):
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                action()
+                # Let Textual process the resulting messages and repaint
+                await pilot.pause()
+                samples.append(time.perf_counter() - started)
+            return statistics.median(samples)
+
+        results["tui_rebuild"] = await timed(lambda: tree.rebuild_tree(""))
+        results["tui_search"] = await timed(lambda: tree.rebuild_tree("python tools"))
+        tree.rebuild_tree("")
+        await pilot.pause()
+
+        # Toggle a module leaf through the key binding, as a user would
+        key = next(k for k in tree.key_nodes if not k.startswith("preset:"))
+        tree.focus()
+        tree.move_cursor(tree.key_nodes[key][0])
+        await pilot.pause()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await pilot.press("space")
+            samples.append(time.perf_counter() - started)
+        results["tui_toggle"] = statistics.median(samples)
+
+        key = next(k for k in tree.key_nodes if k.startswith("preset:"))
+        tree.move_cursor(tree.key_nodes[key][0])
+        await pilot.pause()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await pilot.press("space")
+            samples.append(time.perf_counter() - started)
+        results["tui_toggle_preset"] = statistics.median(samples)
+    return results
+
+def bench_tui(root, repeat):
+    import importlib.util
+    if importlib.util.find_spec("textual") is None:
+        logger.warn("textual is not installed; skipping TUI benchmarks")
+        return {}
+    return asyncio.run(_bench_tui(root, repeat))
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=WINDOWS_SETUP_DIR,
+                                capture_output=True, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline, threshold):
+    """Print the change per benchmark; returns the regressions as (size, name, old, new)"""
+    regressions = []
+    print(f"\n{logger.BOLD}Compared with {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%}){logger.RESET}")
+    for size, benches in results["results"].items():
+        old_benches = baseline.get("results", {}).get(size, {})
+        for name, new in benches.items():
+            old = old_benches.get(name)
+            if old is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            regressed = change > threshold and new - old > NOISE_FLOOR
+            mark = f"{logger.RED}✘{logger.RESET}" if regressed else " "
+            print(f"  {mark} {size:>6} {name:<22} {old * 1000:9.2f} ms -> {new * 1000:9.2f} ms  {change:+7.1%}")
+            if regressed:
+                regressions.append((size, name, old, new))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark catalog, preset and TUI operations on synthetic catalogs")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated module counts (default: 100,1000,10000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark; the median is reported")
+    parser.add_argument("--out", help="Write results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare with a JSON file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown against the baseline before failing (default: 0.2 = 20%%)")
+    parser.add_argument("--no-tui", action="store_true", help="Skip the Textual benchmarks")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": {},
+    }
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        root = tempfile.mkdtemp(prefix=f"omss-bench-{size}-")
+        try:
+            synthetic.generate(root, size)
+            benches = bench_manager(root, args.repeat)
+            if not args.no_tui:
+                benches.update(bench_tui(root, args.repeat))
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        results["results"][str(size)] = benches
+        print(f"\n{logger.BOLD}{size} modules{logger.RESET}")
+        for name, seconds in benches.items():
+            print(f"  {name:<22} {seconds * 1000:9.2f} ms")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        logger.success(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            logger.error(f"{len(regressions)} benchmarks slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+        logger.success("No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Synthetic module catalogs for the benchmarks: a windows-setup style tree
+(modules/, config/, presets/) with a given number of modules, generated
+deterministically from a seed so runs on different commits compare alike.
+"""
+
+import json
+import random
+from pathlib import Path
+
+CATEGORIES = 10
+SUBCATEGORIES = 3
+PRESETS = 8
+WORDS = ("git", "node", "python", "java", "docker", "terminal", "shell", "font", "editor", "browser",
+         "database", "cloud", "rust", "go", "dotnet", "kotlin", "tools", "sdk", "cli", "runtime")
+
+def generate(root, count, seed=1):
+    """Write a catalog of count modules under root; returns the list of module ids"""
+    rng = random.Random(seed)
+    root = Path(root)
+    (root / "config").mkdir(parents=True, exist_ok=True)
+    (root / "presets").mkdir(parents=True, exist_ok=True)
+
+    categories = {}
+    for c in range(CATEGORIES):
+        categories[f"cat{c}"] = {"name": f"Category {c}", "order": c, "modules": []}
+    (root / "config" / "categories.json").write_text(json.dumps(categories), encoding="utf-8")
+
+    ids = []
+    variant_ids = {}
+    for i in range(count):
+        cat = f"cat{i % CATEGORIES}"
+        # Half of the modules sit in a subcategory
+        category = f"{cat}/sub{i % SUBCATEGORIES}" if i % 2 else cat
+        mod_id = f"{cat}.mod{i}"
+        words = rng.sample(WORDS, 3)
+        meta = {
+            "id": mod_id,
+            "name": f"{words[0].capitalize()} {words[1]} {i}",
+            "category": category,
+            "description": f"Synthetic {words[0]} {words[1]} {words[2]} module",
+            # Dependencies only point backwards, so the graph stays acyclic
+            "requires": rng.sample(ids, min(len(ids), rng.randint(0, 3))),
+            "installMethod": "winget",
+            "wingetId": f"Synthetic.{words[0].capitalize()}{i}",
+        }
+        if i % 20 == 0:
+            meta["variants"] = {v: {"wingetId": f"Synthetic.{i}.{v}"} for v in ("1", "2")}
+            variant_ids[mod_id] = list(meta["variants"])
+        path = root / "modules" / category / f"mod{i}"
+        path.mkdir(parents=True, exist_ok=True)
+        (path / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        ids.append(mod_id)
+
+    # Presets each select about 5% of the catalog
+    size = max(1, count // 20)
+    for p in range(PRESETS):
+        entries = []
+        for mod_id in rng.sample(ids, size):
+            if mod_id in variant_ids:
+                entries.append({"id": mod_id, "params": {"version": rng.choice(variant_ids[mod_id])}})
+            else:
+                entries.append({"id": mod_id})
+        preset = {"name": f"Preset {p}", "description": "Synthetic preset", "modules": entries}
+        (root / "presets" / f"preset{p}.json").write_text(json.dumps(preset, indent=2), encoding="utf-8")
+    return ids
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import shutil
+import zipfile
+import tempfile
+from pathlib import Path
+from core import logger, package_manager, cache
+
+BUNDLE_FORMAT = 2
+MANIFEST = "manifest.json"
+# Config the module scripts read at install time; the catalog index is rebuilt on the target
+CONFIG_FILES = ("settings.json", "dev-drive.json", "categories.json")
+
+def _add_file(archive, files, path, arcname, compress=True):
+    archive.write(path, arcname, compress_type=zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED)
+    files[arcname] = cache.file_sha256(path)
+
+def _add_tree(archive, files, root, prefix):
+    for path in sorted(Path(root).rglob("*")):
+        if path.is_file() and "__pycache__" not in path.parts:
+            _add_file(archive, files, path, f"{prefix}/{path.relative_to(root).as_posix()}")
+
+def _online(manifest, name, reason):
+    if name not in manifest["online"]:
+        logger.warn(f"{name} will need network access to install: {reason}")
+        manifest["online"][name] = reason
+
+def export_bundle(manager, plan, out_path, concurrency=4):
+    """
+    Write a zip with everything needed to install plan without network access:
+    core/ and the planned module scripts, every winget installer (via
+    `winget download`) and each module's downloadUrl artifact, plus a
+    manifest with SHA-256 checksums for all of it. What still needs the
+    network at install time (PowerShell Gallery modules, downloads declared
+    by "network" in meta.json, winget packages without a silent installer)
+    is reported and listed under "online" in the manifest.
+    """
+    out_path = Path(out_path)
+    if out_path.suffix.lower() != ".zip":
+        out_path = out_path.with_name(out_path.name + ".zip")
+    root_dir = manager.root_dir
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "selected": sorted(manager.selected),
+        "plan": list(plan),
+        "winget": {},
+        "artifacts": [],
+        # name -> why installing it still needs network access
+        "online": {},
+        "files": {},
+    }
+    files = manifest["files"]
+
+    logger.section(f"Exporting bundle: {out_path.name}")
+    package_ids = manager.winget_packages(plan, skip_installed=False)
+    if package_ids:
+        package_manager.refresh_winget_sources()
+    prefetcher = package_manager.WingetPrefetcher(package_ids, concurrency) if package_ids else None
+    tmp_dir = tempfile.mkdtemp(prefix="omss-export-")
+    tmp_file = out_path.with_name(out_path.name + ".tmp")
+    try:
+        with zipfile.ZipFile(tmp_file, "w") as archive:
+            _add_tree(archive, files, root_dir / "core", "core")
+            for name in CONFIG_FILES:
+                if (root_dir / "config" / name).exists():
+                    _add_file(archive, files, root_dir / "config" / name, f"config/{name}")
+
+            for mod_id in dict.fromkeys(item.split(":", 1)[0] for item in plan):
+                mod = manager.get_module(mod_id)
+                if not mod:
+                    continue
+                rel = mod.path.relative_to(manager.modules_dir).as_posix()
+                _add_tree(archive, files, mod.path, f"modules/{rel}")
+
+                for item in plan:
+                    if item.split(":", 1)[0] != mod_id:
+                        continue
+                    ps_module = mod.ps_module_package(item.partition(":")[2] or None)
+                    if ps_module:
+                        _online(manifest, mod.id, f"PowerShell Gallery module {ps_module}")
+                if mod.network:
+                    _online(manifest, mod.id, mod.network)
+
+                if mod.download_url:
+                    path = cache.get_cache().fetch(mod.id, "latest", mod.download_url, os.path.join(tmp_dir, mod.id))
+                    arcname = f"artifacts/{mod.id}@latest/{os.path.basename(path)}"
+                    _add_file(archive, files, path, arcname, compress=False)
+                    manifest["artifacts"].append({"id": mod.id, "version": "latest", "path": arcname})
+
+            for package_id in package_ids:
+                download_dir = prefetcher.get(package_id)
+                if not download_dir:
+                    _online(manifest, package_id, "winget download failed")
+                    continue
+                if package_manager.local_installer_command(download_dir) is None:
+                    # Archives and portable apps are only installable through winget itself
+                    _online(manifest, package_id, "no silent installer, installs through winget")
+                prefix = f"winget/{package_id}"
+                for name in sorted(os.listdir(download_dir)):
+                    _add_file(archive, files, os.path.join(download_dir, name), f"{prefix}/{name}",
+                              compress=name.endswith(".yaml"))
+                version = package_manager.downloaded_version(download_dir)
+                manifest["winget"][package_id] = {"version": version, "path": prefix}
+                logger.info(f"Bundled {package_id}{f' {version}' if version else ''}")
+
+            archive.writestr(MANIFEST, json.dumps(manifest, indent=2, ensure_ascii=False))
+        os.replace(tmp_file, out_path)
+    finally:
+        if prefetcher:
+            prefetcher.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+    size = out_path.stat().st_size
+    logger.success(f"Bundle written: {out_path} ({len(plan)} modules, {cache.format_size(size)})")
+    return out_path
+
+def open_bundle(bundle_path):
+    """
+    Extract and verify a bundle. Returns (root dir, manifest); the root dir has
+    the usual windows-setup layout, its artifacts are seeded into the local
+    cache and its winget installers are registered with package_manager,
+    which then skips the winget source refresh and inventory export. The
+    root dir is temporary: run state belongs in the local config/ (see
+    ModuleManager's state_dir).
+    Raises ValueError if the bundle is not valid, including when it holds
+    files its manifest does not list.
+    """
+    import atexit
+    with zipfile.ZipFile(bundle_path) as archive:
+        try:
+            manifest = json.loads(archive.read(MANIFEST).decode("utf-8"))
+        except KeyError:
+            raise ValueError(f"{bundle_path} has no {MANIFEST}")
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"Unsupported bundle format: {manifest.get('format')}")
+        # Only listed files are extracted, so nothing unchecked ends up next to the module scripts
+        for name in archive.namelist():
+            if name != MANIFEST and not name.endswith("/") and name not in manifest["files"]:
+                raise ValueError(f"File not listed in the bundle manifest: {name}")
+        root = Path(tempfile.mkdtemp(prefix="omss-bundle-"))
+        atexit.register(shutil.rmtree, root, True)
+        names = set(archive.namelist())
+        for arcname in manifest["files"]:
+            if arcname not in names:
+                raise ValueError(f"Missing from bundle: {arcname}")
+            archive.extract(arcname, root)
+
+    for arcname, sha256 in manifest["files"].items():
+        path = root / arcname
+        if not path.is_file() or cache.file_sha256(path) != sha256:
+            raise ValueError(f"Checksum mismatch in bundle: {arcname}")
+
+    store = cache.get_cache()
+    for artifact in manifest["artifacts"]:
+        store.store(artifact["id"], artifact["version"], [root / artifact["path"]])
+    package_manager.use_local_packages({
+        package_id: str(root / info["path"]) for package_id, info in manifest["winget"].items()
+    })
+    package_manager.set_offline()
+
+    logger.info(f"Opened bundle from {manifest['created']}: {len(manifest['plan'])} modules")
+    for name, reason in manifest["online"].items():
+        logger.warn(f"{name} was not bundled for offline use and will need network access: {reason}")
+    return root, manifest
@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from core import logger
+
+CONFIG_DIR = Path(__file__).resolve().parent.parent / "config"
+INDEX_VERSION = 1
+DEFAULT_MAX_SIZE = "20GB"
+# prune() leaves unreferenced blobs younger than this, in case another process is storing them
+ORPHAN_GRACE = 3600  # seconds
+_UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def parse_size(value):
+    """'20GB' -> bytes (same notation as dev-drive.json)"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().upper()
+    for unit, factor in _UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text.rstrip("B"))
+
+def format_size(num_bytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_json(path):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+def default_root():
+    """
+    <packages.baseDir>/omss-cache from dev-drive.json, so artifacts live on the
+    Dev Drive next to the other package caches. Falls back to LOCALAPPDATA
+    when the Dev Drive is not mounted.
+    """
+    base_dir = _read_json(CONFIG_DIR / "dev-drive.json").get("packages", {}).get("baseDir")
+    if base_dir:
+        import ntpath
+        base_dir = os.path.expandvars(base_dir)
+        drive = ntpath.splitdrive(base_dir)[0]
+        if not drive or os.path.exists(drive + os.sep):
+            return Path(base_dir) / "omss-cache"
+    local = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(local) / "omss" / "cache"
+
+def get_cache():
+    """Process-wide ArtifactCache configured from config/"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            settings = _read_json(CONFIG_DIR / "settings.json").get("artifactCache", {})
+            root = settings.get("path") or default_root()
+            max_size = parse_size(settings.get("maxSize", DEFAULT_MAX_SIZE))
+            _cache = ArtifactCache(os.path.expandvars(str(root)), max_size)
+        return _cache
+
+class ArtifactCache:
+    """
+    Content-addressed store for downloaded installers.
+
+    Entries are keyed by package id and version and list the files that make
+    up the artifact; file contents live once under objects/<sha256>, so the
+    same payload published under several versions is stored once. Blobs are
+    re-hashed when served and dropped if they no longer match. Least recently
+    used entries are evicted once the store grows past max_bytes.
+    """
+    def __init__(self, root, max_bytes=None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes if max_bytes is not None else parse_size(DEFAULT_MAX_SIZE)
+        self.index_file = self.root / "index.json"
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(package_id, version):
+        return f"{package_id.lower()}@{version or 'latest'}"
+
+    def _blob(self, sha256):
+        return self.root / "objects" / sha256[:2] / sha256
+
+    def _load(self):
+        # Re-read on every access; installers running as separate processes share the index
+        data = _read_json(self.index_file)
+        if data.get("version") != INDEX_VERSION:
+            return {}
+        return data.get("entries", {})
+
+    def _save(self, entries):
+        tmp_file = self.index_file.with_name(f"index.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_file.write_text(json.dumps({"version": INDEX_VERSION, "entries": entries},
+                                           separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            logger.warn(f"Could not write cache index {self.index_file}: {e}")
+
+    def _verified(self, files):
+        for f in files:
+            blob = self._blob(f["sha256"])
+            try:
+                if blob.stat().st_size != f["size"] or file_sha256(blob) != f["sha256"]:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def lookup(self, package_id, version):
+        """[(file name, blob path), ...] for a cached artifact, or None on a miss"""
+        key = self.key(package_id, version)
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            if not self._verified(entry["files"]):
+                logger.warn(f"Cached artifact {key} failed its integrity check; discarding")
+                dropped = entries.pop(key)
+                self._save(entries)
+                self._remove_blobs(entries, [dropped])
+                return None
+            entry["lastUsed"] = time.time()
+            self._save(entries)
+            return [(f["name"], self._blob(f["sha256"])) for f in entry["files"]]
+
+    def materialize(self, package_id, version, dest_dir):
+        """Link (or copy) a cached artifact's files into dest_dir; their paths, or None on a miss"""
+        files = self.lookup(package_id, version)
+        if files is None:
+            return None
+        os.makedirs(dest_dir, exist_ok=True)
+        paths = []
+        for name, blob in files:
+            target = os.path.join(dest_dir, name)
+            try:
+                os.link(blob, target)
+            except OSError:
+                shutil.copyfile(blob, target)
+            paths.append(target)
+        return paths
+
+    def store(self, package_id, version, paths):
+        """Add files (stored under their base names) as the artifact for package_id/version"""
+        hashed = [(path, file_sha256(path)) for path in paths]
+        key = self.key(package_id, version)
+        now = time.time()
+        # Blobs and their index entry go in together, so no eviction sees a blob before its entry
+        with self._lock:
+            files = []
+            for path, sha256 in hashed:
+                blob = self._blob(sha256)
+                if not blob.exists():
+                    blob.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_blob = blob.with_name(f"{sha256}.{os.getpid()}.{threading.get_ident()}.tmp")
+                    shutil.copyfile(path, tmp_blob)
+                    os.replace(tmp_blob, blob)
+                files.append({"name": os.path.basename(path), "sha256": sha256, "size": os.path.getsize(path)})
+            entries = self._load()
+            entries[key] = {"files": files, "added": now, "lastUsed": now}
+            evicted = self._evict(entries, self.max_bytes, keep=key)
+            self._save(entries)
+            self._remove_blobs(entries, evicted.values())
+        logger.debug(f"Cached {key} ({len(files)} files)")
+
+    def fetch(self, package_id, version, url, dest_dir, sha256=None):
+        """
+        Place a single-file artifact in dest_dir and return its path, downloading
+        url on a miss. When sha256 is given the download must match it.
+        """
+        cached = self.materialize(package_id, version, dest_dir)
+        if cached:
+            logger.info(f"Using cached {os.path.basename(cached[0])}")
+            return cached[0]
+
+        import urllib.request
+        name = os.path.basename(url.split("?", 1)[0]) or package_id
+        path = os.path.join(dest_dir, name)
+        os.makedirs(dest_dir, exist_ok=True)
+        logger.info(f"Downloading {url}...")
+        urllib.request.urlretrieve(url, path)
+        if sha256 and file_sha256(path) != sha256.lower():
+            os.remove(path)
+            raise ValueError(f"Checksum mismatch for {url}")
+        try:
+            self.store(package_id, version, [path])
+        except OSError as e:
+            logger.warn(f"Could not cache {name}: {e}")
+        return path
+
+    def _entry_size(self, entry):
+        return sum(f["size"] for f in entry["files"])
+
+    def _evict(self, entries, max_bytes, keep=None):
+        """Drop LRU entries until the blobs fit in max_bytes; returns the dropped entries by key"""
+        # Sizes are counted per blob so deduplicated files are not charged twice
+        dropped = {}
+        while True:
+            blobs = {f["sha256"]: f["size"] for entry in entries.values() for f in entry["files"]}
+            if sum(blobs.values()) <= max_bytes:
+                break
+            victims = sorted((e["lastUsed"], k) for k, e in entries.items() if k != keep)
+            if not victims:
+                break
+            key = victims[0][1]
+            dropped[key] = entries.pop(key)
+        if dropped:
+            logger.debug(f"Evicted from cache: {', '.join(dropped)}")
+        return dropped
+
+    def _remove_blobs(self, entries, dropped):
+        # Only the blobs of dropped entries, and only those no remaining entry shares
+        referenced = {f["sha256"] for entry in entries.values() for f in entry["files"]}
+        for entry in dropped:
+            for f in entry["files"]:
+                if f["sha256"] not in referenced:
+                    try:
+                        self._blob(f["sha256"]).unlink()
+                    except OSError:
+                        pass
+
+    def _remove_orphans(self, entries):
+        # Blobs (and temp files) another process may still be about to index are left alone
+        referenced = {f["sha256"] for entry in entries.values() for f in entry["files"]}
+        objects_dir = self.root / "objects"
+        if not objects_dir.exists():
+            return
+        cutoff = time.time() - ORPHAN_GRACE
+        for blob in objects_dir.glob("*/*"):
+            if blob.name in referenced:
+                continue
+            try:
+                if blob.stat().st_mtime < cutoff:
+                    blob.unlink()
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            entries = self._load()
+        blobs = {f["sha256"]: f["size"] for entry in entries.values() for f in entry["files"]}
+        return {
+            "root": str(self.root),
+            "entries": len(entries),
+            "blobs": len(blobs),
+            "bytes": sum(blobs.values()),
+            "logical_bytes": sum(self._entry_size(e) for e in entries.values()),
+            "max_bytes": self.max_bytes,
+            "packages": sorted(entries, key=lambda k: entries[k]["lastUsed"], reverse=True),
+        }
+
+    def prune(self, max_bytes=None):
+        """Drop corrupt entries, then evict LRU entries down to max_bytes. Returns removed keys."""
+        with self._lock:
+            entries = self._load()
+            dropped = {key: entry for key, entry in entries.items() if not self._verified(entry["files"])}
+            for key in dropped:
+                del entries[key]
+            dropped.update(self._evict(entries, self.max_bytes if max_bytes is None else max_bytes))
+            self._save(entries)
+            self._remove_blobs(entries, dropped.values())
+            # Only here, not on every store: files left behind by interrupted stores
+            self._remove_orphans(entries)
+        return list(dropped)
+
+def print_stats():
+    stats = get_cache().stats()
+    logger.section("Artifact Cache")
+    logger.console(f"  Location : {stats['root']}")
+    logger.console(f"  Entries  : {stats['entries']} ({stats['blobs']} files)")
+    logger.console(f"  Size     : {format_size(stats['bytes'])} / {format_size(stats['max_bytes'])}"
+          f" (saved {format_size(stats['logical_bytes'] - stats['bytes'])} by deduplication)")
+    for key in stats["packages"]:
+        logger.console(f"    - {key}")
+
+def prune():
+    removed = get_cache().prune()
+    if removed:
+        for key in removed:
+            logger.info(f"Removed {key}")
+    logger.success(f"Cache pruned ({len(removed)} entries removed)")
@@ -0,0 +1,102 @@
+import os
+import json
+from pathlib import Path
+from core import logger
+
+# Bump when the on-disk layout changes; older indexes are discarded
+INDEX_VERSION = 1
+
+def _read_index(index_file):
+    try:
+        data = json.loads(Path(index_file).read_text(encoding="utf-8"))
+        if data.get("version") == INDEX_VERSION:
+            return data
+    except Exception:
+        pass
+    return {}
+
+def _write_index(index_file, data):
+    index_file = Path(index_file)
+    tmp_file = index_file.with_name(index_file.name + ".tmp")
+    try:
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_file, index_file)
+    except Exception as e:
+        logger.warn(f"Could not write catalog index {index_file}: {e}")
+
+def scan(modules_dir, index_file, rebuild=False):
+    """
+    Return [(module_dir, meta), ...] for every meta.json under modules_dir.
+
+    Directory listings are reused while a directory's mtime is unchanged,
+    and meta.json files are only re-parsed when their mtime or size changed.
+    """
+    modules_dir = Path(modules_dir)
+    old = {} if rebuild else _read_index(index_file)
+    if old.get("root") != str(modules_dir):
+        old = {}
+    old_dirs = old.get("dirs", {})
+    old_files = old.get("files", {})
+
+    dirs = {}
+    files = {}
+    found = []
+    changed = not old
+
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        full = modules_dir / rel if rel else modules_dir
+        try:
+            mtime = os.stat(full).st_mtime_ns
+        except OSError:
+            changed = True
+            continue
+
+        cached = old_dirs.get(rel)
+        if cached and cached[0] == mtime:
+            subdirs, has_meta = cached[1], cached[2]
+        else:
+            changed = True
+            subdirs, has_meta = [], False
+            with os.scandir(full) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                    elif entry.name == "meta.json":
+                        has_meta = True
+            subdirs.sort()
+        dirs[rel] = [mtime, subdirs, has_meta]
+
+        if has_meta:
+            meta_rel = f"{rel}/meta.json" if rel else "meta.json"
+            meta_file = full / "meta.json"
+            try:
+                st = os.stat(meta_file)
+                cached_file = old_files.get(meta_rel)
+                if cached_file and cached_file[0] == st.st_mtime_ns and cached_file[1] == st.st_size:
+                    meta = cached_file[2]
+                else:
+                    changed = True
+                    meta = json.loads(meta_file.read_text(encoding="utf-8"))
+                files[meta_rel] = [st.st_mtime_ns, st.st_size, meta]
+                found.append((rel, meta))
+            except Exception as e:
+                # Not cached, so the error is reported again until the file is fixed
+                changed = True
+                logger.error(f"Failed to load meta for {full}: {e}")
+                found.append((rel, {}))
+
+        # Reverse so directories pop in sorted order
+        stack.extend(f"{rel}/{name}" if rel else name for name in reversed(subdirs))
+
+    if changed or len(files) != len(old_files) or len(dirs) != len(old_dirs):
+        _write_index(index_file, {
+            "version": INDEX_VERSION,
+            "root": str(modules_dir),
+            "dirs": dirs,
+            "files": files,
+        })
+
+    return [(modules_dir / rel if rel else modules_dir, meta) for rel, meta in found]
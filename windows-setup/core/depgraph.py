@@ -0,0 +1,134 @@
+def base_id(item):
+    """'dev.java:21' -> 'dev.java'"""
+    return item.split(":", 1)[0]
+
+class DependencyIndex:
+    """
+    Dependency graph of the catalog, built once at load.
+
+    forward:   module id -> direct dependency ids (in meta.json order)
+    reverse:   module id -> ids of modules that directly require it
+    component: module id -> its strongly connected component (index into members)
+    cycles:    strongly connected groups of modules that require each other
+    rank():    topological position, dependencies always rank lower
+    closure() is memoized per strongly connected component.
+    """
+    def __init__(self, modules):
+        self.forward = {}
+        for mod_id in sorted(modules):
+            deps = []
+            for dep in modules[mod_id].requires:
+                dep = base_id(dep)
+                if dep != mod_id and dep not in deps:
+                    deps.append(dep)
+            self.forward[mod_id] = deps
+        # Requirements that point outside the catalog still become nodes
+        for deps in list(self.forward.values()):
+            for dep in deps:
+                self.forward.setdefault(dep, [])
+
+        self.reverse = {mod_id: set() for mod_id in self.forward}
+        for mod_id, deps in self.forward.items():
+            for dep in deps:
+                self.reverse[dep].add(mod_id)
+
+        self._build_components()
+        self._closure = {}
+
+    def _build_components(self):
+        # Iterative Tarjan. Components come out dependencies-first, which
+        # doubles as the topological order of the condensed graph.
+        index = {}
+        low = {}
+        on_stack = set()
+        stack = []
+        self.component = {}
+        self.members = []
+        counter = 0
+
+        for root in self.forward:
+            if root in index:
+                continue
+            work = [(root, iter(self.forward[root]))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+
+            while work:
+                node, deps = work[-1]
+                advanced = False
+                for dep in deps:
+                    if dep not in index:
+                        index[dep] = low[dep] = counter
+                        counter += 1
+                        stack.append(dep)
+                        on_stack.add(dep)
+                        work.append((dep, iter(self.forward[dep])))
+                        advanced = True
+                        break
+                    if dep in on_stack:
+                        low[node] = min(low[node], index[dep])
+                if advanced:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    comp_id = len(self.members)
+                    group = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        self.component[member] = comp_id
+                        group.append(member)
+                        if member == node:
+                            break
+                    self.members.append(frozenset(group))
+
+        self.successors = []
+        for comp_id, group in enumerate(self.members):
+            succ = set()
+            for member in group:
+                for dep in self.forward[member]:
+                    if self.component[dep] != comp_id:
+                        succ.add(self.component[dep])
+            self.successors.append(succ)
+
+        self.cycles = [sorted(group) for group in self.members if len(group) > 1]
+
+    def rank(self, mod_id):
+        return self.component.get(base_id(mod_id), -1)
+
+    def _component_closure(self, comp_id):
+        stack = [comp_id]
+        while stack:
+            current = stack[-1]
+            if current in self._closure:
+                stack.pop()
+                continue
+            pending = [c for c in self.successors[current] if c not in self._closure]
+            if pending:
+                stack.extend(pending)
+                continue
+            acc = set()
+            for c in self.successors[current]:
+                acc |= self.members[c]
+                acc |= self._closure[c]
+            self._closure[current] = frozenset(acc)
+            stack.pop()
+        return self._closure[comp_id]
+
+    def closure(self, mod_id):
+        """Every module mod_id depends on, directly or transitively (excluding itself)"""
+        mod_id = base_id(mod_id)
+        comp_id = self.component.get(mod_id)
+        if comp_id is None:
+            return frozenset()
+        deps = self._component_closure(comp_id)
+        group = self.members[comp_id]
+        if len(group) > 1:
+            deps = deps | (group - {mod_id})
+        return deps
@@ -0,0 +1,246 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from core import logger, package_manager, trace
+
+CACHE_FILE = "status-cache.json"
+DEFAULT_TTL = 60  # seconds; statusCache.ttl in config/settings.json
+MAX_WORKERS = 16
+VERSION_TIMEOUT = 15
+VERSION_RE = r"(\d+(?:\.\d+)+)"
+
+REGISTRY_HIVES = {
+    "HKLM": "HKEY_LOCAL_MACHINE",
+    "HKCU": "HKEY_CURRENT_USER",
+    "HKCR": "HKEY_CLASSES_ROOT",
+}
+
+def _read_registry(key, value_name=None):
+    """(exists, value) for "HKLM\\SOFTWARE\\...", or (False, None) off Windows"""
+    try:
+        import winreg
+    except ImportError:
+        return False, None
+    hive, _, sub_key = key.partition("\\")
+    hive = getattr(winreg, REGISTRY_HIVES.get(hive.upper(), hive.upper()), None)
+    if hive is None:
+        return False, None
+    try:
+        with winreg.OpenKey(hive, sub_key, 0, winreg.KEY_READ | winreg.KEY_WOW64_64KEY) as handle:
+            if not value_name:
+                return True, None
+            return True, str(winreg.QueryValueEx(handle, value_name)[0])
+    except OSError:
+        return False, None
+
+def _version_output(cmd):
+    """Output of a version command, or None if it could not run or failed"""
+    import subprocess
+    from core import proc
+    if isinstance(cmd, str):
+        cmd = cmd.split()
+    try:
+        with trace.span(f"detect {cmd[0]}", "detect"):
+            result = proc.run(cmd, capture_output=True, text=True, errors="replace", timeout=VERSION_TIMEOUT)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    # Some tools (java -version) print to stderr
+    return (result.stdout or "") + (result.stderr or "")
+
+def _probe(spec):
+    """
+    Run one meta.json "detect" block; returns (installed, version).
+
+      "command":  executable that must be on PATH
+      "path":     file or directory that must exist (%VARS% expanded)
+      "registry": key that must exist, e.g. "HKLM\\SOFTWARE\\GitForWindows";
+                  with "value", that value is reported as the version
+      "version":  command whose output holds the version; "regex" (first
+                  group) picks it out, and when given the command must run
+                  and match, so a probe can require a specific major version
+
+    Every probe given has to pass.
+    """
+    version = None
+    if spec.get("command") and shutil.which(spec["command"]) is None:
+        return False, None
+    if spec.get("path") and not os.path.exists(os.path.expandvars(spec["path"])):
+        return False, None
+    if spec.get("registry"):
+        found, value = _read_registry(spec["registry"], spec.get("value"))
+        if not found:
+            return False, None
+        version = value
+    if spec.get("version"):
+        output = _version_output(spec["version"])
+        if output is None:
+            # A declared regex is a requirement (e.g. a major version), and a
+            # command that cannot run (python's Store stub) is not an install
+            if spec.get("regex") or not (spec.get("command") or spec.get("path") or spec.get("registry")):
+                return False, None
+        else:
+            match = re.search(spec.get("regex") or VERSION_RE, output, re.MULTILINE)
+            if match:
+                version = match.group(1) if match.groups() else match.group(0)
+            elif spec.get("regex"):
+                return False, None
+    return True, version
+
+def probe(spec):
+    """
+    _probe(spec), or its result from a core.proc recording: PATH, files and
+    the registry belong to the recorded machine, so the whole probe replays.
+    """
+    from core import proc
+    cmd = ["detect", json.dumps(spec, sort_keys=True)]
+    if proc.replaying():
+        try:
+            entry = proc.replay(cmd)
+            return entry["returncode"] == 0, entry["stdout"] or None
+        except FileNotFoundError:
+            logger.debug(f"No recorded probe for {spec}, probing this machine")
+    started = time.perf_counter()
+    installed, version = _probe(spec)
+    if proc.recording():
+        proc.record(cmd, 0 if installed else 1, version or "", "", time.perf_counter() - started)
+    return installed, version
+
+def _spec_hash(mod, variant):
+    spec = {"detect": mod.detect_spec(variant), "winget": mod.winget_package(variant),
+            "psmodule": mod.ps_module_package(variant)}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+class StatusCache:
+    """Scan results per item in config/status-cache.json, trusted for ttl seconds"""
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @classmethod
+    def for_manager(cls, manager):
+        try:
+            with open(manager.config_dir / "settings.json", "r", encoding="utf-8") as f:
+                ttl = json.load(f).get("statusCache", {}).get("ttl", DEFAULT_TTL)
+        except (OSError, ValueError):
+            ttl = DEFAULT_TTL
+        return cls(manager.state_dir / CACHE_FILE, ttl)
+
+    def get(self, item, spec_hash):
+        entry = self.entries.get(item)
+        if entry and entry.get("hash") == spec_hash and time.time() - entry.get("time", 0) < self.ttl:
+            return entry
+        return None
+
+    def put(self, item, spec_hash, status):
+        self.entries[item] = dict(status, hash=spec_hash, time=time.time())
+
+    def forget(self, items):
+        for item in items:
+            self.entries.pop(item, None)
+
+    def save(self):
+        tmp_file = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp_file, self.path)
+        except OSError as e:
+            logger.debug(f"Could not write {self.path}: {e}")
+
+def item_status(mod, variant=None):
+    """{"installed": True/False/None, "version": ..., "source": ...}; None means no way to tell"""
+    spec = mod.detect_spec(variant)
+    if spec:
+        installed, version = probe(spec)
+        return {"installed": installed, "version": version, "source": "detect"}
+    package_id = mod.winget_package(variant)
+    if package_id:
+        version = package_manager.get_winget_version(package_id)
+        if version is None and not package_manager.winget_inventory_complete():
+            # The export failed; a package missing from it may well be installed
+            return {"installed": None, "version": None, "source": "winget"}
+        return {"installed": version is not None, "version": version or None, "source": "winget"}
+    ps_module = mod.ps_module_package(variant)
+    if ps_module:
+        from core import pwsh
+        try:
+            installed = bool(pwsh.get_session().available_modules([ps_module]))
+        except OSError:
+            installed = None
+        return {"installed": installed, "version": None, "source": "psmodule"}
+    return {"installed": None, "version": None, "source": None}
+
+def scan(manager, items, use_cache=True):
+    """Status of every item, probing them concurrently; item -> status dict"""
+    from core.scheduler import split_item
+    status_cache = StatusCache.for_manager(manager)
+    results = {}
+    pending = []
+    for item in items:
+        mod_id, variant = split_item(item)
+        mod = manager.get_module(mod_id)
+        if not mod:
+            continue
+        spec_hash = _spec_hash(mod, variant)
+        cached = status_cache.get(item, spec_hash) if use_cache else None
+        if cached:
+            results[item] = {key: cached[key] for key in ("installed", "version", "source")}
+        else:
+            pending.append((item, mod, variant, spec_hash))
+
+    if pending:
+        with trace.span(f"status scan ({len(pending)})", "detect"), ThreadPoolExecutor(MAX_WORKERS) as pool:
+            # The winget snapshot and the batched Get-Module run alongside the probes
+            if any(mod.winget_package(variant) and not mod.detect_spec(variant) for _, mod, variant, _ in pending):
+                pool.submit(package_manager.load_winget_inventory)
+            pool.submit(package_manager.load_ps_module_inventory,
+                        manager.ps_modules([item for item, mod, variant, _ in pending if not mod.detect_spec(variant)]))
+            futures = {item: pool.submit(item_status, mod, variant) for item, mod, variant, _ in pending}
+            for item, mod, variant, spec_hash in pending:
+                try:
+                    results[item] = futures[item].result()
+                except Exception as e:
+                    logger.debug(f"Status probe failed for {item}: {e}")
+                    results[item] = {"installed": None, "version": None, "source": None}
+                    continue
+                if results[item]["installed"] is None and results[item]["source"]:
+                    # A failed winget export or pwsh session; ask again next time
+                    continue
+                status_cache.put(item, spec_hash, results[item])
+        status_cache.save()
+    return {item: results[item] for item in items if item in results}
+
+def forget(manager, items):
+    """Drop cached status for items, e.g. after installing them"""
+    status_cache = StatusCache.for_manager(manager)
+    status_cache.forget(items)
+    status_cache.save()
+
+def print_status(manager, items, use_cache=True):
+    started = time.perf_counter()
+    results = scan(manager, items, use_cache)
+    logger.section(f"Status ({len(results)} modules)")
+    width = max((len(item) for item in results), default=0)
+    for item, status in results.items():
+        if status["installed"]:
+            mark, text = f"{logger.GREEN}✔{logger.RESET}", status["version"] or "installed"
+        elif status["installed"] is None:
+            mark, text = "?", "unknown" if status["source"] else "unknown (no detect probe)"
+        else:
+            mark, text = f"{logger.RED}✘{logger.RESET}", "not installed"
+        source = f"  [{status['source']}]" if status["source"] else ""
+        logger.console(f"  {mark} {item:<{width}}  {text}{source}")
+    installed = sum(1 for status in results.values() if status["installed"])
+    logger.info(f"{installed}/{len(results)} installed ({time.perf_counter() - started:.1f}s)")
+    return results
@@ -0,0 +1,266 @@
+import os
+import time
+import asyncio
+from core import logger, package_manager, journal, trace, system, detect, module
+from core.scheduler import build_graph, split_item
+
+# Item states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, SKIPPED, CANCELLED)
+
+class _PluginConsole:
+    """
+    Console for the duration of a run with in-process plugins: records they
+    log (tagged with their item by logger.context) go to that item's output
+    instead of the terminal Textual owns.
+    """
+    def __init__(self, engine, loop):
+        self.engine = engine
+        self.loop = loop
+
+    def write(self, text):
+        item = logger.current_module()
+        if item not in self.engine.states:
+            print(text)
+            return
+        for line in logger.ANSI_RE.sub("", text).splitlines():
+            if line.strip():
+                self.loop.call_soon_threadsafe(self.engine.on_output, item, line)
+
+class InstallEngine:
+    """
+    Runs an install plan with asyncio subprocesses so it can live inside
+    the Textual event loop. Output lines and state changes are reported
+    through callbacks; skip() and cancel() never block.
+
+    on_state(item, state) and on_output(item, line) are called on the
+    event loop thread.
+    """
+    def __init__(self, manager, items, jobs=1, dry_run=False, prefetch=0, force=False, in_process=False,
+                 on_state=None, on_output=None):
+        self.manager = manager
+        self.items = list(dict.fromkeys(items))
+        self.jobs = max(1, int(jobs))
+        self.dry_run = dry_run
+        self.prefetch = prefetch
+        self.force = force
+        # Run install.py of "inProcess" modules in this process, as --in-process does for the CLI
+        self.in_process = in_process
+        self.journal = journal.InstallJournal.for_manager(manager)
+        self.on_state = on_state or (lambda item, state: None)
+        self.on_output = on_output or (lambda item, line: None)
+
+        self.graph = build_graph(manager, self.items)
+        self.states = {item: QUEUED for item in self.items}
+        self.cancelled = False
+        self._skip = set()
+        self._procs = {}
+        self._finished = {}
+        self._completed = set()
+
+    def _set_state(self, item, state):
+        self.states[item] = state
+        self.on_state(item, state)
+
+    def skip(self, item):
+        """Skip a queued item, or stop a running one"""
+        if self.states.get(item) in FINISHED:
+            return
+        self._skip.add(item)
+        proc = self._procs.get(item)
+        if proc and proc.returncode is None:
+            proc.terminate()
+
+    def cancel(self):
+        """Stop scheduling new items and terminate the running ones"""
+        self.cancelled = True
+        for proc in list(self._procs.values()):
+            if proc.returncode is None:
+                proc.terminate()
+
+    async def run(self):
+        """Run the whole plan; returns item -> final state"""
+        self._slots = asyncio.Semaphore(self.jobs)
+        self._msi_lock = asyncio.Lock()
+        self._finished = {item: asyncio.Event() for item in self.items}
+        if not self.force:
+            self._completed = await asyncio.to_thread(self.journal.completed, self.manager, self.items)
+        if not self.dry_run:
+            pending = [item for item in self.items if item not in self._completed]
+            if self.manager.winget_packages(pending, skip_installed=False):
+                # One source refresh per run; every later winget call finds it fresh
+                await asyncio.to_thread(package_manager.refresh_winget_sources)
+            await asyncio.to_thread(package_manager.load_ps_module_inventory, self.manager.ps_modules(pending))
+        if self.prefetch and not self.dry_run:
+            packages = await asyncio.to_thread(self.manager.winget_packages, pending)
+            package_manager.start_prefetch(packages, self.prefetch)
+        if self.in_process and not self.dry_run:
+            logger.set_live_display(_PluginConsole(self, asyncio.get_running_loop()))
+        try:
+            # Env/PATH changes are committed per module as each one finishes, and broadcast once at the end
+            with system.transaction() as self._env_tx:
+                self._env_queue = os.environ[system.ENV_QUEUE_VAR]
+                await asyncio.gather(*(self._run_item(item) for item in self.items))
+        finally:
+            if self.in_process and not self.dry_run:
+                logger.set_live_display(None)
+            await asyncio.to_thread(package_manager.stop_prefetch)
+            package_manager.end_source_refresh()
+            if not self.dry_run:
+                # Whatever ran may have changed; the next status scan probes it again
+                await asyncio.to_thread(detect.forget, self.manager, self.items)
+        return dict(self.states)
+
+    async def _run_item(self, item):
+        try:
+            if item in self._completed:
+                self.on_output(item, "Completed in a previous run (start with --force to reinstall)")
+                self._set_state(item, DONE)
+                return
+
+            for dep in self.graph[item]:
+                await self._finished[dep].wait()
+            blocked = [dep for dep in self.graph[item] if self.states[dep] != DONE]
+
+            if blocked:
+                self.on_output(item, f"Skipped: dependency {blocked[0]} did not complete")
+                self._set_state(item, SKIPPED)
+                return
+
+            async with self._slots:
+                if self.cancelled:
+                    self._set_state(item, CANCELLED)
+                elif item in self._skip:
+                    self._set_state(item, SKIPPED)
+                else:
+                    self._set_state(item, RUNNING)
+                    started = time.perf_counter()
+                    with trace.span(f"install {item}", "module", track=item, item=item):
+                        ok = await self._install(item)
+                    # Apply env changes of the installer script here, so dependents inherit them
+                    self._env_tx.absorb(self._env_queue)
+                    mod = self.manager.get_module(item)
+                    if not self.dry_run:
+                        # Written to the registry before the journal calls the module done
+                        await asyncio.to_thread(self._env_tx.commit, False)
+                    if mod and not self.dry_run and item not in self._skip and not self.cancelled:
+                        await asyncio.to_thread(self.journal.record, item, mod, ok, time.perf_counter() - started)
+                    if item in self._skip:
+                        self._set_state(item, SKIPPED)
+                    elif self.cancelled and not ok:
+                        self._set_state(item, CANCELLED)
+                    else:
+                        # None: ran without reporting a result; not a failure, but not journaled as done
+                        self._set_state(item, FAILED if ok is False else DONE)
+        except Exception as e:
+            self.on_output(item, f"Error: {e}")
+            self._set_state(item, FAILED)
+        finally:
+            self._finished[item].set()
+
+    async def _install(self, item):
+        mod_id, variant = split_item(item)
+        mod = self.manager.get_module(mod_id)
+        if not mod:
+            self.on_output(item, f"Module not found: {mod_id}")
+            return False
+
+        # Same decision as Module.install(); probes and the winget inventory stay off the event loop
+        step, detail = await asyncio.to_thread(mod.install_step, variant, self.dry_run, self.in_process)
+        if step == module.STEP_NONE:
+            self.on_output(item, f"No installation method found for {mod_id}")
+            return True
+        if step == module.STEP_INSTALLED:
+            self.on_output(item, f"{mod.name} is already installed{f' ({detail})' if detail else ''}.")
+            return True
+
+        if self.dry_run:
+            if step == module.STEP_PLUGIN:
+                self.on_output(item, f"[DRY RUN] {mod.install_py} (in process)")
+            else:
+                self.on_output(item, f"[DRY RUN] {' '.join(mod.install_command(variant)[0])}")
+            return True
+
+        if step == module.STEP_PLUGIN:
+            # Log records of the plugin reach this item's log through _PluginConsole
+            with logger.context(item):
+                return await asyncio.to_thread(mod.run_plugin, False, variant)
+
+        if step == module.STEP_PSMODULE:
+            # Goes through the shared pwsh session; output is relayed to the event loop thread
+            loop = asyncio.get_running_loop()
+            on_line = lambda line: loop.call_soon_threadsafe(self.on_output, item, line)
+            self.on_output(item, f"$ Install-Module {detail}")
+            try:
+                result = await asyncio.to_thread(package_manager.ensure_ps_module, detail, on_line=on_line)
+            except OSError as e:
+                self.on_output(item, f"Failed to start: {e}")
+                return False
+            return result.returncode == 0
+
+        if step == module.STEP_WINGET:
+            local = await asyncio.to_thread(package_manager.prefetched_install_command, detail)
+            if local:
+                local_cmd, uses_msi = local
+                if uses_msi:
+                    async with self._msi_lock:
+                        returncode, _ = await self._exec(item, local_cmd, None)
+                else:
+                    returncode, _ = await self._exec(item, local_cmd, None)
+                if returncode in package_manager.INSTALLER_OK_CODES:
+                    package_manager.record_winget_install(detail)
+                    return True
+                if item in self._skip or self.cancelled:
+                    return False
+                self.on_output(item, "Downloaded installer failed, retrying with winget")
+            returncode, output = await self._exec(item, package_manager.winget_install_command(detail), None)
+            if returncode is None:
+                return False
+            ok = package_manager.winget_succeeded(returncode, "\n".join(output))
+            if ok:
+                package_manager.record_winget_install(detail)
+            return ok
+
+        # install.py / install.ps1 as a child process
+        cmd, env = mod.install_command(variant)
+        returncode, _ = await self._exec(item, cmd, env)
+        return returncode == 0
+
+    async def _exec(self, item, cmd, env):
+        """Run cmd, streaming its output; returns (returncode, lines), returncode None if it could not start"""
+        self.on_output(item, f"$ {' '.join(cmd)}")
+        with trace.span(f"{os.path.basename(cmd[0])} {item}", "process", track=item, cmd=" ".join(cmd)):
+            return await self._exec_process(item, cmd, env)
+
+    async def _exec_process(self, item, cmd, env):
+        from core import proc
+        output = []
+
+        def on_line(raw):
+            # Progress bars redraw with \r; report the last frame of each line
+            line = raw.split("\r")[-1]
+            if line.strip():
+                output.append(line)
+                self.on_output(item, line)
+                logger.output(item, line)
+
+        def on_start(process):
+            self._procs[item] = process
+
+        try:
+            # Recorded or replayed like every other external command (see core.proc)
+            returncode = await proc.stream_async(cmd, on_line, env=env, on_start=on_start)
+        except OSError as e:
+            self.on_output(item, f"Failed to start: {e}")
+            return None, []
+        finally:
+            self._procs.pop(item, None)
+
+        self.on_output(item, f"Exit code: {returncode}")
+        return returncode, output
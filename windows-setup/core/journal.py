@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from core import logger
+
+JOURNAL_FILE = "install-journal.jsonl"
+# Rewrite the journal once it holds this many records per distinct item
+COMPACT_RATIO = 4
+
+def definition_hash(mod):
+    """Hash of what defines a module's install: meta.json and its installer script"""
+    digest = hashlib.sha256()
+    for path in (mod.meta_path, mod.install_py, mod.install_ps1):
+        digest.update(path.name.encode("utf-8"))
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+class InstallJournal:
+    """
+    Append-only JSONL record of install outcomes, one line per attempt:
+    {"item": "dev.java:21", "hash": ..., "ok": true, "seconds": 12.3, "time": ...}
+
+    An item counts as completed when its latest record succeeded and the
+    module definition still hashes the same, so an edited meta.json or
+    install script makes it run again. Lines are flushed and fsynced as they
+    are written, so a crash or reboot loses at most the install in progress.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._latest = None
+
+    @classmethod
+    def for_manager(cls, manager):
+        return cls(manager.state_dir / JOURNAL_FILE)
+
+    def _load(self):
+        if self._latest is not None:
+            return self._latest
+        latest = {}
+        count = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn last line from an interrupted write
+                        continue
+                    latest[record["item"]] = record
+                    count += 1
+        except OSError:
+            pass
+        self._latest = latest
+        if latest and count > COMPACT_RATIO * len(latest):
+            self._compact()
+        return latest
+
+    def _compact(self):
+        tmp_file = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                for record in self._latest.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_file, self.path)
+        except OSError as e:
+            logger.debug(f"Could not compact {self.path}: {e}")
+
+    def last(self, item):
+        """Latest record for item, or None"""
+        with self._lock:
+            return self._load().get(item)
+
+    def completed(self, manager, items):
+        """Items whose last install succeeded with the current module definition"""
+        with self._lock:
+            latest = self._load()
+        done = set()
+        for item in items:
+            record = latest.get(item)
+            if not record or not record.get("ok"):
+                continue
+            mod = manager.get_module(item)
+            if mod and record.get("hash") == definition_hash(mod):
+                done.add(item)
+        return done
+
+    def record(self, item, mod, ok, seconds):
+        """Append an outcome; only ok=True counts as completed (None, an unknown outcome, does not)"""
+        record = {
+            "item": item,
+            "hash": definition_hash(mod),
+            "ok": ok is True,
+            "seconds": round(seconds, 1),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._load()[item] = record
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a+b") as f:
+                    # After a torn last line, start on a fresh one so this record stays readable
+                    if f.seek(0, os.SEEK_END):
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            line = "\n" + line
+                    f.write(line.encode("utf-8"))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                logger.warn(f"Could not write install journal {self.path}: {e}")
@@ -1,8 +1,13 @@
 import sys
 import os
+import re
+import json
 import time
+import queue
+import atexit
 import threading
-import itertools
+import contextlib
+import contextvars
 
 # ANSI Colors
 CYAN = "\033[96m"
@@ -14,63 +19,263 @@ GREY = "\033[90m"
 WHITE = "\033[97m"
 RESET = "\033[0m"
 BOLD = "\033[1m"
+# Color codes are kept out of log files
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
 
-# Enable ANSI support in Windows console
-if os.name == 'nt':
-    import ctypes
-    kernel32 = ctypes.windll.kernel32
-    kernel32.SetConsoleMode(kernel32.GetStdHandle(-11), 7)
+# Level names as used by logLevel in config/settings.json
+LEVELS = {"debug": 10, "info": 20, "success": 25, "warn": 30, "error": 40}
+_LEVEL_ALIASES = {"warning": "warn", "critical": "error"}
+SETTINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "settings.json")
+
+_ansi_enabled = False
+_level = None  # resolved from settings.json on first use
+_format = "text"
+_console = True
+_sink = None
+_env_checked = False
+# Live display (core.progress) that owns the bottom of the console while active
+_live = None
+# One console writer at a time, so lines from parallel installs never interleave
+_console_lock = threading.Lock()
+# Module the current thread/task is installing; tags records for per-module logs
+_module = contextvars.ContextVar("omss_log_module", default=None)
+
+def enable_ansi():
+    # Enable ANSI support in Windows console on first output rather than at import
+    global _ansi_enabled
+    if _ansi_enabled:
+        return
+    _ansi_enabled = True
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetConsoleMode(kernel32.GetStdHandle(-11), 7)
+
+def set_live_display(display):
+    """Route console output through display.write() (None to print directly)"""
+    global _live
+    with _console_lock:
+        _live = display
+
+def current_module():
+    """Module the calling thread/task is installing (see context()), or None"""
+    return _module.get()
+
+def console_stream():
+    """Stream for plain-text output: stdout, or stderr while stdout carries JSON records"""
+    return sys.stderr if _format == "json" else sys.stdout
+
+def _write_console(text, record=False):
+    # Deliberately synchronous, unlike the file sink: console lines must stay
+    # in order with the progress rows, and a terminal write costs about as
+    # much as handing the line to a writer thread
+    with _console_lock:
+        if record and _format == "json":
+            # JSON records own stdout; progress rows and plain text are on stderr
+            print(text, flush=True)
+        elif _live is not None:
+            _live.write(text)
+        else:
+            print(text, file=console_stream())
+
+def console(text):
+    """
+    Print text as-is (no record): output relayed from an installer, or
+    reports such as status tables. Goes to stderr with --log-format json,
+    so stdout stays valid JSON Lines.
+    """
+    if _console:
+        _write_console(text)
+
+def _level_value(name):
+    name = str(name).lower()
+    name = _LEVEL_ALIASES.get(name, name)
+    if name not in LEVELS:
+        raise ValueError(f"Unknown log level: {name}")
+    return LEVELS[name]
+
+def _threshold():
+    global _level
+    if _level is None:
+        _level = LEVELS["info"]
+        try:
+            if os.environ.get("OMSS_LOG_LEVEL"):
+                _level = _level_value(os.environ["OMSS_LOG_LEVEL"])
+            else:
+                with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                    _level = _level_value(json.load(f).get("logLevel", "info"))
+        except Exception:
+            pass
+    return _level
+
+class FileSink:
+    """
+    Writes log records to <log_dir>/<run>/ on a background thread, so callers
+    only pay for a queue put: run.jsonl gets every record as a JSON line and
+    each module gets its own <module>.log. With module_logs=False only
+    run.jsonl is written (installer scripts: the parent writes their
+    <module>.log from their output, so each line lands there once).
+    """
+    def __init__(self, run_dir, run_log="run.jsonl", module_logs=True):
+        self.dir = run_dir
+        self.run_log = run_log
+        self.module_logs = module_logs
+        os.makedirs(self.dir, exist_ok=True)
+        self._queue = queue.SimpleQueue()
+        self._files = {}
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, record):
+        self._queue.put(record)
+
+    def _file(self, name):
+        f = self._files.get(name)
+        if f is None:
+            # ':' separates variants in item names but is not allowed in Windows file names
+            f = open(os.path.join(self.dir, name.replace(":", "@")), "a", encoding="utf-8")
+            self._files[name] = f
+        return f
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            try:
+                self._file(self.run_log).write(json.dumps(record, ensure_ascii=False) + "\n")
+                if self.module_logs and record.get("module"):
+                    line = f"{record['time']} {record['level'].upper():<7} {record['msg']}\n"
+                    self._file(f"{record['module']}.log").write(line)
+            except OSError:
+                pass
+            if self._queue.empty():
+                for f in self._files.values():
+                    f.flush()
+        for f in self._files.values():
+            f.close()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+def configure(level=None, fmt=None, log_dir=None, console=None):
+    """
+    level:   debug/info/success/warn/error (default: logLevel from settings.json)
+    fmt:     "text" (colored console) or "json" (one JSON object per line)
+    log_dir: also write run.jsonl and per-module log files under this directory
+    console: False to keep records off stdout (files only)
+    """
+    global _level, _format, _console, _sink
+    # Settings are passed on to installer scripts through the environment
+    if level is not None:
+        _level = _level_value(level)
+        os.environ["OMSS_LOG_LEVEL"] = str(level)
+    if fmt is not None:
+        _format = fmt
+        os.environ["OMSS_LOG_FORMAT"] = fmt
+    if console is not None:
+        _console = console
+    if log_dir is not None:
+        shutdown()
+        _sink = FileSink(os.path.join(log_dir, time.strftime("%Y%m%d-%H%M%S")))
+        os.environ["OMSS_LOG_DIR"] = _sink.dir
+        atexit.register(shutdown)
+
+def _configure_from_env():
+    # Installer scripts run as child processes: join the parent's log run
+    global _format, _sink
+    _format = os.environ.get("OMSS_LOG_FORMAT", _format)
+    if os.environ.get("OMSS_LOG_DIR"):
+        _sink = FileSink(os.environ["OMSS_LOG_DIR"], run_log=f"run-{os.getpid()}.jsonl", module_logs=False)
+        atexit.register(shutdown)
+
+def shutdown():
+    """Drain and close the file sink"""
+    global _sink
+    if _sink is not None:
+        sink, _sink = _sink, None
+        sink.close()
+
+@contextlib.contextmanager
+def context(module):
+    """Tag records logged inside the block (on this thread or task) with module"""
+    token = _module.set(module)
+    try:
+        yield
+    finally:
+        _module.reset(token)
+
+def _emit(level, msg, text, event=None, module=None):
+    global _env_checked
+    if not _env_checked:
+        _env_checked = True
+        if _sink is None:
+            _configure_from_env()
+    if LEVELS[level] < _threshold():
+        return
+    record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "level": level, "msg": str(msg)}
+    if event:
+        record["event"] = event
+    module = module or _module.get() or os.environ.get("OMSS_LOG_MODULE")
+    if module:
+        record["module"] = module
+    if _sink is not None:
+        _sink.put(record)
+    if not _console:
+        return
+    if _format == "json":
+        text = json.dumps(record, ensure_ascii=False)
+    else:
+        enable_ansi()
+    _write_console(text, record=True)
 
 def info(msg):
-    print(f"{CYAN}INFO:{RESET} {msg}")
+    _emit("info", msg, f"{CYAN}INFO:{RESET} {msg}")
 
 def success(msg):
-    print(f"{GREEN}SUCCESS:{RESET} {msg}")
+    _emit("success", msg, f"{GREEN}SUCCESS:{RESET} {msg}")
 
 def warn(msg):
-    print(f"{YELLOW}WARN:{RESET} {msg}")
+    _emit("warn", msg, f"{YELLOW}WARN:{RESET} {msg}")
 
 def error(msg):
-    print(f"{RED}ERROR:{RESET} {msg}")
+    _emit("error", msg, f"{RED}ERROR:{RESET} {msg}")
 
 def debug(msg):
-    # print(f"{GREY}DEBUG: {msg}{RESET}")
-    pass
+    _emit("debug", msg, f"{GREY}DEBUG: {msg}{RESET}")
 
 def section(msg):
     line = "─" * 60
-    print(f"\n{CYAN}{line}")
-    print(f" {BOLD}{msg}{RESET}")
-    print(f"{CYAN}{line}{RESET}\n")
+    _emit("info", msg, f"\n{CYAN}{line}\n {BOLD}{msg}{RESET}\n{CYAN}{line}{RESET}\n", event="section")
 
 def dry_run(msg):
-    print(f"{MAGENTA}🔍 [DRY RUN]{RESET} {msg}")
+    _emit("info", msg, f"{MAGENTA}🔍 [DRY RUN]{RESET} {msg}", event="dry_run")
+
+def output(module, line):
+    """Installer output for module; goes to the log files only, callers display it themselves"""
+    if _sink is not None:
+        _sink.put({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "level": "info",
+                   "msg": ANSI_RE.sub("", line), "event": "output", "module": module})
 
 class Spinner:
+    """Single-task wrapper around core.progress, kept for existing callers"""
     def __init__(self, message="Processing..."):
         self.message = message
-        self.stop_running = False
-        self.thread = None
-
-    def _spin(self):
-        spinner_chars = itertools.cycle(['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏'])
-        while not self.stop_running:
-            sys.stdout.write(f"\r{CYAN}{next(spinner_chars)}{RESET} {self.message}")
-            sys.stdout.flush()
-            time.sleep(0.1)
+        self._display = None
+        self._owned = False
 
     def start(self):
-        self.stop_running = False
-        self.thread = threading.Thread(target=self._spin)
-        self.thread.start()
+        from core import progress
+        self._owned = _live is None
+        self._display = progress.ProgressRenderer().start() if self._owned else _live
+        self._display.add(id(self), self.message)
 
     def stop(self, success_msg=None):
-        self.stop_running = True
-        if self.thread:
-            self.thread.join()
-        sys.stdout.write("\r")
-        sys.stdout.flush()
+        if self._display:
+            self._display.finish(id(self))
+            if self._owned:
+                self._display.close()
+            self._display = None
         if success_msg:
-            print(f"{GREEN}✔{RESET} {success_msg}" + " " * 20) # Clear line residue
-        else:
-            print(" " * (len(self.message) + 10) + "\r", end="") # Clear line
\ No newline at end of file
+            console(f"{GREEN}✔{RESET} {success_msg}")
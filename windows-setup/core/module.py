@@ -1,17 +1,31 @@
 import os
+import re
 import json
-import subprocess
 import sys
+import threading
 from pathlib import Path
-from core import logger, package_manager
+from collections import Counter
+from core import logger, package_manager, catalog, depgraph, presets, search, trace
+
+# Serializes importing install.py plugins (see Module._load_plugin)
+_plugin_lock = threading.Lock()
+
+# What Module.install_step() decides an install comes down to
+STEP_INSTALLED = "installed"
+STEP_PLUGIN = "plugin"
+STEP_PYTHON = "python"
+STEP_POWERSHELL = "powershell"
+STEP_WINGET = "winget"
+STEP_PSMODULE = "psmodule"
+STEP_NONE = "none"
 
 class Module:
-    def __init__(self, path):
+    def __init__(self, path, meta=None):
         self.path = Path(path)
         self.meta_path = self.path / "meta.json"
         self.install_py = self.path / "install.py"
         self.install_ps1 = self.path / "install.ps1"
-        self.meta = self._load_meta()
+        self.meta = meta if meta is not None else self._load_meta()
         
         self.id = self.meta.get("id", "unknown")
         self.name = self.meta.get("name", self.path.name)
@@ -24,6 +38,14 @@ class Module:
         self.winget_id = self.meta.get("wingetId")
         self.install_method = self.meta.get("installMethod")
         self.ps_module = self.meta.get("psModule")
+        self.download_url = self.meta.get("downloadUrl")
+        # What install.py/install.ps1 downloads at install time, which offline bundles cannot carry
+        self.network = self.meta.get("network")
+        # Probes that tell whether the module is already installed (see core.detect)
+        self.detect = self.meta.get("detect")
+        # Trusted to run its install.py inside this process with --in-process
+        self.in_process = bool(self.meta.get("inProcess"))
+        self._plugin = None
 
     def _load_meta(self):
         if not self.meta_path.exists():
@@ -34,95 +56,263 @@ class Module:
             logger.error(f"Failed to load meta for {self.path}: {e}")
             return {}
 
-    def install(self, variant=None, dry_run=False):
+    def install(self, variant=None, dry_run=False, in_process=False):
+        item = f"{self.id}:{variant}" if variant else self.id
+        with trace.span(f"install {item}", "module", item=item):
+            return self._install(variant, dry_run, in_process)
+
+    def install_step(self, variant=None, dry_run=False, in_process=False):
+        """
+        What installing variant comes down to, as (step, detail). install()
+        and core.engine both decide through here:
+          STEP_INSTALLED   already there (detect probe or winget inventory);
+                           detail is the version if known. Not in dry runs.
+          STEP_PLUGIN      install.py inside this process (in_process and "inProcess")
+          STEP_PYTHON      install.py as a child process
+          STEP_POWERSHELL  install.ps1
+          STEP_WINGET      detail is the winget package id
+          STEP_PSMODULE    detail is the PowerShell module name
+          STEP_NONE        nothing to run
+        """
+        spec = self.detect_spec(variant)
+        if spec and not dry_run:
+            from core import detect
+            installed, version = detect.probe(spec)
+            if installed:
+                return STEP_INSTALLED, version
+
+        # Priority 1: install.py
+        if self.install_py.exists():
+            return (STEP_PLUGIN if in_process and self.in_process else STEP_PYTHON), None
+
+        # Priority 2: install.ps1 (Legacy support)
+        if self.install_ps1.exists():
+            return STEP_POWERSHELL, None
+
+        # Priority 3: Winget
+        target_winget = self.target_winget(variant)
+        if target_winget:
+            if not dry_run:
+                version = package_manager.get_winget_version(target_winget)
+                if version is not None:
+                    return STEP_INSTALLED, version or None
+            return STEP_WINGET, target_winget
+
+        # Priority 4: PS Module
+        if self.install_method == "psmodule":
+            return STEP_PSMODULE, self.ps_module_name()
+        return STEP_NONE, None
+
+    def _install(self, variant, dry_run, in_process=False):
         logger.section(f"Installing: {self.name} ({self.id}) {f'[v{variant}]' if variant else ''}")
-        
+
+        step, detail = self.install_step(variant, dry_run, in_process)
+        if step == STEP_INSTALLED:
+            logger.success(f"{self.name} is already installed{f' ({detail})' if detail else ''}.")
+            return True
+        if step == STEP_PLUGIN:
+            return self.run_plugin(dry_run, variant)
+        if step == STEP_PYTHON:
+            return self._run_python_installer(dry_run, variant)
+        if step == STEP_POWERSHELL:
+            return self._run_powershell_installer(dry_run, variant)
+        if step == STEP_WINGET:
+            return package_manager.install_winget(detail, f"{self.name} {variant if variant else ''}", dry_run)
+        if step == STEP_PSMODULE:
+            return package_manager.install_ps_module(detail, dry_run=dry_run)
+        # Nothing to run is not a failure; dependents may still proceed
+        logger.warn(f"No installation method found for {self.id}")
+        return True
+
+    def target_winget(self, variant=None):
         # Handle variants (e.g., Java 17 vs 21)
         # If variant is specified, look up specific config
-        target_winget = self.winget_id
-        
         if variant and isinstance(self.variants, dict) and variant in self.variants:
             v_data = self.variants[variant]
             if "wingetId" in v_data:
-                target_winget = v_data["wingetId"]
+                return v_data["wingetId"]
             # Add other variant overrides here if needed
+        return self.winget_id
 
-        # Priority 1: install.py
+    def detect_spec(self, variant=None):
+        """The "detect" block for variant, falling back to the module's own"""
+        if variant and isinstance(self.variants, dict) and "detect" in self.variants.get(variant, {}):
+            return self.variants[variant]["detect"]
+        return self.detect
+
+    def winget_package(self, variant=None):
+        """Winget package id when install() goes through winget, else None"""
+        if self.install_py.exists() or self.install_ps1.exists():
+            return None
+        return self.target_winget(variant)
+
+    def ps_module_name(self):
+        return self.ps_module or self.id.split(".")[-1]
+
+    def ps_module_package(self, variant=None):
+        """PowerShell module name when install() goes through Install-Module, else None"""
+        if self.install_py.exists() or self.install_ps1.exists() or self.target_winget(variant):
+            return None
+        return self.ps_module_name() if self.install_method == "psmodule" else None
+
+    def script_env(self, variant=None):
+        """Environment for running install.py as a child process"""
+        env = os.environ.copy()
+        if variant:
+            env["MODULE_VARIANT"] = variant
+        # Lets the script's logger write to this module's log file
+        env["OMSS_LOG_MODULE"] = f"{self.id}:{variant}" if variant else self.id
+        # Unbuffered, so the script's output arrives as it is written, and in UTF-8 whatever the locale
+        env["PYTHONUNBUFFERED"] = "1"
+        env["PYTHONIOENCODING"] = "utf-8"
+        return env
+
+    def install_command(self, variant=None):
+        """
+        (cmd, env) that installs this module, for callers that run the
+        process themselves (see core.engine). Same priority as install().
+        Returns None when there is nothing to run.
+        """
         if self.install_py.exists():
-            self._run_python_installer(dry_run, variant)
-        
-        # Priority 2: install.ps1 (Legacy support)
-        elif self.install_ps1.exists():
-            self._run_powershell_installer(dry_run, variant)
-            
-        # Priority 3: Winget
-        elif target_winget:
-            package_manager.install_winget(target_winget, f"{self.name} {variant if variant else ''}", dry_run)
+            return [sys.executable, str(self.install_py)], self.script_env(variant)
 
-        # Priority 4: PS Module
-        elif self.install_method == "psmodule":
-            mod_name = self.ps_module
-            if not mod_name:
-                mod_name = self.id.split(".")[-1]
-            package_manager.install_ps_module(mod_name, dry_run=dry_run)
-            
-        else:
-            logger.warn(f"No installation method found for {self.id}")
+        if self.install_ps1.exists():
+            cmd = ["pwsh", "-File", str(self.install_ps1)]
+            if variant:
+                cmd.extend(["-Variant", variant])
+            return cmd, None
+
+        target_winget = self.target_winget(variant)
+        if target_winget:
+            return package_manager.winget_install_command(target_winget), None
+
+        if self.install_method == "psmodule":
+            return package_manager.ps_module_install_command(self.ps_module_name()), None
+
+        return None
 
     def _run_python_installer(self, dry_run, variant):
         if dry_run:
             logger.dry_run(f"Execute Python script: {self.install_py}")
-            return
+            return True
 
+        import subprocess
         try:
-            env = os.environ.copy()
-            if dry_run:
-                env["DRY_RUN"] = "1"
-            if variant:
-                env["MODULE_VARIANT"] = variant
-            
+            env = self.script_env(variant)
             cmd = [sys.executable, str(self.install_py)]
             # If install.py accepts args, we can pass them. 
             # For now, let's assume env vars or no args.
-            
-            result = subprocess.run(cmd, env=env, check=True)
-            if result.returncode == 0:
-                logger.success(f"Installed {self.name} via script")
+            result = package_manager.run_streamed(cmd, f"install.py {self.id}", "installer", echo=True, env=env)
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, cmd)
+            logger.success(f"Installed {self.name} via script")
+            return True
         except Exception as e:
             logger.error(f"Installation script failed for {self.name}: {e}")
+            return False
+
+    def _load_plugin(self):
+        """Import install.py once per process; variants share the loaded module"""
+        with _plugin_lock:
+            if self._plugin is None:
+                import importlib.util
+                name = "omss_plugin_" + re.sub(r"\W", "_", self.id)
+                spec = importlib.util.spec_from_file_location(name, self.install_py)
+                plugin = importlib.util.module_from_spec(spec)
+                with trace.span(f"import install.py {self.id}", "installer"):
+                    spec.loader.exec_module(plugin)
+                self._plugin = plugin
+            return self._plugin
+
+    def run_plugin(self, dry_run, variant):
+        """
+        In-process counterpart of _run_python_installer for modules marked
+        "inProcess": true. install() receives variant and dry_run as keyword
+        arguments if it declares them, and sys.exit() becomes the result.
+        Only an explicit True (or exit status 0) counts as installed; None
+        means the outcome is unknown, so the journal will not skip it later.
+        """
+        import inspect
+        item = f"{self.id}:{variant}" if variant else self.id
+        try:
+            plugin = self._load_plugin()
+            params = inspect.signature(plugin.install).parameters
+            if dry_run and "dry_run" not in params:
+                logger.dry_run(f"Execute Python script: {self.install_py}")
+                return True
+            kwargs = {name: value for name, value in (("variant", variant), ("dry_run", dry_run)) if name in params}
+            # Log lines go to this module's log file, as they do from a child process
+            with logger.context(logger.current_module() or item), trace.span(f"install.py {self.id}", "installer"):
+                result = plugin.install(**kwargs)
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                logger.error(f"Installation script failed for {self.name}: exit status {e.code}")
+                return False
+            result = True if e.code == 0 else None
+        except Exception as e:
+            logger.error(f"Installation script failed for {self.name}: {e}")
+            return False
+
+        if result is False:
+            logger.error(f"Installation script failed for {self.name}")
+            return False
+        if dry_run:
+            return True
+        if result is not True:
+            logger.warn(f"install.py of {self.name} did not report success; it will run again next time")
+            return None
+        logger.success(f"Installed {self.name} via script")
+        return True
 
     def _run_powershell_installer(self, dry_run, variant):
         if dry_run:
             logger.dry_run(f"Execute PowerShell script: {self.install_ps1}")
-            return
+            return True
 
+        import subprocess
         try:
             cmd = ["pwsh", "-File", str(self.install_ps1)]
-            if dry_run:
-                cmd.append("-DryRun")
             if variant:
                 cmd.extend(["-Variant", variant])
             
-            result = subprocess.run(cmd, check=True)
-            if result.returncode == 0:
-                logger.success(f"Installed {self.name} via PowerShell")
+            result = package_manager.run_streamed(cmd, f"install.ps1 {self.id}", "pwsh", echo=True)
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, cmd)
+            logger.success(f"Installed {self.name} via PowerShell")
+            return True
         except Exception as e:
             logger.error(f"PowerShell script failed for {self.name}: {e}")
+            return False
 
 class ModuleManager:
-    def __init__(self, root_dir):
+    def __init__(self, root_dir, rebuild_index=False, state_dir=None):
         self.root_dir = Path(root_dir)
         self.modules_dir = self.root_dir / "modules"
         self.config_dir = self.root_dir / "config"
+        # Install journal and status cache; kept apart from config/ when that is temporary (bundles)
+        self.state_dir = Path(state_dir) if state_dir else self.config_dir
         self.presets_dir = self.root_dir / "presets"
+        self.index_file = self.config_dir / ".catalog-index.json"
+        self.rebuild_index = rebuild_index
         
         self.modules = {}
         self.categories = {}
         self.selected = set() # Set of "id" or "id:variant"
         self.context_items = {} # id:variant -> bool (checked state)
+        # base id -> number of selected items that pull it in as a dependency
+        self._dep_refs = Counter()
+        self.presets = presets.PresetStore(self.presets_dir)
+        # preset path -> number of its keys currently selected
+        self._preset_hits = {}
+        self._hits_generation = None
+        # Built on first search, so the CLI path never pays for it
+        self.search_index = None
 
         self._load_categories()
         self._load_modules()
+        self.deps = depgraph.DependencyIndex(self.modules)
+        for cycle in self.deps.cycles:
+            logger.warn(f"Dependency cycle: {' <-> '.join(cycle)}")
 
     def _load_categories(self):
         cat_file = self.config_dir / "categories.json"
@@ -138,8 +328,17 @@ class ModuleManager:
         if not self.modules_dir.exists():
             return
 
-        for meta_file in self.modules_dir.rglob("meta.json"):
-            mod = Module(meta_file.parent)
+        # Membership set for the category lists, so placing a module is O(1)
+        placed = set()
+        for top_cat, cat_data in self.categories.items():
+            for mod_id in cat_data.get("modules", []):
+                placed.add((top_cat, None, mod_id))
+            for sub_cat, sub_data in cat_data.get("subcategories", {}).items():
+                for mod_id in sub_data.get("modules", []):
+                    placed.add((top_cat, sub_cat, mod_id))
+
+        for mod_path, meta in catalog.scan(self.modules_dir, self.index_file, rebuild=self.rebuild_index):
+            mod = Module(mod_path, meta)
             if not mod.id:
                 continue
 
@@ -165,96 +364,140 @@ class ModuleManager:
                 if sub_cat not in target["subcategories"]:
                     target["subcategories"][sub_cat] = {"name": sub_cat.capitalize(), "modules": []}
                 
-                if mod.id not in target["subcategories"][sub_cat]["modules"]:
+                if (top_cat, sub_cat, mod.id) not in placed:
+                    placed.add((top_cat, sub_cat, mod.id))
                     target["subcategories"][sub_cat]["modules"].append(mod.id)
             else:
                 if "modules" not in target:
                     target["modules"] = []
-                if mod.id not in target["modules"]:
+                if (top_cat, None, mod.id) not in placed:
+                    placed.add((top_cat, None, mod.id))
                     target["modules"].append(mod.id)
 
     def get_module(self, mod_id):
         base_id = mod_id.split(":")[0]
         return self.modules.get(base_id)
 
+    def winget_packages(self, items, skip_installed=True):
+        """Winget package ids that installing items would fetch"""
+        packages = []
+        for item in items:
+            mod_id, _, variant = item.partition(":")
+            mod = self.modules.get(mod_id)
+            package_id = mod.winget_package(variant or None) if mod else None
+            if not package_id:
+                continue
+            if skip_installed and package_manager.get_winget_version(package_id) is not None:
+                continue
+            packages.append(package_id)
+        return packages
+
+    def ps_modules(self, items):
+        """PowerShell module names that installing items would check and install"""
+        names = []
+        for item in items:
+            mod_id, _, variant = item.partition(":")
+            mod = self.modules.get(mod_id)
+            name = mod.ps_module_package(variant or None) if mod else None
+            if name:
+                names.append(name)
+        return names
+
+    def search(self, query):
+        """Ranked module search: module id -> score (higher is better)"""
+        if self.search_index is None:
+            self.search_index = search.SearchIndex(self.modules, self.categories)
+        return self.search_index.search(query)
+
+    def _select(self, item_id):
+        if item_id in self.selected:
+            return
+        self.selected.add(item_id)
+        self._dep_refs.update(self.deps.closure(item_id))
+        if self._hits_generation == self.presets.generation:
+            for path in self.presets.containing(item_id):
+                self._preset_hits[path] += 1
+
+    def _deselect(self, item_id):
+        if item_id not in self.selected:
+            return
+        self.selected.discard(item_id)
+        if self._hits_generation == self.presets.generation:
+            for path in self.presets.containing(item_id):
+                self._preset_hits[path] -= 1
+        self._dep_refs.subtract(self.deps.closure(item_id))
+        for dep in self.deps.closure(item_id):
+            if self._dep_refs[dep] <= 0:
+                del self._dep_refs[dep]
+
+    def _clear_selection(self):
+        self.selected.clear()
+        self.context_items.clear()
+        self._dep_refs.clear()
+        self._hits_generation = None
+
     def toggle(self, item_id):
         if item_id in self.selected:
-            self.selected.discard(item_id)
+            self._deselect(item_id)
             self.context_items[item_id] = False
         else:
-            self.selected.add(item_id)
+            self._select(item_id)
             self.context_items[item_id] = True
 
     def remove_from_context(self, item_id):
-        self.selected.discard(item_id)
+        self._deselect(item_id)
         if item_id in self.context_items:
             del self.context_items[item_id]
 
     def resolve_dependencies(self):
-        result = []
-        visited = set()
-
-        def resolve(item_id):
-            base_id = item_id.split(":")[0]
-            if item_id in visited or base_id in visited:
-                return
-            
-            visited.add(item_id) # Simplify logic: treat variant as unique for visited? 
-            # Ideally we check if base_id installed.
-            
-            mod = self.get_module(base_id)
-            if mod:
-                for dep in mod.requires:
-                    # Resolve dep (assume no variant for dep for now)
-                    resolve(dep)
-            
-            result.append(item_id)
+        """
+        Install plan for the current selection, dependencies first.
+        Kept up to date by _select/_deselect, so this only sorts.
+        A dependency is satisfied by any selected variant of that module.
+        """
+        selected_bases = {depgraph.base_id(item) for item in self.selected}
+        plan = set(self.selected)
+        plan.update(dep for dep in self._dep_refs if dep not in selected_bases)
+        return sorted(plan, key=lambda item: (self.deps.rank(item), item))
 
-        for item in sorted(self.selected):
-            resolve(item)
-        return result
+    def is_preset_active(self, preset_file):
+        """A preset is active when every module it lists is selected"""
+        try:
+            preset = self.presets.get(preset_file)
+        except Exception:
+            return False
+        if not preset.keys:
+            return False
+        if self._hits_generation != self.presets.generation:
+            self._preset_hits = {
+                str(p.path): len(p.keys & self.selected) for p in self.presets.cached()
+            }
+            self._hits_generation = self.presets.generation
+        return self._preset_hits.get(str(preset.path), 0) == len(preset.keys)
 
     def load_preset(self, preset_file, clear_selection=True):
         if clear_selection:
-            self.selected.clear()
-            self.context_items.clear()
+            self._clear_selection()
 
         try:
-            data = json.loads(preset_file.read_text(encoding='utf-8'))
-            for entry in data.get("modules", []):
-                # Preset format: { "modules": [ "id", ... ] } OR { "modules": [ {"id": "...", "params": {...}}, ... ] }
-                # My previous presets were simple lists of IDs. linux-setup uses objects.
-                # Let's support both.
-                if isinstance(entry, str):
-                    mod_id = entry
-                    version = ""
-                    selected = True
-                else:
-                    mod_id = entry.get("id")
-                    version = entry.get("params", {}).get("version", "")
-                    selected = entry.get("params", {}).get("selected", True)
-
-                key = f"{mod_id}:{version}" if version else mod_id
-                
-                self.context_items[key] = selected
-                if selected:
-                    self.selected.add(key)
-                elif not clear_selection:
-                    self.selected.discard(key)
+            preset = self.presets.get(preset_file)
         except Exception as e:
             logger.error(f"Failed to load preset {preset_file}: {e}")
+            return
+
+        for key, selected in preset.entries:
+            self.context_items[key] = selected
+            if selected:
+                self._select(key)
+            elif not clear_selection:
+                self._deselect(key)
 
     def unload_preset(self, preset_file):
         try:
-            data = json.loads(preset_file.read_text(encoding='utf-8'))
-            for entry in data.get("modules", []):
-                mod_id = entry if isinstance(entry, str) else entry.get("id")
-                version = ""
-                if not isinstance(entry, str):
-                    version = entry.get("params", {}).get("version", "")
-                
-                key = f"{mod_id}:{version}" if version else mod_id
-                self.selected.discard(key)
-                self.context_items[key] = False
-        except:
-            pass
\ No newline at end of file
+            preset = self.presets.get(preset_file)
+        except Exception:
+            return
+
+        for key, _ in preset.entries:
+            self._deselect(key)
+            self.context_items[key] = False
@@ -1,10 +1,384 @@
-import subprocess
+import os
+import json
+import time
 import shutil
-from core import logger
+import threading
+from core import logger, trace
+
+# Installed winget packages: lowercased package id -> version ("" if unknown).
+# Snapshotted once per run by load_winget_inventory().
+_winget_inventory = None
+# False when `winget export` could not be read: the snapshot is empty, not "nothing installed"
+_inventory_complete = True
+_inventory_lock = threading.Lock()
+
+# Every winget call is pinned to this source, so the msstore source is never queried
+WINGET_SOURCE = "winget"
+# Set once `winget source update` ran (or was skipped within its TTL) in this run; inherited by
+# installer scripts and cleared by end_source_refresh() when the run ends
+SOURCE_REFRESHED_VAR = "OMSS_WINGET_SOURCE_REFRESHED"
+DEFAULT_SOURCE_TTL = 3600  # seconds; wingetSource.ttl in config/settings.json
+# Set for offline (bundle) runs, which skip the source refresh and the inventory export
+OFFLINE_VAR = "OMSS_OFFLINE"
+_source_lock = threading.Lock()
+
+# Active WingetPrefetcher for this run, if any (see start_prefetch)
+_prefetcher = None
+# winget package id (lowercase) -> directory holding its downloaded installer (offline bundles)
+_local_packages = {}
+# Windows Installer allows one install at a time; MSI-based installers take turns
+msi_lock = threading.Lock()
+
+# Silent switches by winget InstallerType, used when the manifest declares none
+SILENT_SWITCHES = {
+    "inno": ["/VERYSILENT", "/SUPPRESSMSGBOXES", "/NORESTART", "/SP-"],
+    "nullsoft": ["/S"],
+    "burn": ["/quiet", "/norestart"],
+}
+MSI_INSTALLER_TYPES = ("msi", "wix", "burn")
+# Exit codes that mean the installer succeeded (3010: reboot required)
+INSTALLER_OK_CODES = (0, 3010)
 
 def is_installed(command):
     return shutil.which(command) is not None
 
+def _run(cmd, step, cat, **kwargs):
+    """subprocess.run (recorded/replayed by core.proc) inside a trace span named step"""
+    from core import proc
+    with trace.span(step, cat, cmd=" ".join(str(c) for c in cmd)):
+        return proc.run(cmd, **kwargs)
+
+def run_streamed(cmd, step, cat, echo=False, env=None):
+    """
+    Run cmd with its output relayed line by line through core.progress:
+    progress frames update the caller's progress row, other lines go to the
+    module log and, with echo, to the console. stderr is merged into stdout.
+    Returns a CompletedProcess whose stdout holds the non-progress lines.
+    """
+    import subprocess
+    from core import progress, proc
+    module = logger.current_module()
+    lines = []
+
+    def on_line(line):
+        if not line.strip():
+            return
+        progress.task_output(line, echo=echo)
+        if progress.parse_percent(line) is None:
+            lines.append(line)
+            if module:
+                logger.output(module, line)
+
+    with trace.span(step, cat, cmd=" ".join(str(c) for c in cmd)):
+        returncode = proc.stream(cmd, on_line, env=env)
+    return subprocess.CompletedProcess(cmd, returncode, "\n".join(lines), "")
+
+def _winget_exe():
+    # Resolve through PATH so a stub winget can stand in for the real one
+    return shutil.which("winget") or "winget"
+
+def _source_stamp():
+    local = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(local, "omss", "winget-source-update")
+
+def refresh_winget_sources(ttl=None):
+    """
+    Run `winget source update` once per run, before any other winget call,
+    unless it already ran within ttl seconds (wingetSource.ttl in settings).
+    Later calls in the run, including from installer scripts, skip it. This
+    only covers our own update: winget still refreshes the source by itself
+    when its autoUpdateIntervalInMinutes (5 by default, in winget's own
+    settings.json) has passed, which this leaves alone.
+    Timed under the "winget-source" trace category, apart from installs.
+    """
+    with _source_lock:
+        if os.environ.get(SOURCE_REFRESHED_VAR) or os.environ.get(OFFLINE_VAR):
+            return
+        os.environ[SOURCE_REFRESHED_VAR] = "1"
+
+        if ttl is None:
+            try:
+                with open(logger.SETTINGS_FILE, "r", encoding="utf-8") as f:
+                    ttl = json.load(f).get("wingetSource", {}).get("ttl", DEFAULT_SOURCE_TTL)
+            except (OSError, ValueError):
+                ttl = DEFAULT_SOURCE_TTL
+        stamp = _source_stamp()
+        try:
+            age = time.time() - os.path.getmtime(stamp)
+        except OSError:
+            age = None
+        if age is not None and age < ttl:
+            logger.debug(f"winget source refreshed {int(age)}s ago, skipping update")
+            return
+
+        cmd = [_winget_exe(), "source", "update", "--name", WINGET_SOURCE, "--disable-interactivity"]
+        started = time.perf_counter()
+        try:
+            result = _run(cmd, "winget source update", "winget-source", capture_output=True, text=True)
+        except OSError as e:
+            logger.warn(f"Could not update winget sources: {e}")
+            return
+        if result.returncode != 0:
+            logger.warn(f"winget source update exited with {result.returncode}")
+            return
+        os.makedirs(os.path.dirname(stamp), exist_ok=True)
+        with open(stamp, "w", encoding="utf-8"):
+            pass
+        logger.info(f"Updated winget source in {time.perf_counter() - started:.1f}s")
+
+def end_source_refresh():
+    """Call when a run ends, so the next run in this process checks the source TTL again"""
+    with _source_lock:
+        os.environ.pop(SOURCE_REFRESHED_VAR, None)
+
+def load_winget_inventory(refresh=False):
+    """
+    Snapshot installed winget packages with a single `winget export`.
+    Returns the cached index unless refresh is requested.
+    """
+    import tempfile
+    global _winget_inventory, _inventory_complete
+    with _inventory_lock:
+        if _winget_inventory is not None and not refresh:
+            return _winget_inventory
+
+        inventory = {}
+        _inventory_complete = True
+        if os.environ.get(OFFLINE_VAR):
+            # Bundled installers run regardless; winget is not asked what is installed
+            _winget_inventory = inventory
+            return inventory
+        tmp_dir = tempfile.mkdtemp(prefix="omss-winget-")
+        export_file = os.path.join(tmp_dir, "installed.json")
+        cmd = [_winget_exe(), "export", "-o", export_file, "--include-versions", "--source", WINGET_SOURCE,
+               "--accept-source-agreements", "--disable-interactivity"]
+        try:
+            # Non-zero exit is common (packages without a source); the file is still written
+            _run(cmd, "winget export", "winget", outputs=[export_file], capture_output=True, text=True)
+            with open(export_file, "r", encoding="utf-8-sig") as f:
+                data = json.load(f)
+            for source in data.get("Sources", []):
+                for pkg in source.get("Packages", []):
+                    pkg_id = pkg.get("PackageIdentifier")
+                    if pkg_id:
+                        inventory[pkg_id.lower()] = pkg.get("Version", "")
+            logger.debug(f"Winget inventory: {len(inventory)} packages")
+        except Exception as e:
+            logger.warn(f"Could not read winget inventory: {e}")
+            _inventory_complete = False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        _winget_inventory = inventory
+        return inventory
+
+def get_winget_version(package_id):
+    """Installed version of a winget package, or None if it is not installed"""
+    return load_winget_inventory().get(package_id.lower())
+
+def winget_inventory_complete():
+    """Whether get_winget_version() can be trusted to report a package as missing"""
+    load_winget_inventory()
+    return _inventory_complete
+
+def winget_install_command(package_id):
+    return [_winget_exe(), "install", "--id", package_id, "--source", WINGET_SOURCE,
+            "--accept-package-agreements", "--accept-source-agreements", "--silent"]
+
+def winget_succeeded(returncode, output):
+    """winget reports an up-to-date package as a failure; treat it as success"""
+    return returncode == 0 or "No newer version found" in output
+
+def record_winget_install(package_id):
+    # Update the snapshot in place instead of re-exporting after every install
+    with _inventory_lock:
+        if _winget_inventory is not None:
+            _winget_inventory.setdefault(package_id.lower(), "")
+
+def ps_module_install_command(name, scope="CurrentUser"):
+    """Single pwsh invocation that installs a PS module unless it is already available"""
+    from core.pwsh import quote
+    script = (
+        f"if (Get-Module -ListAvailable -Name {quote(name)}) {{ Write-Output {quote(f'PS Module {name} is already installed.')} }} "
+        f"else {{ Install-Module -Name {quote(name)} -Scope {quote(scope)} -Force -AllowClobber }}"
+    )
+    return ["pwsh", "-NoProfile", "-Command", script]
+
+def winget_available_version(package_id):
+    """Latest version winget would install, or None if it cannot tell"""
+    cmd = [_winget_exe(), "show", "--id", package_id, "--exact", "--source", WINGET_SOURCE,
+           "--accept-source-agreements", "--disable-interactivity"]
+    try:
+        result = _run(cmd, f"winget show {package_id}", "winget", capture_output=True, text=True)
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    for line in result.stdout.splitlines():
+        key, sep, value = line.strip().partition(":")
+        if sep and key == "Version":
+            return value.strip()
+    return None
+
+def winget_download_command(package_id, dest_dir):
+    return [_winget_exe(), "download", "--id", package_id, "--source", WINGET_SOURCE, "--download-directory", str(dest_dir),
+            "--accept-package-agreements", "--accept-source-agreements", "--disable-interactivity"]
+
+def _manifest_fields(manifest_file, keys):
+    # The merged manifest written by `winget download` covers a single
+    # installer, so the first occurrence of each key is the one we want.
+    fields = {}
+    with open(manifest_file, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            key, sep, value = line.strip().partition(":")
+            if sep and key in keys and key not in fields:
+                fields[key] = value.strip().strip("'\"")
+    return fields
+
+def downloaded_version(download_dir):
+    """PackageVersion from the manifest `winget download` wrote, or None"""
+    for name in sorted(os.listdir(download_dir)):
+        if name.endswith(".yaml"):
+            return _manifest_fields(os.path.join(download_dir, name), ("PackageVersion",)).get("PackageVersion")
+    return None
+
+def local_installer_command(download_dir):
+    """
+    (cmd, uses_msi) that silently runs an installer fetched by `winget download`,
+    or None when it needs winget itself (archives, portable apps, exe without switches).
+    """
+    files = sorted(os.listdir(download_dir))
+    manifests = [f for f in files if f.endswith(".yaml")]
+    installers = [f for f in files if not f.endswith(".yaml")]
+    if not manifests or len(installers) != 1:
+        return None
+
+    installer = os.path.join(download_dir, installers[0])
+    fields = _manifest_fields(os.path.join(download_dir, manifests[0]),
+                              ("InstallerType", "Silent", "Custom", "NestedInstallerType"))
+    installer_type = fields.get("InstallerType", "").lower()
+    if fields.get("NestedInstallerType"):
+        return None
+
+    if installer_type in ("msi", "wix"):
+        cmd = ["msiexec", "/i", installer, "/qn", "/norestart"]
+    elif installer_type in ("msix", "appx"):
+        cmd = ["pwsh", "-NoProfile", "-Command", f"Add-AppxPackage -Path '{installer}'"]
+    else:
+        switches = fields["Silent"].split() if fields.get("Silent") else SILENT_SWITCHES.get(installer_type)
+        if switches is None:
+            return None
+        cmd = [installer] + switches
+    if fields.get("Custom"):
+        cmd += fields["Custom"].split()
+    return cmd, installer_type in MSI_INSTALLER_TYPES
+
+class WingetPrefetcher:
+    """
+    Downloads winget packages concurrently (`winget download`) while the
+    install stage works through the plan. get() waits for one package.
+    Packages already in the artifact cache are copied from there instead.
+    """
+    def __init__(self, package_ids, concurrency=4):
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+        self.root = tempfile.mkdtemp(prefix="omss-prefetch-")
+        self._pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="prefetch")
+        self._futures = {}
+        for package_id in dict.fromkeys(package_ids):
+            self._futures[package_id.lower()] = self._pool.submit(self._download, package_id)
+
+    def _download(self, package_id):
+        from core import cache
+        dest = os.path.join(self.root, package_id)
+        store = cache.get_cache()
+        version = winget_available_version(package_id)
+        if version and store.materialize(package_id, version, dest):
+            logger.debug(f"Prefetch cache hit for {package_id} {version}")
+            return dest
+
+        result = _run(winget_download_command(package_id, dest), f"winget download {package_id}", "download",
+                      capture_output=True, text=True)
+        if result.returncode != 0 or not os.path.isdir(dest):
+            logger.debug(f"Prefetch failed for {package_id}: {result.stdout.strip()}")
+            return None
+        try:
+            files = [os.path.join(dest, name) for name in sorted(os.listdir(dest))]
+            store.store(package_id, downloaded_version(dest) or version, files)
+        except OSError as e:
+            logger.debug(f"Could not cache {package_id}: {e}")
+        return dest
+
+    def get(self, package_id):
+        """Download directory for package_id, or None if it was not (or could not be) fetched"""
+        future = self._futures.get(package_id.lower())
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def close(self):
+        # Drop downloads that have not started; wait for the ones in flight
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+def start_prefetch(package_ids, concurrency=4):
+    global _prefetcher
+    stop_prefetch()
+    package_ids = [p for p in package_ids if p.lower() not in _local_packages]
+    if package_ids:
+        _prefetcher = WingetPrefetcher(package_ids, concurrency)
+    return _prefetcher
+
+def stop_prefetch():
+    global _prefetcher
+    if _prefetcher:
+        _prefetcher.close()
+        _prefetcher = None
+
+def set_offline():
+    """Skip the winget calls that need the network; inherited by installer scripts"""
+    os.environ[OFFLINE_VAR] = "1"
+
+def use_local_packages(package_dirs):
+    """Serve installs of these packages ({id: download dir}) from disk, e.g. from a bundle"""
+    _local_packages.update({package_id.lower(): path for package_id, path in package_dirs.items()})
+
+def prefetched_install_command(package_id):
+    """Wait for a prefetched package; (cmd, uses_msi) for its local installer, or None"""
+    download_dir = _local_packages.get(package_id.lower())
+    if download_dir is None:
+        if _prefetcher is None:
+            return None
+        download_dir = _prefetcher.get(package_id)
+    if not download_dir:
+        return None
+    try:
+        return local_installer_command(download_dir)
+    except OSError:
+        return None
+
+def _install_prefetched(package_id, name):
+    local = prefetched_install_command(package_id)
+    if not local:
+        return False
+    cmd, uses_msi = local
+    try:
+        if uses_msi:
+            with trace.span("wait for msi lock", "installer"), msi_lock:
+                result = _run(cmd, f"installer {package_id}", "installer", capture_output=True, text=True)
+        else:
+            result = _run(cmd, f"installer {package_id}", "installer", capture_output=True, text=True)
+    except OSError as e:
+        logger.warn(f"Could not run downloaded installer for {name}: {e}")
+        return False
+    if result.returncode in INSTALLER_OK_CODES:
+        return True
+    logger.warn(f"Downloaded installer for {name} exited with {result.returncode}, retrying with winget")
+    return False
+
 def install_winget(package_id, name=None, dry_run=False):
     if name is None:
         name = package_id
@@ -15,53 +389,82 @@ def install_winget(package_id, name=None, dry_run=False):
 
     logger.info(f"Installing {name} (ID: {package_id})...")
 
-    # Check if already installed via winget list
-    # Note: winget list can be slow.
-    
-    cmd = ["winget", "install", "--id", package_id, "--accept-package-agreements", "--accept-source-agreements", "--silent"]
+    if _install_prefetched(package_id, name):
+        logger.success(f"Installed {name}")
+        record_winget_install(package_id)
+        return True
+
+    refresh_winget_sources()
+    cmd = winget_install_command(package_id)
     
     try:
         # We can try 'list' first or just run install. Install is usually idempotent-ish or fails gracefully.
         # But 'winget install' fails if already installed? No, it usually says "already installed".
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = run_streamed(cmd, f"winget install {package_id}", "winget")
         
         if result.returncode == 0:
             logger.success(f"Installed {name}")
+            record_winget_install(package_id)
             return True
-        elif "No newer version found" in result.stdout:
+        elif winget_succeeded(result.returncode, result.stdout):
              logger.success(f"{name} is already installed (latest).")
+             record_winget_install(package_id)
              return True
         else:
             logger.error(f"Failed to install {name}")
             logger.error(result.stdout)
-            logger.error(result.stderr)
             return False
     except Exception as e:
         logger.error(f"Error running winget: {e}")
         return False
 
+def load_ps_module_inventory(names):
+    """One batched Get-Module for a whole plan instead of a pwsh start per module"""
+    if not names:
+        return
+    from core import pwsh
+    try:
+        pwsh.get_session().available_modules(names)
+    except OSError as e:
+        logger.warn(f"Could not query PowerShell modules: {e}")
+
+def ensure_ps_module(name, scope="CurrentUser", on_line=None):
+    """
+    Install a PS module through the shared pwsh session unless it is already
+    available. Returns a CompletedProcess; raises OSError if pwsh cannot run.
+    """
+    import subprocess
+    from core import pwsh
+    session = pwsh.get_session()
+    if session.available_modules([name]):
+        message = f"PS Module {name} is already installed."
+        if on_line:
+            on_line(message)
+        return subprocess.CompletedProcess(name, 0, message, "")
+    script = f"Install-Module -Name {pwsh.quote(name)} -Scope {pwsh.quote(scope)} -Force -AllowClobber"
+    result = session.run(script, f"pwsh Install-Module {name}", on_line=on_line)
+    if result.returncode == 0:
+        session.mark_available(name)
+    return result
+
 def install_ps_module(name, scope="CurrentUser", dry_run=False):
     if dry_run:
         logger.dry_run(f"Install PS Module: {name}")
         return True
 
+    from core import pwsh
     logger.info(f"Installing PowerShell module: {name}...")
-    
-    # Check if installed
-    check_cmd = ["pwsh", "-NoProfile", "-Command", f"if (Get-Module -ListAvailable -Name {name}) {{ exit 0 }} else {{ exit 1 }}"]
-    if subprocess.run(check_cmd).returncode == 0:
-        logger.success(f"PS Module {name} is already installed.")
-        return True
-
-    # Install
-    cmd = ["pwsh", "-NoProfile", "-Command", f"Install-Module -Name {name} -Scope {scope} -Force -AllowClobber"]
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        # Availability is usually cached by the batched query at the start of the run
+        if pwsh.get_session().available_modules([name]):
+            logger.success(f"PS Module {name} is already installed.")
+            return True
+        result = ensure_ps_module(name, scope)
         if result.returncode == 0:
             logger.success(f"Installed PS Module {name}")
             return True
         else:
-            logger.error(f"Failed to install PS Module {name}: {result.stderr}")
+            logger.error(f"Failed to install PS Module {name}: {result.stdout}")
             return False
     except Exception as e:
         logger.error(f"Error installing PS module: {e}")
@@ -0,0 +1,176 @@
+import os
+import re
+import json
+import heapq
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from core import logger, detect, journal, package_manager
+from core.progress import format_elapsed
+from core.scheduler import build_graph, split_item
+
+INSTALL = "install"
+UPGRADE = "upgrade"
+SKIP = "skip"
+
+# Estimate for a module that has never run here, when no other module has either
+DEFAULT_SECONDS = 60.0
+
+def _depths(graph, items):
+    """Item -> longest chain of dependencies below it (0 for items with none in the plan)"""
+    depth = {}
+    for item in items:
+        # Plans are resolved dependencies first; anything else counts from 0
+        depth[item] = 1 + max((depth.get(dep, 0) for dep in graph[item]), default=-1)
+    return depth
+
+def _simulate(items, graph, seconds, jobs):
+    """Wall time of running items on `jobs` workers, each starting once its dependencies are done"""
+    workers = [0.0] * max(1, jobs)
+    finish = {}
+    for item in items:
+        ready = max((finish.get(dep, 0.0) for dep in graph[item]), default=0.0)
+        free = heapq.heappop(workers)
+        finish[item] = max(ready, free) + seconds[item]
+        heapq.heappush(workers, finish[item])
+    return max(finish.values(), default=0.0)
+
+def _version_key(version):
+    return tuple(int(part) for part in re.findall(r"\d+", version))
+
+def _available_versions(manager, status):
+    """
+    item -> newer version winget offers, for installed winget packages whose
+    version is known. One `winget show` per package, run concurrently.
+    """
+    if os.environ.get(package_manager.OFFLINE_VAR):
+        return {}
+    packages = {}
+    for item, item_status in status.items():
+        if item_status["installed"] and item_status["source"] == "winget" and item_status["version"]:
+            mod_id, variant = split_item(item)
+            packages[item] = manager.get_module(mod_id).winget_package(variant)
+    if not packages:
+        return {}
+    with ThreadPoolExecutor(detect.MAX_WORKERS) as pool:
+        available = dict(zip(packages, pool.map(package_manager.winget_available_version, packages.values())))
+    return {item: version for item, version in available.items()
+            if version and _version_key(version) > _version_key(status[item]["version"])}
+
+def build_plan(manager, items, jobs=1, force=False, use_cache=True):
+    """
+    What a real run of items would do, without running anything:
+      skip     completed by an earlier run, or already installed per detection
+      upgrade  installed by an earlier run, but it will run again (definition
+               changed or detection no longer finds it), or a winget package
+               with a newer version available
+      install  everything else
+    with each item's place in the dependency graph and a time estimate
+    from the install journal.
+    """
+    items = list(dict.fromkeys(items))
+    graph = build_graph(manager, items)
+    depth = _depths(graph, items)
+    dependents = {item: 0 for item in items}
+    for deps in graph.values():
+        for dep in deps:
+            dependents[dep] += 1
+
+    install_journal = journal.InstallJournal.for_manager(manager)
+    completed = set() if force else install_journal.completed(manager, items)
+    status = detect.scan(manager, [item for item in items if item not in completed], use_cache)
+    available = _available_versions(manager, status)
+
+    entries = []
+    history = {}
+    for item in items:
+        mod_id, _ = split_item(item)
+        mod = manager.get_module(mod_id)
+        last = install_journal.last(item)
+        item_status = status.get(item, {"installed": None, "version": None, "source": None})
+        if item in completed:
+            action, reason = SKIP, "completed in a previous run"
+        elif item in available:
+            action, reason = UPGRADE, f"{item_status['version']} installed, {available[item]} available"
+        elif item_status["installed"]:
+            version = item_status["version"]
+            action, reason = SKIP, f"already installed{f' ({version})' if version else ''}"
+        elif last and last.get("ok") and mod:
+            action = UPGRADE
+            if force:
+                reason = "reinstall (--force)"
+            elif last.get("hash") != journal.definition_hash(mod):
+                reason = "module definition changed since the last run"
+            else:
+                reason = "installed by an earlier run, no longer detected"
+        elif mod:
+            action = INSTALL
+            if item_status["installed"] is False:
+                reason = "not installed"
+            elif item_status["source"]:
+                reason = f"status unknown ({item_status['source']} check failed), installer decides"
+            else:
+                reason = "no detection, installer decides"
+        else:
+            action, reason = SKIP, "module not found"
+
+        if last and last.get("ok") and last.get("seconds") is not None:
+            history[item] = float(last["seconds"])
+        entries.append({
+            "item": item,
+            "name": mod.name if mod else item,
+            "action": action,
+            "reason": reason,
+            "installed": item_status["installed"],
+            "version": item_status["version"],
+            "depth": depth[item],
+            "requires": sorted(graph[item]),
+            "dependents": dependents[item],
+            "estimate": history.get(item) if action != SKIP else 0.0,
+        })
+
+    # Modules without history are assumed to take as long as a typical one that has
+    fallback = statistics.median(history.values()) if history else DEFAULT_SECONDS
+    seconds = {e["item"]: e["estimate"] if e["estimate"] is not None else fallback for e in entries}
+    counts = {action: sum(1 for e in entries if e["action"] == action) for action in (INSTALL, UPGRADE, SKIP)}
+    return {
+        "jobs": jobs,
+        "items": entries,
+        "summary": dict(
+            counts,
+            eta_seconds=round(_simulate(items, graph, seconds, jobs), 1),
+            serial_seconds=round(sum(seconds.values()), 1),
+            without_history=sum(1 for e in entries if e["estimate"] is None),
+        ),
+    }
+
+def print_plan(plan, fmt="text"):
+    if fmt == "json":
+        print(json.dumps(plan, indent=2, ensure_ascii=False))
+        return
+
+    entries = plan["items"]
+    summary = plan["summary"]
+    logger.section(f"Plan ({len(entries)} modules, {plan['jobs']} jobs)")
+    # Names are indented by depth so the dependency structure shows
+    width = max((2 * e["depth"] + len(e["item"]) for e in entries), default=0)
+    colors = {INSTALL: logger.GREEN, UPGRADE: logger.YELLOW, SKIP: ""}
+    for number, e in enumerate(entries, 1):
+        if e["action"] == SKIP:
+            estimate = "-"
+        elif e["estimate"] is None:
+            estimate = "?"
+        else:
+            estimate = format_elapsed(e["estimate"])
+        name = "  " * e["depth"] + e["item"]
+        color = colors[e["action"]]
+        action = f"{color}{e['action']:<7}{logger.RESET if color else ''}"
+        logger.console(f"  {number:>3}  {action}  {name:<{width}}  {estimate:>6}  {e['reason']}")
+
+    eta = format_elapsed(summary["eta_seconds"])
+    serial = format_elapsed(summary["serial_seconds"])
+    logger.console("")
+    logger.info(f"{summary[INSTALL]} install, {summary[UPGRADE]} upgrade, {summary[SKIP]} skip"
+                f" - ETA {eta} with {plan['jobs']} jobs ({serial} one at a time)")
+    if summary["without_history"]:
+        logger.info(f"{summary['without_history']} modules have no recorded install time; "
+                    f"their estimate is a typical module's time")
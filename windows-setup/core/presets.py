@@ -0,0 +1,98 @@
+import os
+import json
+from pathlib import Path
+
+def entry_key(entry):
+    """
+    Preset format: { "modules": [ "id", ... ] } OR { "modules": [ {"id": "...", "params": {...}}, ... ] }
+    Returns (key, selected) where key is "id" or "id:version".
+    """
+    if isinstance(entry, str):
+        return entry, True
+    params = entry.get("params", {})
+    mod_id = entry.get("id")
+    version = params.get("version", "")
+    key = f"{mod_id}:{version}" if version else mod_id
+    return key, params.get("selected", True)
+
+class Preset:
+    def __init__(self, path, data, stamp):
+        self.path = Path(path)
+        self.file_name = self.path.name
+        self.name = self.path.stem
+        self.title = data.get("name", self.name)
+        self.description = data.get("description", "")
+        self.entries = [entry_key(entry) for entry in data.get("modules", [])]
+        self.keys = frozenset(key for key, _ in self.entries)
+        self.stamp = stamp
+
+class PresetStore:
+    """
+    Parses each preset file once and re-parses it only when its mtime or
+    size changes. `generation` is bumped whenever any cached preset
+    changes, so callers can tell when derived state must be recomputed.
+    """
+    def __init__(self, presets_dir):
+        self.presets_dir = Path(presets_dir)
+        self.generation = 0
+        self._presets = {}  # str(path) -> Preset
+        self._listing = []
+        self._dir_mtime = None
+        # item key -> set of preset paths (str); rebuilt on first use after a change
+        self._by_key = None
+
+    def get(self, path):
+        """Return the Preset for path. Raises if it cannot be read or parsed."""
+        path = Path(path)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._presets.get(str(path))
+        if cached and cached.stamp == stamp:
+            return cached
+
+        data = json.loads(path.read_text(encoding="utf-8"))
+        preset = Preset(path, data, stamp)
+        self._presets[str(path)] = preset
+        self._changed()
+        return preset
+
+    def all(self):
+        """Every readable preset in presets_dir, sorted by name"""
+        if not self.presets_dir.exists():
+            return []
+        mtime = os.stat(self.presets_dir).st_mtime_ns
+        if mtime != self._dir_mtime:
+            self._dir_mtime = mtime
+            self._listing = sorted(self.presets_dir.glob("*.json"))
+            listed = {str(p) for p in self._listing}
+            for path in list(self._presets):
+                if Path(path).parent == self.presets_dir and path not in listed:
+                    del self._presets[path]
+            self._changed()
+
+        presets = []
+        for path in self._listing:
+            try:
+                presets.append(self.get(path))
+            except Exception:
+                pass
+        return presets
+
+    def cached(self):
+        """Presets parsed so far, without touching the filesystem"""
+        return list(self._presets.values())
+
+    def containing(self, key):
+        """Paths (str) of cached presets that list key"""
+        if self._by_key is None:
+            by_key = {}
+            for preset in self._presets.values():
+                for preset_key in preset.keys:
+                    by_key.setdefault(preset_key, set()).add(str(preset.path))
+            self._by_key = by_key
+        return self._by_key.get(key, ())
+
+    def _changed(self):
+        # Parsing a whole directory calls this once per preset, so the map is built lazily
+        self.generation += 1
+        self._by_key = None
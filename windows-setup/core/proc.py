@@ -0,0 +1,251 @@
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+import subprocess
+
+# Set by configure() and inherited by installer scripts, so their calls are recorded/replayed too
+RECORD_VAR = "OMSS_RECORD"
+REPLAY_VAR = "OMSS_REPLAY"
+SCALE_VAR = "OMSS_REPLAY_SCALE"
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_lock = threading.Lock()
+# Replay file -> {key: [recordings in call order]}, and how many of each were served
+_recordings = {}
+_served = {}
+
+def configure(record=None, replay=None, scale=None):
+    """
+    Record every external command to a JSONL file, or serve them from one
+    instead of running anything. scale multiplies the recorded durations
+    (0 replays instantly).
+    """
+    if record:
+        os.environ[RECORD_VAR] = os.path.abspath(record)
+    if replay:
+        os.environ[REPLAY_VAR] = os.path.abspath(replay)
+    if scale is not None:
+        os.environ[SCALE_VAR] = str(scale)
+
+def recording():
+    return bool(os.environ.get(RECORD_VAR)) and not replaying()
+
+def replaying():
+    return bool(os.environ.get(REPLAY_VAR))
+
+def _scale():
+    try:
+        return max(0.0, float(os.environ.get(SCALE_VAR, "1")))
+    except ValueError:
+        return 1.0
+
+def _normalize_arg(arg, tmp_root):
+    """Machine-specific parts of an argument replaced, so a recording matches on another machine"""
+    value = str(arg)
+    folded = value.replace("\\", "/")
+    lowered = folded.lower()
+    if lowered.startswith(tmp_root + "/"):
+        # Drop the random mkdtemp directory as well
+        rest = folded[len(tmp_root) + 1:].split("/", 1)
+        return "<tmp>/" + (rest[1] if len(rest) > 1 else "")
+    root = ROOT_DIR.replace("\\", "/").lower()
+    if lowered.startswith(root + "/"):
+        return "<root>/" + folded[len(root) + 1:]
+    return value
+
+def key(cmd):
+    """
+    Lookup key of a command: the program name without directory, extension
+    or version suffix (python3.11 -> python), then the arguments with temp
+    and windows-setup paths made relative.
+    """
+    if isinstance(cmd, str):
+        cmd = cmd.split()
+    tmp_root = tempfile.gettempdir().replace("\\", "/").lower().rstrip("/")
+    program = re.split(r"[\\/]", str(cmd[0]))[-1].lower()
+    program = re.sub(r"\.exe$", "", program)
+    program = re.sub(r"[\d.]+$", "", program) or program
+    return [program] + [_normalize_arg(arg, tmp_root) for arg in cmd[1:]]
+
+def _text(value):
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+def record(cmd, returncode, stdout, stderr, seconds, outputs=()):
+    """Append one call to the recording; outputs are files the command wrote, saved with it"""
+    files = {}
+    tmp_root = tempfile.gettempdir().replace("\\", "/").lower().rstrip("/")
+    for path in outputs:
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                files[_normalize_arg(path, tmp_root)] = f.read()
+        except (OSError, UnicodeDecodeError):
+            pass
+    entry = {
+        "key": key(cmd),
+        "cmd": [str(c) for c in cmd] if not isinstance(cmd, str) else cmd,
+        "returncode": returncode,
+        "stdout": _text(stdout),
+        "stderr": _text(stderr),
+        "seconds": round(seconds, 3),
+    }
+    if files:
+        entry["outputs"] = files
+    line = json.dumps(entry, ensure_ascii=False)
+    with _lock, open(os.environ[RECORD_VAR], "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+def _load(path):
+    recordings = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            recordings.setdefault(json.dumps(entry["key"]), []).append(entry)
+    return recordings
+
+def lookup(cmd):
+    """
+    Next recording of cmd: repeated calls are served in recorded order, and
+    the last one again once they run out. Raises FileNotFoundError if cmd
+    was never recorded, as running a missing program would.
+    """
+    path = os.environ[REPLAY_VAR]
+    lookup_key = json.dumps(key(cmd))
+    with _lock:
+        if path not in _recordings:
+            _recordings[path] = _load(path)
+            _served[path] = {}
+        entries = _recordings[path].get(lookup_key)
+        if not entries:
+            raise FileNotFoundError(f"No recording for: {' '.join(key(cmd))}")
+        served = _served[path].get(lookup_key, 0)
+        _served[path][lookup_key] = served + 1
+        return entries[min(served, len(entries) - 1)]
+
+def replay(cmd):
+    """The next recording of cmd, after waiting its (scaled) duration"""
+    entry = lookup(cmd)
+    time.sleep(entry["seconds"] * _scale())
+    return entry
+
+def _restore_outputs(entry, outputs):
+    tmp_root = tempfile.gettempdir().replace("\\", "/").lower().rstrip("/")
+    saved = entry.get("outputs", {})
+    for path in outputs:
+        content = saved.get(_normalize_arg(path, tmp_root))
+        if content is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+
+def run(cmd, outputs=(), **kwargs):
+    """
+    subprocess.run, recorded or replayed per configure(). outputs lists files
+    the command writes that callers read back (e.g. `winget export -o`).
+    """
+    if replaying():
+        entry = lookup(cmd)
+        seconds = entry["seconds"] * _scale()
+        timeout = kwargs.get("timeout")
+        if timeout is not None and seconds > timeout:
+            time.sleep(timeout)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        time.sleep(seconds)
+        _restore_outputs(entry, outputs)
+        captured = kwargs.get("capture_output") or kwargs.get("stdout") == subprocess.PIPE
+        text = kwargs.get("text") or kwargs.get("encoding") or kwargs.get("errors") or kwargs.get("universal_newlines")
+        stdout, stderr = entry["stdout"], entry["stderr"]
+        if not captured:
+            stdout = stderr = None
+        elif not text:
+            stdout = (stdout or "").encode("utf-8")
+            stderr = (stderr or "").encode("utf-8")
+        result = subprocess.CompletedProcess(cmd, entry["returncode"], stdout, stderr)
+        if kwargs.get("check"):
+            result.check_returncode()
+        return result
+
+    if not recording():
+        return subprocess.run(cmd, **kwargs)
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(cmd, **kwargs)
+    except subprocess.CalledProcessError as e:
+        record(cmd, e.returncode, e.stdout, e.stderr, time.perf_counter() - started, outputs)
+        raise
+    record(cmd, result.returncode, result.stdout, result.stderr, time.perf_counter() - started, outputs)
+    return result
+
+def stream(cmd, on_line, env=None):
+    """
+    Run cmd with stderr merged into stdout, calling on_line(line) for each
+    line as it arrives; returns the exit code. Replayed lines are spread
+    over the recorded (scaled) duration, so progress looks as it did.
+    """
+    if replaying():
+        entry = lookup(cmd)
+        lines = (entry["stdout"] or "").splitlines()
+        delay = entry["seconds"] * _scale() / (len(lines) + 1)
+        for line in lines:
+            time.sleep(delay)
+            on_line(line)
+        time.sleep(delay)
+        return entry["returncode"]
+
+    lines = []
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, encoding="utf-8", errors="replace")
+    # Text mode turns the \r of redrawn progress bars into line breaks
+    for line in proc.stdout:
+        line = line.rstrip("\n")
+        if recording():
+            lines.append(line)
+        on_line(line)
+    proc.wait()
+    if recording():
+        record(cmd, proc.returncode, "\n".join(lines), "", time.perf_counter() - started)
+    return proc.returncode
+
+async def stream_async(cmd, on_line, env=None, on_start=None):
+    """
+    stream() for asyncio callers (core.engine). on_start(process) gets the
+    asyncio process, so the caller can terminate it; a replayed command has
+    no process and runs to the end of its recording.
+    """
+    import asyncio
+    if replaying():
+        entry = lookup(cmd)
+        lines = (entry["stdout"] or "").splitlines()
+        delay = entry["seconds"] * _scale() / (len(lines) + 1)
+        for line in lines:
+            await asyncio.sleep(delay)
+            on_line(line)
+        await asyncio.sleep(delay)
+        return entry["returncode"]
+
+    lines = []
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *cmd, env=env,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    if on_start:
+        on_start(process)
+    async for raw in process.stdout:
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if recording():
+            lines.append(line)
+        on_line(line)
+    returncode = await process.wait()
+    if recording():
+        record(cmd, returncode, "\n".join(lines), "", time.perf_counter() - started)
+    return returncode
@@ -0,0 +1,28 @@
+import sys
+import time
+
+# (phase name, seconds) in the order phases finished
+_phases = []
+_last = None
+
+def mark(name, since=None):
+    """
+    Record a startup phase that ended now.
+    The phase starts at `since`, or where the previous phase ended.
+    """
+    global _last
+    now = time.perf_counter()
+    start = since if since is not None else (_last if _last is not None else now)
+    _phases.append((name, now - start))
+    _last = now
+
+def report():
+    """Print the recorded phases (to stderr, so piped output stays clean)"""
+    if not _phases:
+        return
+    total = sum(seconds for _, seconds in _phases)
+    width = max(len(name) for name, _ in _phases)
+    print("\nStartup profile:", file=sys.stderr)
+    for name, seconds in _phases:
+        print(f"  {name:<{width}}  {seconds * 1000:8.1f} ms", file=sys.stderr)
+    print(f"  {'total':<{width}}  {total * 1000:8.1f} ms", file=sys.stderr)
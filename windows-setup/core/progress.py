@@ -0,0 +1,183 @@
+import re
+import time
+import shutil
+import threading
+from core import logger
+
+# winget draws "  ██████▒▒▒▒  45%" for installs and "  ███▒▒  2.00 MB / 10.0 MB" for downloads;
+# a line counts as a progress frame when nothing but such a bar and figure is left
+BAR_CHARS = " \t█▓▒░-\\|/"
+PERCENT_RE = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%")
+SIZE_RE = re.compile(r"([\d.]+)\s*([KMG]?B)\s*/\s*([\d.]+)\s*([KMG]?B)")
+_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+BAR_WIDTH = 20
+SPINNER = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+# Milestones printed for a task in append-only mode
+MILESTONES = (25, 50, 75)
+
+_active = None
+
+def parse_percent(line):
+    """Percentage shown by a progress frame, or None if line is ordinary output"""
+    text = line.strip(BAR_CHARS)
+    match = SIZE_RE.fullmatch(text)
+    if match:
+        done = float(match.group(1)) * _UNITS.get(match.group(2), 1)
+        total = float(match.group(3)) * _UNITS.get(match.group(4), 1)
+        return min(100.0, 100.0 * done / total) if total else None
+    match = PERCENT_RE.fullmatch(text)
+    if match:
+        return min(100.0, float(match.group(1)))
+    return None
+
+def format_elapsed(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 60}m{seconds % 60:02d}s" if seconds >= 60 else f"{seconds}s"
+
+def task_output(line, echo=True):
+    """
+    Route one line of installer output: progress frames update the current
+    task's row, anything else is printed above the rows when echo is set.
+    """
+    percent = parse_percent(line)
+    if percent is not None:
+        key = logger.current_module()
+        if _active is not None and key:
+            _active.update(key, percent)
+        return
+    if echo:
+        logger.console(line)
+
+class _Task:
+    def __init__(self, label):
+        self.label = label
+        self.started = time.perf_counter()
+        self.percent = None
+        self.milestone = 0
+
+class ProgressRenderer:
+    """
+    One row per running task with a percentage bar (when the tool reports
+    one) and elapsed time. Rows are redrawn at most `fps` times a second
+    by a thread that sleeps until something changes, waking once a second
+    only to tick elapsed times. Log output is printed above the rows.
+
+    When the stream is not a terminal (CI logs, redirects) nothing is
+    redrawn: start, milestone and finish events are appended as lines.
+    """
+    def __init__(self, stream=None, fps=10, interactive=None):
+        # stderr with --log-format json, so the rows never mix into the JSON records
+        self.stream = stream or logger.console_stream()
+        self.interval = 1.0 / fps
+        if interactive is None:
+            interactive = getattr(self.stream, "isatty", lambda: False)()
+        self.interactive = interactive
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._closed = False
+        self._drawn = 0
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        global _active
+        _active = self
+        logger.set_live_display(self)
+        if self.interactive:
+            logger.enable_ansi()
+            self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        global _active
+        self._closed = True
+        self._changed.set()
+        if self._thread:
+            self._thread.join()
+        with self._lock:
+            self._clear()
+            self.stream.flush()
+        logger.set_live_display(None)
+        if _active is self:
+            _active = None
+
+    def add(self, key, label):
+        with self._lock:
+            self._tasks[key] = _Task(label)
+            if not self.interactive:
+                self.stream.write(f"▶ {label}\n")
+        self._changed.set()
+
+    def update(self, key, percent):
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None or task.percent == percent:
+                return
+            task.percent = percent
+            if not self.interactive:
+                reached = [m for m in MILESTONES if task.milestone < m <= percent]
+                if reached:
+                    task.milestone = reached[-1]
+                    self.stream.write(f"  {task.label}: {reached[-1]}%\n")
+                return
+        self._changed.set()
+
+    def finish(self, key, ok=True):
+        with self._lock:
+            task = self._tasks.pop(key, None)
+            if task and not self.interactive:
+                mark = "✔" if ok else ("✘" if ok is False else "?")
+                self.stream.write(f"{mark} {task.label} ({format_elapsed(time.perf_counter() - task.started)})\n")
+        self._changed.set()
+
+    def write(self, text):
+        """Print text above the progress rows"""
+        with self._lock:
+            self._clear()
+            self.stream.write(text + "\n")
+            self._draw()
+            self.stream.flush()
+
+    def _clear(self):
+        if self._drawn:
+            # Cursor to the first row, then erase to the end of the screen
+            self.stream.write(f"\033[{self._drawn}F\033[J")
+            self._drawn = 0
+
+    def _draw(self):
+        if not self.interactive or self._closed:
+            return
+        width = shutil.get_terminal_size().columns - 1
+        now = time.perf_counter()
+        label_width = min(32, max((len(t.label) for t in self._tasks.values()), default=0))
+        for task in self._tasks.values():
+            elapsed = now - task.started
+            text = f"{task.label[:label_width]:<{label_width}}"
+            if task.percent is not None:
+                filled = int(BAR_WIDTH * task.percent / 100)
+                text += f" {'█' * filled}{'░' * (BAR_WIDTH - filled)} {task.percent:5.1f}%"
+            text += f"  {format_elapsed(elapsed)}"
+            # Rows must never wrap, or the cursor math in _clear() is off
+            spinner = SPINNER[int(elapsed) % len(SPINNER)]
+            self.stream.write(f"{logger.CYAN}{spinner}{logger.RESET} {text[:width - 2]}\n")
+            self._drawn += 1
+
+    def _run(self):
+        while not self._closed:
+            self._changed.wait(timeout=1.0 if self._tasks else None)
+            if self._closed:
+                break
+            self._changed.clear()
+            with self._lock:
+                self._clear()
+                self._draw()
+                self.stream.flush()
+            # Frame-rate limit: later changes are picked up by the next frame
+            time.sleep(self.interval)
@@ -0,0 +1,175 @@
+import time
+import uuid
+import base64
+import atexit
+import threading
+import subprocess
+from core import trace, proc
+
+PWSH = "pwsh"
+END_MARKER = "__OMSS_END__"
+
+# Request/response loop run by the worker. One request per stdin line:
+#   <request id> <base64 UTF-8 script>
+# answered by the script's output lines, then:
+#   __OMSS_END__ <request id> <exit code>
+# Scripts share the session, so they must not call `exit`; throw instead.
+SERVER_SCRIPT = r"""
+[Console]::InputEncoding = [Console]::OutputEncoding = [Text.UTF8Encoding]::new($false)
+$ProgressPreference = 'SilentlyContinue'
+while ($null -ne ($request = [Console]::In.ReadLine())) {
+    $id, $encoded = $request.Split(' ', 2)
+    $rc = 0
+    try {
+        $ErrorActionPreference = 'Stop'
+        $global:LASTEXITCODE = 0
+        $block = [ScriptBlock]::Create([Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($encoded)))
+        & $block 2>&1 | Out-String -Stream | ForEach-Object { [Console]::Out.WriteLine($_) }
+        if ($global:LASTEXITCODE) { $rc = $global:LASTEXITCODE }
+    } catch {
+        [Console]::Out.WriteLine("$_")
+        $rc = 1
+    }
+    [Console]::Out.WriteLine("__OMSS_END__ $id $rc")
+    [Console]::Out.Flush()
+}
+"""
+
+_session = None
+_session_lock = threading.Lock()
+
+def quote(value):
+    """PowerShell single-quoted string literal"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+def server_command():
+    encoded = base64.b64encode(SERVER_SCRIPT.encode("utf-16-le")).decode("ascii")
+    return [PWSH, "-NoLogo", "-NoProfile", "-NonInteractive", "-EncodedCommand", encoded]
+
+class PwshSession:
+    """
+    Long-lived pwsh worker. The process is started by the first request and
+    restarted if it dies; requests are serialized. cmd can be any program
+    speaking the protocol of SERVER_SCRIPT (tests use a stub shell).
+    """
+    def __init__(self, cmd=None):
+        self.cmd = cmd or server_command()
+        self._proc = None
+        self._lock = threading.Lock()
+        # lowercased module name -> available (PowerShell names are case-insensitive)
+        self._available = {}
+
+    def _start(self):
+        with trace.span("pwsh start", "pwsh"):
+            self._proc = subprocess.Popen(
+                self.cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+            )
+
+    def run(self, script, step="pwsh", on_line=None):
+        """
+        Run script in the session. Returns a CompletedProcess with the output
+        lines joined in stdout; on_line(line) is called as they arrive.
+        Raises OSError if the worker cannot be started or exits mid-request.
+        Under core.proc record/replay, each script is one recorded call.
+        """
+        if proc.replaying():
+            lines = []
+
+            def replayed(line):
+                lines.append(line)
+                if on_line:
+                    on_line(line)
+            # Still one request at a time, as with the real worker
+            with self._lock, trace.span(step, "pwsh"):
+                returncode = proc.stream([PWSH, script], replayed)
+            return subprocess.CompletedProcess(script, returncode, "\n".join(lines), "")
+
+        request_id = uuid.uuid4().hex
+        encoded = base64.b64encode(script.encode("utf-8")).decode("ascii")
+        started = time.perf_counter()
+        with self._lock, trace.span(step, "pwsh"):
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            try:
+                self._proc.stdin.write(f"{request_id} {encoded}\n")
+                self._proc.stdin.flush()
+            except OSError:
+                self._proc = None
+                raise
+
+            lines = []
+            while True:
+                line = self._proc.stdout.readline()
+                if not line:
+                    self._proc = None
+                    raise OSError(f"PowerShell session exited during: {step}")
+                line = line.rstrip("\r\n")
+                parts = line.split(" ")
+                if len(parts) == 3 and parts[0] == END_MARKER and parts[1] == request_id:
+                    returncode = int(parts[2])
+                    break
+                lines.append(line)
+                if on_line:
+                    on_line(line)
+        if proc.recording():
+            proc.record([PWSH, script], returncode, "\n".join(lines), "", time.perf_counter() - started)
+        return subprocess.CompletedProcess(script, returncode, "\n".join(lines), "")
+
+    def available_modules(self, names):
+        """Which of names are installed PowerShell modules; unknown names are queried in one batch"""
+        missing = [name for name in dict.fromkeys(names) if name.lower() not in self._available]
+        if missing:
+            script = (f"Get-Module -ListAvailable -Name {','.join(quote(n) for n in missing)} "
+                      f"| ForEach-Object Name | Sort-Object -Unique")
+            result = self.run(script, f"pwsh Get-Module ({len(missing)})")
+            found = {line.strip().lower() for line in result.stdout.splitlines() if line.strip()}
+            for name in missing:
+                self._available[name.lower()] = name.lower() in found
+        return {name for name in names if self._available[name.lower()]}
+
+    def mark_available(self, name):
+        self._available[name.lower()] = True
+
+    def profile_path(self):
+        return self.run("$PROFILE", "pwsh $PROFILE").stdout.strip()
+
+    def close(self):
+        with self._lock:
+            if self._proc is None:
+                return
+            try:
+                # EOF on stdin ends the request loop
+                self._proc.stdin.close()
+                self._proc.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self._proc.kill()
+            self._proc = None
+
+def get_session():
+    """The session shared by every PowerShell step of this process (started on first use)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = PwshSession()
+        return _session
+
+def set_session(session):
+    global _session
+    with _session_lock:
+        _session = session
+
+def close_session():
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session:
+        session.close()
+
+atexit.register(close_session)
@@ -0,0 +1,114 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from core import logger
+
+# Task states
+SUCCESS = "success"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+def split_item(item):
+    """Split an "id" or "id:variant" plan item into (id, variant)"""
+    mod_id, _, variant = item.partition(":")
+    return mod_id, (variant or None)
+
+def build_graph(manager, items):
+    """
+    Build the dependency graph for a plan from the catalog's dependency index.
+    Returns item -> set of items (within the plan) it must wait for.
+    Dependencies outside the plan are treated as already satisfied.
+    Modules on a dependency cycle (one strongly connected component of the
+    index) only wait for the ones before them in plan order, so the graph
+    is acyclic and can be awaited without deadlock.
+    """
+    deps_index = manager.deps
+    order = {item: i for i, item in enumerate(items)}
+    by_base = {}
+    for item in items:
+        by_base.setdefault(split_item(item)[0], []).append(item)
+
+    graph = {}
+    for item in items:
+        base = split_item(item)[0]
+        deps = set()
+        for dep in deps_index.forward.get(base, ()):
+            for dep_item in by_base.get(dep, []):
+                if deps_index.component[dep] == deps_index.component[base] and order[dep_item] > order[item]:
+                    logger.warn(f"Circular dependency: {item} -> {dep_item}, installing in plan order")
+                    continue
+                deps.add(dep_item)
+        graph[item] = deps
+    return graph
+
+class Scheduler:
+    """
+    Runs plan items on a worker pool, starting each one only after
+    all of its dependencies have succeeded.
+    """
+    def __init__(self, manager, items, jobs=1):
+        self.items = list(dict.fromkeys(items))
+        self.order = {item: i for i, item in enumerate(self.items)}
+        self.graph = build_graph(manager, self.items)
+        self.jobs = max(1, int(jobs))
+
+        self.dependents = {item: [] for item in self.items}
+        for item, deps in self.graph.items():
+            for dep in deps:
+                self.dependents[dep].append(item)
+
+    def run(self, task):
+        """
+        Execute task(item) -> bool for every item.
+        Returns item -> SUCCESS / FAILED / SKIPPED.
+        """
+        results = {}
+        waiting = {item: len(deps) for item, deps in self.graph.items()}
+        ready = [(self.order[item], item) for item, n in waiting.items() if n == 0]
+        heapq.heapify(ready)
+        running = {}
+        started = set()
+
+        def skip_dependents(item):
+            stack = list(self.dependents[item])
+            while stack:
+                dep = stack.pop()
+                if dep in results:
+                    continue
+                results[dep] = SKIPPED
+                logger.warn(f"Skipping {dep}: dependency {item} did not complete")
+                stack.extend(self.dependents[dep])
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            # build_graph leaves no cycles, so every item is started or skipped
+            while ready or running:
+                while ready and len(running) < self.jobs:
+                    _, item = heapq.heappop(ready)
+                    if item in started or item in results:
+                        continue
+                    started.add(item)
+                    running[pool.submit(task, item)] = item
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = running.pop(future)
+                    try:
+                        ok = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed {item}: {e}")
+                        ok = False
+
+                    if ok is False:
+                        results[item] = FAILED
+                        skip_dependents(item)
+                        continue
+
+                    results[item] = SUCCESS
+                    for dep in self.dependents[item]:
+                        waiting[dep] -= 1
+                        if waiting[dep] == 0 and dep not in started and dep not in results:
+                            heapq.heappush(ready, (self.order[dep], dep))
+
+        return results
@@ -0,0 +1,124 @@
+def _normalize(text):
+    return " ".join(str(text).casefold().split())
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+def _is_subsequence(needle, haystack):
+    it = iter(haystack)
+    return all(ch in it for ch in needle)
+
+# Score weights per field for substring hits; prefix hits get a bonus
+FIELD_WEIGHTS = (("id", 60), ("name", 60), ("category", 40), ("description", 30))
+FUZZY_FIELDS = ("id", "name")
+
+class SearchIndex:
+    """
+    Bigram index over module id, name, description and category.
+
+    Bigrams work for Korean as well as Latin text: most Hangul words are
+    two or three syllables, so a bigram index finds them without a
+    tokenizer. Single-character queries fall back to a character index,
+    and characters are also used to narrow fuzzy (subsequence) matches.
+    """
+    def __init__(self, modules, categories=None):
+        category_names = {}
+        for cat_key, cat_data in (categories or {}).items():
+            category_names[cat_key] = cat_data.get("name", cat_key)
+            for sub_key, sub_data in cat_data.get("subcategories", {}).items():
+                category_names[f"{cat_key}/{sub_key}"] = sub_data.get("name", sub_key)
+
+        self.docs = {}
+        self._grams = {}
+        self._chars = {}
+        for mod_id, mod in modules.items():
+            doc = {
+                "id": _normalize(mod.id),
+                "name": _normalize(mod.name),
+                "category": _normalize(f"{mod.category} {category_names.get(mod.category, '')}"),
+                "description": _normalize(mod.description),
+            }
+            self.docs[mod_id] = doc
+            text = " ".join(doc.values())
+            for gram in _bigrams(text):
+                self._grams.setdefault(gram, set()).add(mod_id)
+            for ch in set(text):
+                self._chars.setdefault(ch, set()).add(mod_id)
+
+    def _candidates(self, index, keys):
+        sets = []
+        for key in keys:
+            found = index.get(key)
+            if not found:
+                return set()
+            sets.append(found)
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result &= other
+        return result
+
+    def _substring_score(self, term, mod_id):
+        doc = self.docs[mod_id]
+        best = 0
+        for field, weight in FIELD_WEIGHTS:
+            text = doc[field]
+            pos = text.find(term)
+            if pos < 0:
+                continue
+            score = weight
+            if text == term:
+                score += 40
+            elif pos == 0 or text[pos - 1] in " .-_/":
+                score += 20
+            best = max(best, score)
+        return best
+
+    def _fuzzy_score(self, term, mod_id):
+        doc = self.docs[mod_id]
+        best = 0
+        for field in FUZZY_FIELDS:
+            text = doc[field]
+            if _is_subsequence(term, text):
+                # Favour fuzzy matches that skip fewer characters
+                best = max(best, 10 + int(10 * len(term) / max(len(text), 1)))
+        return best
+
+    def search(self, query):
+        """
+        Return {module id: score} for modules matching every word of query.
+        Substring hits always outrank fuzzy hits.
+        """
+        terms = _normalize(query).split()
+        if not terms:
+            return {mod_id: 0 for mod_id in self.docs}
+
+        scores = None
+        for term in terms:
+            if len(term) > 1:
+                exact = self._candidates(self._grams, _bigrams(term))
+            else:
+                exact = self._candidates(self._chars, term)
+            fuzzy = self._candidates(self._chars, set(term)) - exact
+            if scores is not None:
+                exact &= scores.keys()
+                fuzzy &= scores.keys()
+
+            term_scores = {}
+            for mod_id in exact:
+                # Every bigram present is no substring yet ("gogle" in "google")
+                score = self._substring_score(term, mod_id) or self._fuzzy_score(term, mod_id)
+                if score:
+                    term_scores[mod_id] = score
+            for mod_id in fuzzy:
+                score = self._fuzzy_score(term, mod_id)
+                if score:
+                    term_scores[mod_id] = score
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {mod_id: scores[mod_id] + s for mod_id, s in term_scores.items()}
+            if not scores:
+                break
+        return scores
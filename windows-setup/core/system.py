@@ -1,9 +1,20 @@
 import os
 import sys
+import json
 import ctypes
-import subprocess
-import winreg
-from core import logger
+import ntpath
+import shutil
+import threading
+import contextlib
+from core import logger, trace
+
+SCOPES = ("User", "Machine")
+# Installer scripts run as child processes append their env changes here (JSON lines)
+ENV_QUEUE_VAR = "OMSS_ENV_QUEUE"
+
+_backend = None
+# Transaction of the run in progress in this process (see transaction())
+_transaction = None
 
 def is_admin():
     try:
@@ -17,96 +28,292 @@ def check_admin():
         logger.warn("Please run this script as Administrator.")
         sys.exit(1)
 
+def is_installed(command):
+    return shutil.which(command) is not None
+
 def expand_env(value):
     return os.path.expandvars(value)
 
+def normalize_path(path):
+    # Windows rules on every platform, so PATH dedupe behaves the same with MemoryBackend
+    return ntpath.normcase(ntpath.normpath(expand_env(path))).rstrip("\\")
+
+class WinregBackend:
+    """Environment variables in the Windows registry"""
+    KEYS = {
+        "User": ("HKEY_CURRENT_USER", r"Environment"),
+        "Machine": ("HKEY_LOCAL_MACHINE", r"SYSTEM\CurrentControlSet\Control\Session Manager\Environment"),
+    }
+
+    def _open(self, scope, access):
+        import winreg
+        if scope not in self.KEYS:
+            raise ValueError(f"Invalid scope: {scope}")
+        hive, key_path = self.KEYS[scope]
+        return winreg.OpenKey(getattr(winreg, hive), key_path, 0, access)
+
+    def read(self, scope, name):
+        import winreg
+        with self._open(scope, winreg.KEY_READ) as key:
+            try:
+                return winreg.QueryValueEx(key, name)[0]
+            except FileNotFoundError:
+                return None
+
+    def write(self, scope, values):
+        """Write all values of one scope through a single open key"""
+        import winreg
+        with self._open(scope, winreg.KEY_SET_VALUE) as key:
+            for name, value in values.items():
+                winreg.SetValueEx(key, name, 0, winreg.REG_EXPAND_SZ, value)
+
+    def broadcast(self):
+        # SendMessageTimeout with SMTO_ABORTIFHUNG, so one hung window cannot stall the run
+        HWND_BROADCAST = 0xFFFF
+        WM_SETTINGCHANGE = 0x001A
+        SMTO_ABORTIFHUNG = 0x0002
+        result = ctypes.c_ulong()
+        ctypes.windll.user32.SendMessageTimeoutW(HWND_BROADCAST, WM_SETTINGCHANGE, 0, "Environment",
+                                                 SMTO_ABORTIFHUNG, 5000, ctypes.byref(result))
+
+class MemoryBackend:
+    """In-memory stand-in for the registry (tests, dry runs on other platforms)"""
+    def __init__(self, values=None):
+        # scope -> {lowercased name: (name, value)}; names are case-insensitive like the registry
+        self.values = {scope: {} for scope in SCOPES}
+        for scope, scope_values in (values or {}).items():
+            for name, value in scope_values.items():
+                self.values[scope][name.lower()] = (name, value)
+        self.writes = 0
+        self.broadcasts = 0
+
+    def read(self, scope, name):
+        entry = self.values[scope].get(name.lower())
+        return entry[1] if entry else None
+
+    def write(self, scope, values):
+        self.writes += 1
+        for name, value in values.items():
+            self.values[scope][name.lower()] = (name, value)
+
+    def broadcast(self):
+        self.broadcasts += 1
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = WinregBackend() if os.name == "nt" else MemoryBackend()
+    return _backend
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+class EnvTransaction:
+    """
+    Queues environment variable and PATH changes and applies them in commit():
+    one registry write per scope, PATH additions deduplicated against the
+    normalized existing entries, and a single WM_SETTINGCHANGE broadcast.
+    commit() can be called repeatedly (runs commit after each module) and
+    only writes what was queued since the previous call; with
+    broadcast=False the broadcast is held back for a later commit().
+    Queued changes are applied to os.environ right away, so later work in
+    this process (and child processes it starts) sees them.
+    """
+    def __init__(self, backend=None):
+        self.backend = backend or get_backend()
+        self.vars = {scope: {} for scope in SCOPES}
+        self.paths = {scope: [] for scope in SCOPES}
+        self._lock = threading.Lock()
+        # Commits read-modify-write PATH, so they must not interleave
+        self._commit_lock = threading.Lock()
+        # Parallel installs absorb concurrently; each queued line must be read once
+        self._queue_lock = threading.Lock()
+        self._queue_offset = 0
+        # Written to the backend by a commit that held back its broadcast
+        self._unannounced = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.commit()
+
+    def set_env(self, name, value, scope="User"):
+        if scope not in SCOPES:
+            raise ValueError(f"Invalid scope: {scope}")
+        value = expand_env(value)
+        with self._lock:
+            self.vars[scope][name] = value
+        os.environ[name] = value
+
+    def add_path(self, path, scope="User"):
+        if scope not in SCOPES:
+            raise ValueError(f"Invalid scope: {scope}")
+        path = expand_env(path)
+        with self._lock:
+            self.paths[scope].append(path)
+        current = {normalize_path(p) for p in os.environ.get("PATH", "").split(os.pathsep) if p}
+        if normalize_path(path) not in current:
+            os.environ["PATH"] = os.environ.get("PATH", "") + os.pathsep + path
+
+    def absorb(self, queue_file):
+        """Take over the changes child processes appended to queue_file since the last call"""
+        try:
+            # Binary, so the offset counts bytes on disk (text mode on Windows writes \r\n)
+            with self._queue_lock, open(queue_file, "rb") as f:
+                f.seek(self._queue_offset)
+                lines = f.readlines()
+                # Leave a partially written last line for the next call
+                if lines and not lines[-1].endswith(b"\n"):
+                    lines.pop()
+                self._queue_offset += sum(len(line) for line in lines)
+        except OSError:
+            return
+        for line in lines:
+            change = json.loads(line.decode("utf-8"))
+            if change["op"] == "set":
+                self.set_env(change["name"], change["value"], change["scope"])
+            else:
+                self.add_path(change["path"], change["scope"])
+
+    def commit(self, broadcast=True):
+        """Write the queued changes; returns True if anything changed"""
+        with self._commit_lock:
+            changed = self._commit()
+            if changed:
+                self._unannounced = True
+            if broadcast and self._unannounced:
+                self._unannounced = False
+                with trace.span("broadcast WM_SETTINGCHANGE", "env"):
+                    self.backend.broadcast()
+            return changed
+
+    def _commit(self):
+        with self._lock:
+            queued_vars = {scope: dict(v) for scope, v in self.vars.items()}
+            queued_paths = {scope: list(p) for scope, p in self.paths.items()}
+            for scope in SCOPES:
+                self.vars[scope].clear()
+                self.paths[scope].clear()
+
+        changed = False
+        for scope in SCOPES:
+            values = {}
+            for name, value in queued_vars[scope].items():
+                if self.backend.read(scope, name) != value:
+                    values[name] = value
+
+            if queued_paths[scope]:
+                current = values.get("Path") or self.backend.read(scope, "Path") or ""
+                parts = [p for p in current.split(";") if p]
+                seen = {normalize_path(p) for p in parts}
+                added = []
+                for path in queued_paths[scope]:
+                    key = normalize_path(path)
+                    if key in seen:
+                        logger.info(f"Already in PATH: {path}")
+                        continue
+                    seen.add(key)
+                    added.append(path)
+                if added:
+                    values["Path"] = ";".join(parts + added)
+                    for path in added:
+                        logger.success(f"Added to PATH: {path} [{scope}]")
+
+            if values:
+                with trace.span(f"registry write {scope}", "env", count=len(values)):
+                    self.backend.write(scope, values)
+                for name, value in values.items():
+                    if name != "Path":
+                        logger.success(f"Set Env: {name} = {value} [{scope}]")
+                changed = True
+        return changed
+
+@contextlib.contextmanager
+def transaction(backend=None):
+    """
+    Collect every set_env/add_to_path of a run, including those made by
+    installer scripts running as child processes. Callers absorb and
+    commit(broadcast=False) after each module, before journaling it as
+    completed, so an interrupted run never loses the changes of a finished
+    module; whatever is still queued is committed on exit, with the one
+    broadcast of the run.
+    """
+    global _transaction
+    import tempfile
+    tx = EnvTransaction(backend)
+    fd, queue_file = tempfile.mkstemp(prefix="omss-env-", suffix=".jsonl")
+    os.close(fd)
+    previous = os.environ.get(ENV_QUEUE_VAR)
+    os.environ[ENV_QUEUE_VAR] = queue_file
+    _transaction = tx
+    try:
+        yield tx
+    finally:
+        _transaction = None
+        if previous is None:
+            os.environ.pop(ENV_QUEUE_VAR, None)
+        else:
+            os.environ[ENV_QUEUE_VAR] = previous
+        try:
+            tx.absorb(queue_file)
+            tx.commit()
+        except Exception as e:
+            logger.error(f"Failed to apply environment changes: {e}")
+        finally:
+            os.remove(queue_file)
+
+def _queue_for_parent(change):
+    # Child process of a run: hand the change to the parent's transaction
+    with open(os.environ[ENV_QUEUE_VAR], "a", encoding="utf-8") as f:
+        f.write(json.dumps(change) + "\n")
+
 def set_env(name, value, scope="User", dry_run=False):
     """
     Sets a permanent environment variable on Windows.
     Scope: 'User' or 'Machine'
     """
     expanded_value = expand_env(value)
-    
+
     if dry_run:
         logger.dry_run(f"Set Env: {name} = {expanded_value} [{scope}]")
         return
 
     try:
-        if scope == "User":
-            key_path = r"Environment"
-            hkey = winreg.HKEY_CURRENT_USER
-        elif scope == "Machine":
-            key_path = r"SYSTEM\CurrentControlSet\Control\Session Manager\Environment"
-            hkey = winreg.HKEY_LOCAL_MACHINE
+        if _transaction is not None:
+            _transaction.set_env(name, expanded_value, scope)
+        elif os.environ.get(ENV_QUEUE_VAR):
+            _queue_for_parent({"op": "set", "name": name, "value": expanded_value, "scope": scope})
+            os.environ[name] = expanded_value
+            logger.info(f"Set Env (applied at the end of the run): {name} = {expanded_value} [{scope}]")
         else:
-            raise ValueError(f"Invalid scope: {scope}")
-
-        # Update Registry
-        with winreg.OpenKey(hkey, key_path, 0, winreg.KEY_SET_VALUE) as key:
-            winreg.SetValueEx(key, name, 0, winreg.REG_EXPAND_SZ, expanded_value)
-        
-        # Notify system of change
-        import win32gui
-        import win32con
-        # This requires pywin32, which might not be installed. 
-        # Fallback to pure ctypes or just warn user to restart shell.
-        # using ctypes to broadcast WM_SETTINGCHANGE
-        SendMessage = ctypes.windll.user32.SendMessageW
-        HWND_BROADCAST = 0xFFFF
-        WM_SETTINGCHANGE = 0x001A
-        SendMessage(HWND_BROADCAST, WM_SETTINGCHANGE, 0, "Environment")
-
-        # Update current process
-        os.environ[name] = expanded_value
-        logger.success(f"Set Env: {name} = {expanded_value} [{scope}]")
-        
+            with EnvTransaction() as tx:
+                tx.set_env(name, expanded_value, scope)
     except Exception as e:
         logger.error(f"Failed to set environment variable {name}: {e}")
 
 def add_to_path(new_path, scope="User", dry_run=False):
     expanded_path = expand_env(new_path)
-    
+
     # Check if path exists
     if not os.path.exists(expanded_path) and not dry_run:
         logger.warn(f"Path does not exist: {expanded_path}")
-    
+
     if dry_run:
         logger.dry_run(f"Add to PATH: {expanded_path} [{scope}]")
         return
 
     try:
-        if scope == "User":
-            key_path = r"Environment"
-            hkey = winreg.HKEY_CURRENT_USER
+        if _transaction is not None:
+            _transaction.add_path(expanded_path, scope)
+        elif os.environ.get(ENV_QUEUE_VAR):
+            _queue_for_parent({"op": "path", "path": expanded_path, "scope": scope})
+            if normalize_path(expanded_path) not in {normalize_path(p) for p in os.environ["PATH"].split(os.pathsep) if p}:
+                os.environ["PATH"] += os.pathsep + expanded_path
+            logger.info(f"Add to PATH (applied at the end of the run): {expanded_path} [{scope}]")
         else:
-            key_path = r"SYSTEM\CurrentControlSet\Control\Session Manager\Environment"
-            hkey = winreg.HKEY_LOCAL_MACHINE
-
-        with winreg.OpenKey(hkey, key_path, 0, winreg.KEY_READ | winreg.KEY_SET_VALUE) as key:
-            try:
-                current_path, _ = winreg.QueryValueEx(key, "Path")
-            except FileNotFoundError:
-                current_path = ""
-
-            path_parts = [p for p in current_path.split(";") if p]
-            
-            # Check for duplicates
-            if any(os.path.normpath(p).lower() == os.path.normpath(expanded_path).lower() for p in path_parts):
-                logger.info(f"Already in PATH: {expanded_path}")
-                return
-
-            new_full_path = current_path + ";" + expanded_path if current_path else expanded_path
-            winreg.SetValueEx(key, "Path", 0, winreg.REG_EXPAND_SZ, new_full_path)
-
-        # Notify
-        SendMessage = ctypes.windll.user32.SendMessageW
-        HWND_BROADCAST = 0xFFFF
-        WM_SETTINGCHANGE = 0x001A
-        SendMessage(HWND_BROADCAST, WM_SETTINGCHANGE, 0, "Environment")
-        
-        # Update current process
-        os.environ["PATH"] += os.pathsep + expanded_path
-        logger.success(f"Added to PATH: {expanded_path} [{scope}]")
-
+            with EnvTransaction() as tx:
+                tx.add_path(expanded_path, scope)
     except Exception as e:
         logger.error(f"Failed to add to PATH: {e}")
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import threading
+import contextlib
+
+# (name, category, start, end, track, args); times are perf_counter seconds
+_spans = []
+_lock = threading.Lock()
+_origin = time.perf_counter()
+
+@contextlib.contextmanager
+def span(name, cat="", track=None, **args):
+    """
+    Time the enclosed block. Spans land on the current thread's track unless
+    track is given (asyncio code shares one thread, so it names its own).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        with _lock:
+            _spans.append((name, cat, start, end, track or threading.current_thread().name, args))
+
+def spans(cat=None):
+    with _lock:
+        return [s for s in _spans if cat is None or s[1] == cat]
+
+def module_durations():
+    """item -> seconds spent in its install span (cat "module")"""
+    durations = {}
+    for name, _, start, end, _, args in spans("module"):
+        item = args.get("item", name)
+        durations[item] = durations.get(item, 0.0) + end - start
+    return durations
+
+def self_times():
+    """
+    category -> seconds spent in spans of that category, excluding time in
+    spans nested inside them on the same track, so a span wrapping another
+    (e.g. "wait for msi lock" around an installer) is not counted twice.
+    """
+    by_track = {}
+    for s in spans():
+        by_track.setdefault(s[4], []).append(s)
+    totals = {}
+    for track_spans in by_track.values():
+        # Parents sort before the children they enclose
+        track_spans.sort(key=lambda s: (s[2], -s[3]))
+        open_spans = []  # [end, category, seconds in children, seconds]
+        for _, cat, start, end, _, _ in track_spans:
+            while open_spans and open_spans[-1][0] <= start:
+                _close(open_spans.pop(), totals)
+            if open_spans:
+                open_spans[-1][2] += end - start
+            open_spans.append([end, cat, 0.0, end - start])
+        while open_spans:
+            _close(open_spans.pop(), totals)
+    return totals
+
+def _close(entry, totals):
+    _, cat, children, seconds = entry
+    totals[cat] = totals.get(cat, 0.0) + max(0.0, seconds - children)
+
+def critical_path(graph, durations):
+    """
+    Longest chain of dependent items by duration.
+    graph: item -> deps. Returns (seconds, [items, dependencies first]).
+    """
+    best = {}
+    # Iterative post-order; a dependency already on the stack (cycle) is ignored
+    for root in graph:
+        stack = [(root, iter(graph.get(root, ())))]
+        visiting = {root}
+        while stack:
+            node, deps = stack[-1]
+            advanced = False
+            for dep in deps:
+                if dep not in best and dep not in visiting and dep in graph:
+                    visiting.add(dep)
+                    stack.append((dep, iter(graph.get(dep, ()))))
+                    advanced = True
+                    break
+            if advanced:
+                continue
+            stack.pop()
+            visiting.discard(node)
+            if node in best:
+                continue
+            prev = max((best[d] for d in graph.get(node, ()) if d in best), default=(0.0, []), key=lambda b: b[0])
+            best[node] = (prev[0] + durations.get(node, 0.0), prev[1] + [node])
+    return max(best.values(), default=(0.0, []), key=lambda b: b[0])
+
+def report(graph, wall_seconds, top=5):
+    """Print the slowest modules and total vs critical-path time"""
+    from core import logger
+    durations = module_durations()
+    if not durations:
+        return
+    total = sum(durations.values())
+    path_seconds, path = critical_path(graph, durations)
+    logger.section("Timing")
+    logger.console(f"  Wall time     : {wall_seconds:8.1f} s")
+    logger.console(f"  Module time   : {total:8.1f} s (sum over all modules)")
+    logger.console(f"  Critical path : {path_seconds:8.1f} s  {' -> '.join(path)}")
+    logger.console("  Slowest modules:")
+    for item, seconds in sorted(durations.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+        logger.console(f"    {seconds:8.1f} s  {item}")
+
+    # Where the module time went: winget, pwsh, installer, env, ...
+    by_cat = {cat: seconds for cat, seconds in self_times().items() if cat and cat != "module"}
+    if by_cat:
+        logger.console("  By step:")
+        for cat, seconds in sorted(by_cat.items(), key=lambda kv: kv[1], reverse=True):
+            logger.console(f"    {seconds:8.1f} s  {cat}")
+
+def write_chrome_trace(path):
+    """Write the recorded spans in Chrome trace-event format (chrome://tracing, Perfetto)"""
+    pid = os.getpid()
+    tracks = {}
+    events = []
+    for name, cat, start, end, track, args in spans():
+        tid = tracks.setdefault(track, len(tracks) + 1)
+        events.append({
+            "name": name, "cat": cat or "misc", "ph": "X", "pid": pid, "tid": tid,
+            "ts": round((start - _origin) * 1e6), "dur": round((end - start) * 1e6),
+            "args": {k: str(v) for k, v in args.items()},
+        })
+    for track, tid in tracks.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": track}})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -1,15 +1,23 @@
-import json
 from pathlib import Path
 from textual.app import App, ComposeResult
-from textual.widgets import Tree, Static, Footer, Header, Button, Label, ListView, ListItem, RichLog, Input
+from textual.widgets import Tree, Static, Footer, Header, Button, Label, ListView, ListItem, RichLog, Input, OptionList
+from textual.widgets.option_list import Option
 from textual.containers import Horizontal, Vertical, Container
 from textual.binding import Binding
+from textual.screen import Screen
+from textual.widgets import ContentSwitcher
 from textual import events
 from core.module import ModuleManager
+from core import engine
 
 # Reuse Logic from linux-setup/setup.py adapted for Windows structure
 
-class SelectedList(ListView):
+class SelectedList(OptionList):
+    """
+    Selected items, backed by OptionList so rows are rendered on demand
+    rather than allocated as widgets. refresh_list diffs the manager's
+    context against the rows shown and applies only the changes.
+    """
     BINDINGS = [
         Binding("space", "toggle_item", "Toggle", show=True),
         Binding("delete", "remove_item", "Remove", show=True),
@@ -18,47 +26,82 @@ class SelectedList(ListView):
     def __init__(self, manager: ModuleManager):
         super().__init__()
         self.manager = manager
+        self._rows = {} # item key -> prompt currently shown
+        self._order = [] # item keys in display order
 
-    def refresh_list(self):
-        self.clear()
-        sorted_items = sorted(
-            self.manager.context_items.items(),
-            key=lambda x: x[0]
-        )
+    def _prompt(self, item, is_selected):
+        if is_selected:
+            return f"[green]✓[/] {item}"
+        return f"[dim]✗[/] [dim]{item}[/]"
 
-        for item, is_selected in sorted_items:
-            if is_selected:
-                icon = "[green]✓[/]"
-                label = f"{icon} {item}"
+    def refresh_list(self):
+        context = self.manager.context_items
+        current = self.highlighted_item
+        old_index = self.highlighted
+
+        removed = [key for key in self._order if key not in context]
+        added = sorted(key for key in context if key not in self._rows)
+
+        for key in removed:
+            self.remove_option(key)
+            del self._rows[key]
+        if removed:
+            removed_set = set(removed)
+            self._order = [key for key in self._order if key not in removed_set]
+
+        if added:
+            if not self._order or added[0] > self._order[-1]:
+                # Appending keeps the sort order: existing rows stay untouched
+                self._order.extend(added)
+                new_rows = added
             else:
-                icon = "[dim]✗[/]"
-                label = f"{icon} [dim]{item}[/]"
+                # OptionList cannot insert mid-list; re-add the (cheap, non-widget) options
+                self._order = sorted(self._order + added)
+                self.clear_options()
+                new_rows = self._order
+            for key in new_rows:
+                self._rows[key] = self._prompt(key, context[key])
+            self.add_options(Option(self._rows[key], id=key) for key in new_rows)
+
+        for key in self._order:
+            prompt = self._prompt(key, context[key])
+            if self._rows.get(key) != prompt:
+                self._rows[key] = prompt
+                self.replace_option_prompt(key, prompt)
+
+        # Keep the highlight on the same item, or at the same position if it went away
+        if not self._order:
+            return
+        if current in self._rows:
+            self.highlighted = self.get_option_index(current)
+        elif old_index is not None:
+            self.highlighted = min(old_index, len(self._order) - 1)
 
-            list_item = ListItem(Label(label))
-            list_item.data = item
-            self.append(list_item)
+    @property
+    def highlighted_item(self):
+        if self.highlighted is None or not self._order:
+            return None
+        return self.get_option_at_index(self.highlighted).id
 
     def action_toggle_item(self):
-        if self.highlighted_child:
-            item_id = getattr(self.highlighted_child, 'data', None)
-            if item_id:
-                self.manager.toggle(item_id)
-                self.refresh_list()
-                try:
-                    self.app.query_one(ModuleTree).refresh_all_labels()
-                except:
-                    pass
+        item_id = self.highlighted_item
+        if item_id:
+            self.manager.toggle(item_id)
+            self.refresh_list()
+            try:
+                self.app.query_one(ModuleTree).refresh_all_labels()
+            except:
+                pass
 
     def action_remove_item(self):
-        if self.highlighted_child:
-            item_id = getattr(self.highlighted_child, 'data', None)
-            if item_id:
-                self.manager.remove_from_context(item_id)
-                self.refresh_list()
-                try:
-                    self.app.query_one(ModuleTree).refresh_all_labels()
-                except:
-                    pass
+        item_id = self.highlighted_item
+        if item_id:
+            self.manager.remove_from_context(item_id)
+            self.refresh_list()
+            try:
+                self.app.query_one(ModuleTree).refresh_all_labels()
+            except:
+                pass
 
 class InfoPanel(RichLog):
     def __init__(self, manager: ModuleManager):
@@ -79,6 +122,12 @@ class InfoPanel(RichLog):
                     self.write("\n[yellow]Dependencies:[/]")
                     for dep in mod.requires:
                         self.write(f"  - {dep}")
+                    indirect = self.manager.deps.closure(mod.id) - set(mod.requires)
+                    if indirect:
+                        self.write(f"[dim]  + {', '.join(sorted(indirect))}[/]")
+                required_by = self.manager.deps.reverse.get(mod.id)
+                if required_by:
+                    self.write(f"\n[yellow]Required by:[/] {', '.join(sorted(required_by))}")
                 if mod.variants:
                     v_list = list(mod.variants.keys()) if isinstance(mod.variants, dict) else mod.variants
                     self.write(f"\n[cyan]Variants:[/ ] {', '.join(v_list)}")
@@ -98,8 +147,11 @@ class ModuleTree(Tree):
         super().__init__("Root")
         self.manager = manager
         self.node_map = {}
+        # item key -> (node, display name, checked state currently shown)
+        self.key_nodes = {}
         self.show_root = False
         self.filter_text = ""
+        self.scores = None
 
     def on_mount(self):
         self.rebuild_tree()
@@ -108,6 +160,7 @@ class ModuleTree(Tree):
         self.filter_text = filter_text.lower()
         self.clear()
         self.node_map.clear()
+        self.key_nodes.clear()
         self.root.expand()
         
         self._build_presets()
@@ -115,48 +168,16 @@ class ModuleTree(Tree):
 
     def _build_presets(self):
         presets_node = self.root.add("📂 Presets", expand=True)
-        
-        if not self.manager.presets_dir.exists():
-            return
-            
-        for preset_file in self.manager.presets_dir.glob("*.json"):
-            try:
-                name = preset_file.stem
-                if self.filter_text and self.filter_text not in name.lower():
-                    continue
-                
-                # Calculate if preset is active (all modules selected)
-                is_active = False
-                try:
-                    data = json.loads(preset_file.read_text(encoding='utf-8'))
-                    modules = data.get("modules", [])
-                    if modules:
-                        all_selected = True
-                        for entry in modules:
-                            # Derive key same as ModuleManager.load_preset
-                            if isinstance(entry, str):
-                                mod_id = entry
-                                version = ""
-                            else:
-                                mod_id = entry.get("id")
-                                version = entry.get("params", {}).get("version", "")
-                            
-                            key = f"{mod_id}:{version}" if version else mod_id
-                            
-                            # Check if this module is selected
-                            if not self.manager.context_items.get(key):
-                                all_selected = False
-                                break
-                        is_active = all_selected
-                except:
-                    pass
-
-                mark = "[green]✓[/]" if is_active else "[dim]□[/]"
-                label = f"{mark} {name}"
-                node = presets_node.add_leaf(label)
-                self.node_map[str(node._id)] = f"preset:{preset_file.name}"
-            except:
-                pass
+
+        for preset in self.manager.presets.all():
+            if self.filter_text and self.filter_text not in preset.name.lower():
+                continue
+
+            is_active = self.manager.is_preset_active(preset.path)
+            node = presets_node.add_leaf(self._format_label(preset.name, is_active))
+            key = f"preset:{preset.file_name}"
+            self.node_map[str(node._id)] = key
+            self.key_nodes[key] = (node, preset.name, is_active)
 
     def _build_modules(self):
         modules_root = self.root.add("📦 Modules", expand=True)
@@ -166,13 +187,17 @@ class ModuleTree(Tree):
              # Fallback if no categories.json
              pass
 
-        sorted_cats = sorted(categories.items(), key=lambda x: x[1].get("order", 999))
-        
-        for cat_key, cat_data in sorted_cats:
+        # module id -> relevance, or None when not filtering
+        self.scores = self.manager.search(self.filter_text) if self.filter_text else None
+        rank = lambda mod_id: -self.scores.get(mod_id, 0) if self.scores else 0
+
+        built = []
+        for cat_key, cat_data in categories.items():
             cat_name = cat_data.get("name", cat_key)
             cat_match = self.filter_text in cat_name.lower()
             
             children = []
+            best = 0
             
             # Subcategories
             if "subcategories" in cat_data:
@@ -184,33 +209,40 @@ class ModuleTree(Tree):
                     for mod_id in sub_data.get("modules", []):
                         if self._check_filter(mod_id, cat_match or sub_match):
                             mod_nodes.append(mod_id)
+                    mod_nodes.sort(key=rank)
                             
                     if sub_match or mod_nodes:
                         children.append(("sub", sub_name, mod_nodes))
+                        best = min([best] + [rank(m) for m in mod_nodes[:1]])
             
             # Modules
             if "modules" in cat_data:
-                for mod_id in cat_data.get("modules", []):
-                    if self._check_filter(mod_id, cat_match):
-                        children.append(("mod", mod_id))
+                mods = [m for m in cat_data.get("modules", []) if self._check_filter(m, cat_match)]
+                mods.sort(key=rank)
+                children.extend(("mod", mod_id) for mod_id in mods)
+                best = min([best] + [rank(m) for m in mods[:1]])
             
             if children or cat_match:
-                cat_node = modules_root.add(cat_name, expand=True)
-                for child in children:
-                    if child[0] == "sub":
-                        _, sub_name, mods = child
-                        sub_node = cat_node.add(sub_name, expand=True)
-                        for m in mods:
-                            self._add_mod_node(sub_node, m)
-                    else:
-                        _, mod_id = child
-                        self._add_mod_node(cat_node, mod_id)
+                built.append((best, cat_data.get("order", 999), cat_name, children))
+
+        # Best-matching category first while filtering, configured order otherwise
+        built.sort(key=lambda x: (x[0], x[1]))
+        for _, _, cat_name, children in built:
+            cat_node = modules_root.add(cat_name, expand=True)
+            for child in children:
+                if child[0] == "sub":
+                    _, sub_name, mods = child
+                    sub_node = cat_node.add(sub_name, expand=True)
+                    for m in mods:
+                        self._add_mod_node(sub_node, m)
+                else:
+                    _, mod_id = child
+                    self._add_mod_node(cat_node, mod_id)
 
     def _check_filter(self, mod_id, force_include):
-        mod = self.manager.get_module(mod_id)
-        if not mod: return False
-        if force_include: return True
-        return (self.filter_text in mod.name.lower()) or (self.filter_text in mod.id.lower())
+        if mod_id not in self.manager.modules: return False
+        if force_include or self.scores is None: return True
+        return mod_id in self.scores
 
     def _add_mod_node(self, parent, mod_id):
         mod = self.manager.get_module(mod_id)
@@ -220,31 +252,39 @@ class ModuleTree(Tree):
             mod_node = parent.add(f"📦 {mod.name}", expand=bool(self.filter_text))
             variants = list(mod.variants.keys()) if isinstance(mod.variants, dict) else mod.variants
             for v in variants:
-                key = f"{mod.id}:{v}"
-                label = self._get_label(key, v)
-                node = mod_node.add_leaf(label)
-                self.node_map[str(node._id)] = key
+                self._add_item_leaf(mod_node, f"{mod.id}:{v}", v)
         else:
-            label = self._get_label(mod_id, mod.name)
-            node = parent.add_leaf(label)
-            self.node_map[str(node._id)] = mod_id
+            self._add_item_leaf(parent, mod_id, mod.name)
 
-    def _get_label(self, key, name):
+    def _add_item_leaf(self, parent, key, name):
+        checked = self._is_checked(key)
+        node = parent.add_leaf(self._format_label(name, checked))
+        self.node_map[str(node._id)] = key
+        self.key_nodes[key] = (node, name, checked)
+
+    def _is_checked(self, key):
         selected = self.manager.context_items.get(key)
         if selected is None:
             selected = key in self.manager.selected
-        
-        mark = "[green]✓[/]" if selected else "[dim]□[/]"
-        # If explicitly set to False in context (removed), show different?
-        # For now simple check
+        return bool(selected)
+
+    def _format_label(self, name, checked):
+        mark = "[green]✓[/]" if checked else "[dim]□[/]"
         return f"{mark} {name}"
 
     def refresh_all_labels(self):
-        # Textual Tree doesn't easily support updating all labels without walking
-        # Rebuilding might be easier or just walk visible
-        # For performance, we can just rebuild or smart update. 
-        # Rebuild is safest for now.
-        self.rebuild_tree(self.filter_text)
+        """
+        Re-label only the nodes whose checked state changed. The tree is
+        left in place, so expand/collapse state and cursor are kept.
+        """
+        for key, (node, name, shown) in self.key_nodes.items():
+            if key.startswith("preset:"):
+                checked = self.manager.is_preset_active(self.manager.presets_dir / key.split(":", 1)[1])
+            else:
+                checked = self._is_checked(key)
+            if checked != shown:
+                node.set_label(self._format_label(name, checked))
+                self.key_nodes[key] = (node, name, checked)
 
     def action_toggle_select(self):
         node = self.cursor_node
@@ -252,28 +292,16 @@ class ModuleTree(Tree):
             item_id = self.node_map[str(node._id)]
             
             if item_id.startswith("preset:"):
-                # node.label returns a Text object, str(node.label) returns plain text without markup
-                current_text = str(node.label)
-                is_checked = "✓" in current_text
-                
-                preset_name = item_id.split(":", 1)[1]
-                # We use the stem (filename without extension) for display usually, 
-                # but let's just use the name from the label to be safe or re-derive it.
-                display_name = preset_name.replace(".json", "")
-                
-                preset_path = self.manager.presets_dir / preset_name
+                _, display_name, is_checked = self.key_nodes[item_id]
+                preset_path = self.manager.presets_dir / item_id.split(":", 1)[1]
                 
                 if is_checked:
                     # Unload (Uncheck)
                     self.manager.unload_preset(preset_path)
-                    # Re-apply full markup
-                    node.set_label(f"[dim]□[/] {display_name}")
                     self.app.notify(f"Unloaded preset: {display_name}")
                 else:
                     # Load (Check)
                     self.manager.load_preset(preset_path, clear_selection=False)
-                    # Re-apply full markup
-                    node.set_label(f"[green]✓[/] {display_name}")
                     self.app.notify(f"Loaded preset: {display_name}")
                 
                 self.refresh_all_labels()
@@ -290,6 +318,105 @@ class ModuleTree(Tree):
             if not item_id.startswith("preset:"):
                 self.app.query_one(InfoPanel).update_info(item_id)
 
+class InstallScreen(Screen):
+    """
+    Runs the install plan inside the TUI. Each module gets its own log,
+    shown for the module highlighted in the queue on the left.
+    """
+    BINDINGS = [
+        Binding("s", "skip", "Skip", show=True),
+        Binding("c", "cancel", "Cancel All", show=True),
+        Binding("escape", "close", "Back", show=True),
+    ]
+
+    STATE_ICONS = {
+        engine.QUEUED: "[dim]·[/]",
+        engine.RUNNING: "[yellow]▶[/]",
+        engine.DONE: "[green]✓[/]",
+        engine.FAILED: "[red]✗[/]",
+        engine.SKIPPED: "[dim]↷[/]",
+        engine.CANCELLED: "[dim]■[/]",
+    }
+
+    def __init__(self, manager: ModuleManager, items, jobs=1, dry_run=False, prefetch=0, force=False, in_process=False):
+        super().__init__()
+        self.manager = manager
+        self.items = list(items)
+        self.dry_run = dry_run
+        self.finished = False
+        self.log_ids = {item: f"log-{i}" for i, item in enumerate(self.items)}
+        self.engine = engine.InstallEngine(
+            manager, self.items, jobs=jobs, dry_run=dry_run, prefetch=prefetch, force=force, in_process=in_process,
+            on_state=self._on_state, on_output=self._on_output,
+        )
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Label(self._status_text(), id="install-status")
+        with Horizontal(id="install-main"):
+            yield OptionList(
+                *(Option(self._row(item), id=item) for item in self.items),
+                id="install-queue",
+            )
+            with ContentSwitcher(id="install-logs", initial=self.log_ids[self.items[0]] if self.items else None):
+                for item in self.items:
+                    yield RichLog(id=self.log_ids[item], markup=False, wrap=True)
+        yield Footer()
+
+    def on_mount(self):
+        self.query_one("#install-queue").focus()
+        self.run_worker(self._run(), exclusive=True)
+
+    async def _run(self):
+        await self.engine.run()
+        self.finished = True
+        self.query_one("#install-status", Label).update(self._status_text())
+        failed = sum(1 for state in self.engine.states.values() if state == engine.FAILED)
+        self.app.notify(
+            "Installation finished" if not failed else f"Installation finished with {failed} failure(s)",
+            severity="information" if not failed else "error",
+        )
+
+    def _row(self, item):
+        state = self.engine.states.get(item, engine.QUEUED)
+        return f"{self.STATE_ICONS[state]} {item} [dim]{state}[/]"
+
+    def _status_text(self):
+        counts = {}
+        for state in self.engine.states.values():
+            counts[state] = counts.get(state, 0) + 1
+        mode = "Dry Run" if self.dry_run else "Install"
+        summary = ", ".join(f"{n} {state}" for state, n in counts.items())
+        suffix = " — press Esc to go back" if self.finished else ""
+        return f"[bold]{mode}:[/] {summary}{suffix}"
+
+    def _on_state(self, item, state):
+        self.query_one("#install-queue", OptionList).replace_option_prompt(item, self._row(item))
+        self.query_one("#install-status", Label).update(self._status_text())
+
+    def _on_output(self, item, line):
+        self.query_one(f"#{self.log_ids[item]}", RichLog).write(line)
+
+    def on_option_list_option_highlighted(self, event: OptionList.OptionHighlighted):
+        if event.option_list.id == "install-queue" and event.option.id in self.log_ids:
+            self.query_one(ContentSwitcher).current = self.log_ids[event.option.id]
+
+    def action_skip(self):
+        queue = self.query_one("#install-queue", OptionList)
+        if queue.highlighted is not None:
+            self.engine.skip(queue.get_option_at_index(queue.highlighted).id)
+
+    def action_cancel(self):
+        if not self.finished:
+            self.engine.cancel()
+            self.app.notify("Cancelling installation...", severity="warning")
+
+    def action_close(self):
+        if not self.finished:
+            self.app.notify("Installation is running. Press c to cancel first.", severity="warning")
+            return
+        self.app.pop_screen()
+
 class SetupApp(App):
     CSS = """
     Screen {
@@ -327,6 +454,22 @@ class SetupApp(App):
         height: 40%;
         border-top: solid $primary;
     }
+    #install-status {
+        height: 1;
+        padding: 0 1;
+    }
+    #install-main {
+        height: 1fr;
+    }
+    #install-queue {
+        width: 40%;
+        height: 100%;
+        border-right: solid $primary;
+    }
+    #install-logs {
+        width: 60%;
+        height: 100%;
+    }
     """
 
     BINDINGS = [
@@ -336,9 +479,17 @@ class SetupApp(App):
         ("/", "focus_search", "Search"),
     ]
 
-    def __init__(self, manager):
+    # Seconds to wait after the last keystroke before filtering the tree
+    SEARCH_DEBOUNCE = 0.15
+
+    def __init__(self, manager, jobs=1, prefetch=0, force=False, in_process=False):
         super().__init__()
         self.manager = manager
+        self.jobs = jobs
+        self.prefetch = prefetch
+        self.force = force
+        self.in_process = in_process
+        self._search_timer = None
 
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
@@ -359,7 +510,24 @@ class SetupApp(App):
 
     def on_input_changed(self, event: Input.Changed):
         if event.input.id == "search-box":
-            self.query_one(ModuleTree).rebuild_tree(event.value)
+            # Debounce: only rebuild once typing pauses
+            if self._search_timer:
+                self._search_timer.stop()
+            self._search_timer = self.set_timer(
+                self.SEARCH_DEBOUNCE, lambda: self._apply_search(event.value)
+            )
+
+    def on_input_submitted(self, event: Input.Submitted):
+        if event.input.id == "search-box":
+            if self._search_timer:
+                self._search_timer.stop()
+            self._apply_search(event.value)
+
+    def _apply_search(self, value):
+        self._search_timer = None
+        tree = self.query_one(ModuleTree)
+        if value.lower() != tree.filter_text:
+            tree.rebuild_tree(value)
 
     def action_focus_search(self):
         self.query_one("#search-box").focus()
@@ -368,11 +536,13 @@ class SetupApp(App):
         if not self.manager.selected:
             self.notify("No modules selected!", severity="warning")
             return
-        self.exit(result=("execute", self.manager.resolve_dependencies()))
+        self.push_screen(InstallScreen(self.manager, self.manager.resolve_dependencies(), jobs=self.jobs, prefetch=self.prefetch,
+                                      force=self.force, in_process=self.in_process))
 
     def action_dry_run(self):
         if not self.manager.selected:
             self.notify("No modules selected!", severity="warning")
             return
-        self.exit(result=("dry-run", self.manager.resolve_dependencies()))
+        self.push_screen(InstallScreen(self.manager, self.manager.resolve_dependencies(), jobs=self.jobs, dry_run=True,
+                                      in_process=self.in_process))
 
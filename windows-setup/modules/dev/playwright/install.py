@@ -1,11 +1,10 @@
 import sys
 import os
 import json
-import subprocess
 
 # Path hack to find core
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
-from core import logger, system
+from core import logger, system, proc
 
 def install():
     # 1. Check prerequisites
@@ -17,12 +16,12 @@ def install():
 
     # 2. Install Playwright CLI
     try:
-        result = subprocess.run(["dotnet", "tool", "list", "--global"], capture_output=True, text=True)
+        result = proc.run(["dotnet", "tool", "list", "--global"], capture_output=True, text=True)
         if "microsoft.playwright.cli" in result.stdout.lower():
             logger.success("Playwright CLI already installed.")
         else:
             logger.info("Installing Playwright CLI...")
-            subprocess.run(["dotnet", "tool", "install", "--global", "Microsoft.Playwright.CLI"], check=True)
+            proc.run(["dotnet", "tool", "install", "--global", "Microsoft.Playwright.CLI"], check=True)
             logger.success("Playwright CLI installed.")
     except Exception as e:
         logger.error(f"Failed to check/install Playwright CLI: {e}")
@@ -67,10 +66,13 @@ def install():
         if os.path.exists(tool_path):
              cmd = [tool_path, "install"]
         
-        subprocess.run(cmd, check=True)
+        proc.run(cmd, check=True)
         logger.success("Playwright browsers installed.")
     except Exception as e:
         logger.error(f"Failed to install browsers: {e}")
+        return False
+    return True
 
 if __name__ == "__main__":
-    install()
+    # Only an explicit success counts; the run journals exit status 0 as installed
+    sys.exit(0 if install() is True else 1)
@@ -1,40 +1,50 @@
 import sys
 import os
-import urllib.request
-import subprocess
+import json
 import tempfile
 import shutil
 
 # Path hack to find core
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
-from core import logger, system
+from core import logger, system, cache, proc
 
-def install():
+def install(variant=None, dry_run=False):
     if system.is_installed("rustc"):
         logger.success("Rust is already installed.")
-        return
+        return True
 
     logger.info("Installing Rust...")
     url = "https://static.rust-lang.org/rustup/dist/x86_64-pc-windows-msvc/rustup-init.exe"
+    meta_path = os.path.join(os.path.dirname(__file__), "meta.json")
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            url = json.load(f).get("downloadUrl", url)
+    except Exception:
+        pass
+
+    if dry_run:
+        logger.dry_run(f"Download {url} and run rustup-init.exe -y")
+        return True
     
     # Use standard temp dir
-    fd, tmp_path = tempfile.mkstemp(suffix=".exe")
-    os.close(fd)
+    tmp_dir = tempfile.mkdtemp()
     
     try:
-        logger.info(f"Downloading {url}...")
-        urllib.request.urlretrieve(url, tmp_path)
+        # rustup-init updates itself and fetches the latest toolchain, so any cached copy will do
+        installer = cache.get_cache().fetch("dev.rust", "latest", url, tmp_dir)
         
         logger.info("Running rustup-init.exe...")
         # -y for no prompts
-        subprocess.run([tmp_path, "-y"], check=True)
+        proc.run([installer, "-y"], check=True)
         
         logger.success("Rust installed successfully.")
+        return True
     except Exception as e:
         logger.error(f"Failed to install Rust: {e}")
+        return False
     finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
 if __name__ == "__main__":
-    install()
+    # Only an explicit success counts; the run journals exit status 0 as installed
+    sys.exit(0 if install() is True else 1)
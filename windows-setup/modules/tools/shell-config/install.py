@@ -1,22 +1,24 @@
 import sys
 import os
-import subprocess
 
 # Path hack to find core
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
-from core import logger, system
+from core import logger, system, pwsh
+
+def install(variant=None, dry_run=False):
+    if dry_run:
+        logger.dry_run("Write PowerShell profile ($PROFILE)")
+        return True
 
-def install():
     logger.info("Configuring PowerShell Profile...")
     
     try:
         # Get Profile Path
-        cmd = ["pwsh", "-NoProfile", "-Command", "echo $PROFILE"]
-        profile_path = subprocess.check_output(cmd, text=True).strip()
+        profile_path = pwsh.get_session().profile_path()
         
         if not profile_path:
             logger.error("Could not determine $PROFILE path.")
-            return
+            return False
 
         profile_dir = os.path.dirname(profile_path)
         if not os.path.exists(profile_dir):
@@ -53,9 +55,12 @@ Set-Alias l ls
             f.write(content)
             
         logger.success(f"Updated PowerShell profile: {profile_path}")
+        return True
 
     except Exception as e:
         logger.error(f"Failed to configure shell: {e}")
+        return False
 
 if __name__ == "__main__":
-    install()
+    # Only an explicit success counts; the run journals exit status 0 as installed
+    sys.exit(0 if install() is True else 1)
@@ -4,10 +4,13 @@ Windows Development Environment Setup
 Modular installation system for Windows development tools
 """
 
+import time
+_STARTED = time.perf_counter()
+
 import os
 import sys
-import subprocess
 import argparse
+import functools
 from pathlib import Path
 
 # Add windows-setup to path for imports
@@ -15,52 +18,113 @@ SCRIPT_DIR = Path(__file__).parent.resolve()
 WINDOWS_SETUP_DIR = SCRIPT_DIR.parent
 sys.path.insert(0, str(WINDOWS_SETUP_DIR))
 
-from core import logger, module
+from core import logger, module, package_manager, profiler, trace
+profiler.mark("import core", since=_STARTED)
+
+@functools.lru_cache(maxsize=None)
+def textual_available():
+    # Spec lookup only; the real import happens when the TUI is started
+    import importlib.util
+    return importlib.util.find_spec("textual") is not None
 
 def ensure_textual():
-    try:
-        import textual
+    if textual_available():
         return True
-    except ImportError:
-        pass
         
     print("Installing textual library for TUI...")
+    import subprocess
+    import importlib
     try:
         subprocess.run([sys.executable, "-m", "pip", "install", "textual"], check=True)
+        importlib.invalidate_caches()
+        textual_available.cache_clear()
         print("Textual installed successfully.")
         return True
     except Exception as e:
         print(f"Failed to install textual: {e}")
         return False
 
-def load_preset(preset_path: Path) -> list:
-    """Load module list from preset file"""
-    import json
-    try:
-        with open(preset_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data.get("modules", [])
-    except Exception as e:
-        logger.error(f"Failed to load preset: {e}")
-        return []
+def run_installation(manager: module.ModuleManager, modules_list: list, jobs: int = 1,
+                     prefetch: int = 0, force: bool = False, in_process: bool = False):
+    """Execute installation for given modules, running independent ones in parallel"""
+    from core import scheduler, journal, progress, system, detect
+    logger.section("Installation Mode: Execute")
 
-def run_installation(manager: module.ModuleManager, modules_list: list, dry_run: bool = False):
-    """Execute installation for given modules"""
-    mode = "Dry Run" if dry_run else "Execute"
-    logger.section(f"Installation Mode: {mode}")
-    
-    for item in modules_list:
-        mod_id = item.split(":")[0]
-        variant = item.split(":")[1] if ":" in item else None
-        
+    install_journal = journal.InstallJournal.for_manager(manager)
+    completed = set() if force else install_journal.completed(manager, modules_list)
+    if completed:
+        # Resume: modules finished by an earlier run with an unchanged definition
+        logger.info(f"Skipping {len(completed)} modules completed in a previous run (use --force to reinstall)")
+        modules_list = [item for item in modules_list if item not in completed]
+
+    def install(item):
+        mod_id, variant = scheduler.split_item(item)
         mod = manager.get_module(mod_id)
-        if mod:
-            try:
-                mod.install(variant=variant, dry_run=dry_run)
-            except Exception as e:
-                logger.error(f"Failed {mod_id}: {e}")
-        else:
-            logger.warning(f"Module not found: {mod_id}")
+        if not mod:
+            logger.warn(f"Module not found: {mod_id}")
+            return False
+        started = time.perf_counter()
+        display.add(item, mod.name + (f" {variant}" if variant else ""))
+        ok = False
+        try:
+            with logger.context(item):
+                ok = mod.install(variant=variant, in_process=in_process)
+        finally:
+            # Apply env changes of the installer script here, so dependents inherit them
+            env_tx.absorb(env_queue)
+            display.finish(item, ok)
+        # Written to the registry before the journal calls the module done, so a resumed run keeps them
+        env_tx.commit(broadcast=False)
+        install_journal.record(item, mod, ok, time.perf_counter() - started)
+        return ok
+
+    if manager.winget_packages(modules_list, skip_installed=False):
+        # One source refresh per run; every later winget call finds it fresh
+        package_manager.refresh_winget_sources()
+    # One winget snapshot up front lets satisfied modules skip winget entirely
+    package_manager.load_winget_inventory()
+    package_manager.load_ps_module_inventory(manager.ps_modules(modules_list))
+    if prefetch:
+        # Download every planned winget package in the background while installs proceed
+        package_manager.start_prefetch(manager.winget_packages(modules_list), prefetch)
+
+    plan = scheduler.Scheduler(manager, modules_list, jobs=jobs)
+    # One progress row per running install
+    display = progress.ProgressRenderer().start()
+    started = time.perf_counter()
+    try:
+        # Env/PATH changes are committed per module as each one finishes, and broadcast once at the end
+        with system.transaction() as env_tx:
+            env_queue = os.environ[system.ENV_QUEUE_VAR]
+            results = plan.run(install)
+    finally:
+        display.close()
+        package_manager.stop_prefetch()
+        package_manager.end_source_refresh()
+        # Whatever ran may have changed; the next status scan probes it again
+        detect.forget(manager, modules_list)
+    wall_seconds = time.perf_counter() - started
+
+    failed = [item for item, state in results.items() if state == scheduler.FAILED]
+    skipped = [item for item, state in results.items() if state == scheduler.SKIPPED]
+    done = len(results) - len(failed) - len(skipped)
+    summary = f"Done: {done} succeeded, {len(failed)} failed, {len(skipped)} skipped"
+    if completed:
+        summary += f", {len(completed)} already done"
+    logger.section(summary)
+    for item in failed:
+        logger.error(f"Failed: {item}")
+    for item in skipped:
+        logger.warn(f"Skipped: {item}")
+    trace.report(plan.graph, wall_seconds)
+    return results
+
+def write_trace(path):
+    try:
+        trace.write_chrome_trace(path)
+        logger.info(f"Trace written to {path}")
+    except OSError as e:
+        logger.error(f"Could not write trace {path}: {e}")
 
 def main():
     parser = argparse.ArgumentParser(
@@ -75,30 +139,109 @@ Examples:
   # Install with preset
         .\\omss.ps1 -Preset fullstack-dev -Execute
 
-  # Dry run with preset
+  # Dry run with preset: what would be installed, upgraded or skipped, and an ETA
         .\\omss.ps1 -Preset node-dev -DryRun
+        .\\omss.ps1 -Preset node-dev -DryRun -Jobs 4 -Format json
 
   # Install specific modules
         .\\omss.ps1 -Modules dev.git,dev.nodejs -Execute
+
+  # Install a preset, 4 independent modules at a time
+        .\\omss.ps1 -Preset fullstack-dev -Execute -Jobs 4
+
+  # Bundle a preset for machines without internet access, then install from it
+        .\\omss.ps1 -Preset fullstack-dev -ExportBundle fullstack.zip
+        .\\omss.ps1 -FromBundle \\\\share\\fullstack.zip -Execute
+
+  # Show what is installed, and which version
+        .\\omss.ps1 -Status
+
+  # Show the installer cache
+        .\\omss.ps1 -Cache stats
         """
     )
     
     parser.add_argument("--preset", "-p", help="Preset name or path to preset JSON file")
     parser.add_argument("--modules", "-m", help="Comma-separated module IDs (e.g., dev.git,dev.nodejs)")
-    parser.add_argument("--execute", "--run", action="store_true", help="Run installation immediately")
-    parser.add_argument("--dry-run", action="store_true", help="Simulate installation without making changes")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--execute", "--run", action="store_true", help="Run installation immediately")
+    mode.add_argument("--dry-run", action="store_true",
+                      help="Show what a run would install, upgrade or skip and how long it would take, without making changes")
+    parser.add_argument("--format", choices=["text", "json"], default="text",
+                        help="Output format of the --dry-run plan")
     parser.add_argument("--no-gui", action="store_true", help="Run in CLI mode (requires --preset or --modules)")
+    parser.add_argument("--rebuild-index", action="store_true", help="Ignore the cached module catalog index and rescan modules/")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Number of modules to install in parallel (default: 1)")
+    parser.add_argument("--prefetch", type=int, default=0, metavar="N",
+                        help="Download winget packages N at a time ahead of installing them (default: off)")
+    parser.add_argument("--force", action="store_true",
+                        help="Reinstall modules the install journal records as completed")
+    parser.add_argument("--in-process", action="store_true",
+                        help='Run install.py of modules marked "inProcess" inside this process instead of a new interpreter')
+    parser.add_argument("--export-bundle", metavar="OUT",
+                        help="Write the resolved plan, its module scripts and installers to an offline bundle (.zip)")
+    parser.add_argument("--from-bundle", metavar="BUNDLE",
+                        help="Install from an offline bundle made with --export-bundle")
+    parser.add_argument("--status", action="store_true",
+                        help="Show what is installed (and which version) for the selection, or the whole catalog, then exit")
+    parser.add_argument("--cache", choices=["stats", "prune"],
+                        help="Show the installer cache or evict it down to its size limit, then exit")
+    parser.add_argument("--log-level", choices=list(logger.LEVELS),
+                        help="Minimum level to log (default: logLevel in config/settings.json)")
+    parser.add_argument("--log-format", choices=["text", "json"], default="text",
+                        help="Console output as colored text or JSON lines")
+    parser.add_argument("--log-dir", help="Also write run.jsonl and one log file per module under this directory")
+    parser.add_argument("--trace", metavar="OUT",
+                        help="Write per-module and per-step timings as a Chrome trace (open in chrome://tracing or Perfetto)")
+    parser.add_argument("--profile-startup", action="store_true", help="Report time spent in each startup phase")
+    parser.add_argument("--record", metavar="FILE",
+                        help="Record every external command (command, exit code, output, duration) to a JSONL file")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Serve external commands from a --record file instead of running them")
+    parser.add_argument("--replay-scale", type=float, default=1.0,
+                        help="Multiply replayed durations by this factor (0: no waiting; default: 1)")
     
     args = parser.parse_args()
+    profiler.mark("parse arguments")
+    # A JSON plan owns stdout; log records still go to --log-dir
+    json_plan = args.dry_run and args.format == "json"
+    logger.configure(level=args.log_level, fmt=args.log_format, log_dir=args.log_dir,
+                     console=False if json_plan else None)
+
+    if args.record or args.replay:
+        from core import proc, system
+        proc.configure(record=args.record, replay=args.replay, scale=args.replay_scale)
+        if args.replay:
+            # Nothing real is installed, so keep environment changes off the registry too
+            system.set_backend(system.MemoryBackend())
+            logger.info(f"Replaying commands from {args.replay} (durations x{args.replay_scale:g})")
+
+    if args.cache:
+        from core import cache
+        if args.cache == "stats":
+            cache.print_stats()
+        else:
+            cache.prune()
+        return
     
     # root_dir is windows-setup directory
     root_dir = WINDOWS_SETUP_DIR
-    manager = module.ModuleManager(root_dir)
+    bundle_manifest = None
+    if args.from_bundle:
+        from core import bundle
+        try:
+            # The bundle carries its own modules/ and config/
+            root_dir, bundle_manifest = bundle.open_bundle(args.from_bundle)
+        except Exception as e:
+            logger.error(f"Could not open bundle {args.from_bundle}: {e}")
+            sys.exit(1)
+    # The journal and status cache stay in the local config/, so bundle runs can resume too
+    manager = module.ModuleManager(root_dir, rebuild_index=args.rebuild_index,
+                                   state_dir=WINDOWS_SETUP_DIR / "config")
+    profiler.mark("load catalog")
     
     # CLI Mode (no GUI)
-    if args.no_gui or args.preset or args.modules:
-        modules_to_install = []
-        
+    if args.no_gui or args.preset or args.modules or bundle_manifest or args.status:
         # Load from preset
         if args.preset:
             preset_name = args.preset
@@ -115,7 +258,7 @@ Examples:
                 preset_path = presets_dir / preset_name
             
             if preset_path and preset_path.exists():
-                modules_to_install = load_preset(preset_path)
+                manager.load_preset(preset_path)
                 logger.info(f"Loaded preset: {preset_path.name}")
             else:
                 logger.error(f"Preset not found: {args.preset}")
@@ -123,43 +266,80 @@ Examples:
         
         # Load from module list
         elif args.modules:
-            modules_to_install = [m.strip() for m in args.modules.split(',')]
-            logger.info(f"Loading modules: {', '.join(modules_to_install)}")
+            requested = [m.strip() for m in args.modules.split(',') if m.strip()]
+            for item in requested:
+                if item not in manager.selected:
+                    manager.toggle(item)
+            logger.info(f"Loading modules: {', '.join(requested)}")
+
+        # Selection recorded in the bundle
+        elif bundle_manifest:
+            for item in bundle_manifest["selected"]:
+                if item not in manager.selected:
+                    manager.toggle(item)
         
-        else:
+        elif not args.status:
             logger.error("--no-gui requires either --preset or --modules")
             parser.print_help()
             sys.exit(1)
         
+        # Selected modules plus everything they require, dependencies first
+        modules_to_install = manager.resolve_dependencies()
+        profiler.mark("load selection")
+        if args.profile_startup:
+            profiler.report()
+
+        if args.status:
+            from core import detect
+            # Without a selection, report on every module in the catalog
+            detect.print_status(manager, modules_to_install or sorted(manager.modules))
+            return
+
+        if args.export_bundle:
+            from core import bundle
+            bundle.export_bundle(manager, modules_to_install, args.export_bundle, concurrency=args.prefetch or 4)
+            return
+
+        if args.dry_run:
+            from core import planner
+            plan = planner.build_plan(manager, modules_to_install, jobs=args.jobs, force=args.force)
+            planner.print_plan(plan, args.format)
+            return
+
         # Determine execution mode
         if args.execute:
-            run_installation(manager, modules_to_install, dry_run=False)
-        elif args.dry_run:
-            run_installation(manager, modules_to_install, dry_run=True)
+            try:
+                run_installation(manager, modules_to_install, jobs=args.jobs,
+                                 prefetch=args.prefetch, force=args.force, in_process=args.in_process)
+            finally:
+                if args.trace:
+                    write_trace(args.trace)
         else:
             # Just list modules
             logger.info("Modules to install (use --execute or --dry-run):")
             for mod in modules_to_install:
-                print(f"  - {mod}")
+                note = "" if mod in manager.selected else " (dependency)"
+                logger.console(f"  - {mod}{note}")
         
         return
     
     # TUI Mode (default)
     if not ensure_textual():
         sys.exit(1)
+    profiler.mark("probe textual")
         
     # Import TUI after installation check
     from core.tui import SetupApp
+    profiler.mark("import tui")
     
-    app = SetupApp(manager)
-    result = app.run()
-    
-    if result:
-        mode, install_list = result
-        
-        # Execute
-        dry_run = (mode == "dry-run")
-        run_installation(manager, install_list, dry_run=dry_run)
+    app = SetupApp(manager, jobs=args.jobs, prefetch=args.prefetch, force=args.force, in_process=args.in_process)
+    profiler.mark("create app")
+    if args.profile_startup:
+        profiler.report()
+    # Installation runs inside the TUI (see core.tui.InstallScreen)
+    app.run()
+    if args.trace:
+        write_trace(args.trace)
 
 if __name__ == "__main__":
     main()
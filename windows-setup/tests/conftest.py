@@ -0,0 +1,29 @@
+import sys
+import json
+from pathlib import Path
+import pytest
+
+# Tests import core.* the way omss/windows-setup.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+@pytest.fixture
+def make_root(tmp_path):
+    """
+    Write a windows-setup tree under tmp_path and return its root:
+    modules maps module id -> extra meta.json fields, presets maps preset
+    name -> module list.
+    """
+    def make(modules, presets=None):
+        root = tmp_path / "root"
+        for mod_id, meta in modules.items():
+            category, _, name = mod_id.partition(".")
+            mod_dir = root / "modules" / category / name
+            mod_dir.mkdir(parents=True, exist_ok=True)
+            meta = {"id": mod_id, "name": name, "category": category, **meta}
+            (mod_dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        (root / "config").mkdir(parents=True, exist_ok=True)
+        (root / "presets").mkdir(parents=True, exist_ok=True)
+        for name, items in (presets or {}).items():
+            (root / "presets" / f"{name}.json").write_text(json.dumps({"name": name, "modules": items}), encoding="utf-8")
+        return root
+    return make
@@ -0,0 +1,59 @@
+import json
+import zipfile
+import pytest
+from core import bundle, cache, package_manager
+from core.module import ModuleManager
+
+@pytest.fixture
+def exported(tmp_path, make_root, monkeypatch):
+    monkeypatch.setattr(cache, "_cache", cache.ArtifactCache(tmp_path / "cache"))
+    monkeypatch.setattr(package_manager, "_local_packages", {})
+    monkeypatch.delenv(package_manager.OFFLINE_VAR, raising=False)
+    installer = tmp_path / "rustup-init.exe"
+    installer.write_bytes(b"rustup")
+    root = make_root({
+        "dev.rust": {"downloadUrl": installer.as_uri(), "network": "Rust toolchain"},
+        "tools.icons": {"installMethod": "psmodule", "psModule": "Terminal-Icons", "requires": ["dev.rust"]},
+    })
+    (root / "modules" / "dev" / "rust" / "install.py").write_text("print('hi')\n", encoding="utf-8")
+    manager = ModuleManager(root)
+    manager.toggle("tools.icons")
+    out = bundle.export_bundle(manager, manager.resolve_dependencies(), tmp_path / "out")
+    # open_bundle marks the process offline; monkeypatch restores it
+    monkeypatch.setenv(package_manager.OFFLINE_VAR, "")
+    return out
+
+def test_export_lists_what_still_needs_the_network(exported):
+    assert exported.name == "out.zip"
+    with zipfile.ZipFile(exported) as archive:
+        manifest = json.loads(archive.read(bundle.MANIFEST))
+        assert set(archive.namelist()) == set(manifest["files"]) | {bundle.MANIFEST}
+    assert manifest["plan"] == ["dev.rust", "tools.icons"]
+    assert manifest["online"] == {
+        "dev.rust": "Rust toolchain",
+        "tools.icons": "PowerShell Gallery module Terminal-Icons",
+    }
+    assert manifest["artifacts"] == [{"id": "dev.rust", "version": "latest",
+                                      "path": "artifacts/dev.rust@latest/rustup-init.exe"}]
+
+def test_open_verifies_and_seeds_the_cache(exported, tmp_path):
+    cache._cache = cache.ArtifactCache(tmp_path / "other-cache")
+    root, manifest = bundle.open_bundle(exported)
+    assert (root / "modules" / "dev" / "rust" / "install.py").exists()
+    assert cache.get_cache().lookup("dev.rust", "latest")
+    assert package_manager.os.environ[package_manager.OFFLINE_VAR] == "1"
+
+def test_open_rejects_files_missing_from_the_manifest(exported):
+    with zipfile.ZipFile(exported, "a") as archive:
+        archive.writestr("modules/dev/rust/extra.py", "import os\n")
+    with pytest.raises(ValueError, match="not listed"):
+        bundle.open_bundle(exported)
+
+def test_open_rejects_changed_files(exported, tmp_path):
+    tampered = tmp_path / "tampered.zip"
+    with zipfile.ZipFile(exported) as src, zipfile.ZipFile(tampered, "w") as dst:
+        for name in src.namelist():
+            data = src.read(name)
+            dst.writestr(name, b"print('evil')\n" if name.endswith("install.py") else data)
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        bundle.open_bundle(tampered)
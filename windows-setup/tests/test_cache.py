@@ -0,0 +1,75 @@
+import os
+import time
+from core import cache
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+def test_parse_and_format_sizes():
+    assert cache.parse_size("20GB") == 20 * 1024 ** 3
+    assert cache.parse_size("1.5 MB") == int(1.5 * 1024 ** 2)
+    assert cache.parse_size(512) == 512
+    assert cache.format_size(2048) == "2.0 KB"
+
+def test_store_and_materialize_dedupes_blobs(tmp_path):
+    store = cache.ArtifactCache(tmp_path / "cache")
+    installer = write(tmp_path / "dl" / "setup.exe", b"payload")
+    store.store("Git.Git", "2.44.0", [installer])
+    store.store("Git.Git", "2.45.0", [installer])
+
+    stats = store.stats()
+    assert (stats["entries"], stats["blobs"], stats["bytes"], stats["logical_bytes"]) == (2, 1, 7, 14)
+    paths = store.materialize("git.git", "2.44.0", tmp_path / "out")
+    assert [os.path.basename(p) for p in paths] == ["setup.exe"]
+    assert open(paths[0], "rb").read() == b"payload"
+    assert store.materialize("Git.Git", "9.9", tmp_path / "out2") is None
+
+def test_lru_entries_are_evicted_past_the_limit(tmp_path):
+    store = cache.ArtifactCache(tmp_path / "cache", max_bytes=10)
+    store.store("a", "1", [write(tmp_path / "a" / "a.exe", b"aaaa")])
+    store.store("b", "1", [write(tmp_path / "b" / "b.exe", b"bbbb")])
+    time.sleep(0.01)
+    assert store.lookup("a", "1")  # a is now the most recently used
+    store.store("c", "1", [write(tmp_path / "c" / "c.exe", b"cccc")])
+
+    assert set(store.stats()["packages"]) == {"a@1", "c@1"}
+    blobs = {p.name for p in (tmp_path / "cache" / "objects").glob("*/*")}
+    assert blobs == {cache.file_sha256(tmp_path / "a" / "a.exe"), cache.file_sha256(tmp_path / "c" / "c.exe")}
+
+def test_corrupt_blobs_are_discarded_on_lookup(tmp_path):
+    store = cache.ArtifactCache(tmp_path / "cache")
+    installer = write(tmp_path / "dl" / "setup.exe", b"payload")
+    store.store("pkg", "1", [installer])
+    blob = store._blob(cache.file_sha256(installer))
+    blob.write_bytes(b"tampered")
+
+    assert store.lookup("pkg", "1") is None
+    assert not blob.exists()
+    assert store.stats()["entries"] == 0
+
+def test_store_leaves_unindexed_blobs_to_prune(tmp_path):
+    store = cache.ArtifactCache(tmp_path / "cache")
+    # Written by another process that has not indexed it yet, and one left long ago
+    fresh = write(tmp_path / "cache" / "objects" / "ab" / ("ab" + "0" * 62), b"fresh")
+    stale = write(tmp_path / "cache" / "objects" / "cd" / ("cd" + "0" * 62), b"stale")
+    old = time.time() - cache.ORPHAN_GRACE - 60
+    os.utime(stale, (old, old))
+
+    store.store("pkg", "1", [write(tmp_path / "dl" / "setup.exe", b"payload")])
+    assert fresh.exists() and stale.exists()
+
+    assert store.prune() == []
+    assert fresh.exists()
+    assert not stale.exists()
+    assert store.lookup("pkg", "1")
+
+def test_prune_evicts_down_to_the_given_size(tmp_path):
+    store = cache.ArtifactCache(tmp_path / "cache")
+    store.store("a", "1", [write(tmp_path / "a" / "a.exe", b"aaaa")])
+    time.sleep(0.01)
+    store.store("b", "1", [write(tmp_path / "b" / "b.exe", b"bbbb")])
+    assert store.prune(max_bytes=4) == ["a@1"]
+    assert store.stats()["packages"] == ["b@1"]
+    assert len(list((tmp_path / "cache" / "objects").glob("*/*"))) == 1
@@ -0,0 +1,62 @@
+import os
+import json
+from core import catalog
+
+def write_meta(root, rel, meta):
+    mod_dir = root / "modules" / rel
+    mod_dir.mkdir(parents=True, exist_ok=True)
+    (mod_dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    return mod_dir / "meta.json"
+
+def test_warm_scan_reuses_the_index_without_parsing(tmp_path, monkeypatch):
+    write_meta(tmp_path, "dev/git", {"id": "dev.git"})
+    write_meta(tmp_path, "gui/chrome", {"id": "gui.chrome"})
+    index_file = tmp_path / "config" / "index.json"
+    cold = catalog.scan(tmp_path / "modules", index_file)
+    assert [meta["id"] for _, meta in cold] == ["dev.git", "gui.chrome"]
+    assert index_file.exists()
+
+    parsed = []
+    loads = json.loads
+    monkeypatch.setattr(catalog.json, "loads", lambda text: parsed.append(text) or loads(text))
+    monkeypatch.setattr(catalog, "_write_index", lambda *args: parsed.append("index written"))
+    assert catalog.scan(tmp_path / "modules", index_file) == cold
+    # Only the index itself is read
+    assert len(parsed) == 1
+
+def test_changed_and_new_modules_are_picked_up(tmp_path):
+    meta_file = write_meta(tmp_path, "dev/git", {"id": "dev.git", "name": "Git"})
+    index_file = tmp_path / "index.json"
+    catalog.scan(tmp_path / "modules", index_file)
+
+    meta_file.write_text(json.dumps({"id": "dev.git", "name": "Git for Windows"}), encoding="utf-8")
+    # Same size would be possible; a new mtime alone must be enough
+    st = os.stat(meta_file)
+    os.utime(meta_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    write_meta(tmp_path, "dev/rust", {"id": "dev.rust"})
+
+    metas = {meta["id"]: meta for _, meta in catalog.scan(tmp_path / "modules", index_file)}
+    assert metas["dev.git"]["name"] == "Git for Windows"
+    assert "dev.rust" in metas
+
+def test_rebuild_and_stale_versions_ignore_the_index(tmp_path):
+    write_meta(tmp_path, "dev/git", {"id": "dev.git"})
+    index_file = tmp_path / "index.json"
+    catalog.scan(tmp_path / "modules", index_file)
+    data = json.loads(index_file.read_text(encoding="utf-8"))
+    data["files"]["dev/git/meta.json"][2] = {"id": "stale"}
+    index_file.write_text(json.dumps(data), encoding="utf-8")
+    assert catalog.scan(tmp_path / "modules", index_file)[0][1]["id"] == "stale"
+    assert catalog.scan(tmp_path / "modules", index_file, rebuild=True)[0][1]["id"] == "dev.git"
+
+    data["version"] = catalog.INDEX_VERSION + 1
+    data["files"]["dev/git/meta.json"][2] = {"id": "stale"}
+    index_file.write_text(json.dumps(data), encoding="utf-8")
+    assert catalog.scan(tmp_path / "modules", index_file)[0][1]["id"] == "dev.git"
+
+def test_broken_meta_is_reported_every_scan(tmp_path):
+    meta_file = write_meta(tmp_path, "dev/git", {"id": "dev.git"})
+    meta_file.write_text("{", encoding="utf-8")
+    index_file = tmp_path / "index.json"
+    assert catalog.scan(tmp_path / "modules", index_file)[0][1] == {}
+    assert "dev/git/meta.json" not in json.loads(index_file.read_text(encoding="utf-8"))["files"]
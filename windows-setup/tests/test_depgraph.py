@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+from core import depgraph
+
+def index(requires):
+    return depgraph.DependencyIndex({mod_id: SimpleNamespace(requires=deps) for mod_id, deps in requires.items()})
+
+def test_closure_is_transitive_and_ignores_variants():
+    deps = index({"a": ["b:21"], "b": ["c"], "c": [], "d": []})
+    assert deps.closure("a") == {"b", "c"}
+    assert deps.closure("a:1") == {"b", "c"}
+    assert deps.closure("c") == frozenset()
+    assert deps.closure("missing") == frozenset()
+
+def test_rank_puts_dependencies_first():
+    deps = index({"top": ["mid", "other"], "mid": ["base"], "base": [], "other": []})
+    assert deps.rank("base") < deps.rank("mid") < deps.rank("top")
+    assert deps.rank("other") < deps.rank("top")
+
+def test_cycles_share_one_closure():
+    deps = index({"x": ["y"], "y": ["z"], "z": ["x"], "w": ["x"]})
+    assert deps.cycles == [["x", "y", "z"]]
+    assert deps.closure("x") == {"y", "z"}
+    assert deps.closure("w") == {"x", "y", "z"}
+    assert deps.component["x"] == deps.component["y"] == deps.component["z"]
+
+def test_requirements_outside_the_catalog_become_nodes():
+    deps = index({"a": ["external", "a"]})
+    assert deps.forward == {"a": ["external"], "external": []}
+    assert deps.reverse["external"] == {"a"}
+    assert deps.closure("a") == {"external"}
+
+def test_selection_keeps_dependency_counts_incrementally(make_root):
+    from core.module import ModuleManager
+    manager = ModuleManager(make_root({
+        "dev.base": {}, "dev.mid": {"requires": ["dev.base"]}, "dev.top": {"requires": ["dev.mid"]},
+    }))
+    manager.toggle("dev.top")
+    assert manager.resolve_dependencies() == ["dev.base", "dev.mid", "dev.top"]
+    manager.toggle("dev.mid")
+    manager.toggle("dev.top")
+    assert manager.resolve_dependencies() == ["dev.base", "dev.mid"]
+    manager.toggle("dev.mid")
+    assert manager.resolve_dependencies() == []
@@ -0,0 +1,54 @@
+import sys
+import pytest
+from core import detect, package_manager
+from core.module import ModuleManager
+
+@pytest.fixture
+def manager(make_root, monkeypatch):
+    for var in (package_manager.OFFLINE_VAR, "OMSS_RECORD", "OMSS_REPLAY"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(package_manager, "_winget_inventory", None)
+    return ModuleManager(make_root({
+        "gui.chrome": {"installMethod": "winget", "wingetId": "Google.Chrome"},
+        "dev.git": {"installMethod": "winget", "wingetId": "Git.Git"},
+        "dev.python": {"detect": {"version": [sys.executable, "--version"], "regex": r"Python (3\.\d+)"}},
+        "dev.missing": {"detect": {"command": "omss-no-such-command"}},
+        "dev.manual": {},
+    }))
+
+def export(monkeypatch, packages):
+    def fake_run(cmd, step, cat, outputs=(), **kwargs):
+        if packages is None:
+            raise OSError("winget not found")
+        with open(outputs[0], "w", encoding="utf-8") as f:
+            f.write('{"Sources": [{"Packages": [%s]}]}' % ",".join(
+                '{"PackageIdentifier": "%s", "Version": "1.0"}' % p for p in packages))
+    monkeypatch.setattr(package_manager, "_run", fake_run)
+
+def test_scan_reports_probes_and_the_winget_snapshot(manager, monkeypatch):
+    export(monkeypatch, ["Git.Git"])
+    status = detect.scan(manager, ["gui.chrome", "dev.git", "dev.python", "dev.missing", "dev.manual"])
+    assert status["gui.chrome"] == {"installed": False, "version": None, "source": "winget"}
+    assert status["dev.git"] == {"installed": True, "version": "1.0", "source": "winget"}
+    assert status["dev.python"] == {"installed": True, "version": f"3.{sys.version_info.minor}", "source": "detect"}
+    assert status["dev.missing"]["installed"] is False
+    assert status["dev.manual"] == {"installed": None, "version": None, "source": None}
+
+def test_failed_winget_export_leaves_winget_modules_unknown(manager, monkeypatch):
+    export(monkeypatch, None)
+    status = detect.scan(manager, ["gui.chrome", "dev.python"])
+    assert status["gui.chrome"] == {"installed": None, "version": None, "source": "winget"}
+    assert status["dev.python"]["installed"] is True
+
+    # Not cached: the next scan asks winget again
+    monkeypatch.setattr(package_manager, "_winget_inventory", None)
+    export(monkeypatch, ["Google.Chrome"])
+    assert detect.scan(manager, ["gui.chrome"])["gui.chrome"]["installed"] is True
+
+def test_status_is_cached_until_the_detect_spec_changes(manager, monkeypatch):
+    export(monkeypatch, [])
+    assert detect.scan(manager, ["gui.chrome"])["gui.chrome"]["installed"] is False
+    export(monkeypatch, ["Google.Chrome"])
+    monkeypatch.setattr(package_manager, "_winget_inventory", None)
+    assert detect.scan(manager, ["gui.chrome"])["gui.chrome"]["installed"] is False
+    assert detect.scan(manager, ["gui.chrome"], use_cache=False)["gui.chrome"]["installed"] is True
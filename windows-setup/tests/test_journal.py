@@ -0,0 +1,52 @@
+import json
+from core import journal
+from core.module import ModuleManager
+
+def setup(make_root):
+    manager = ModuleManager(make_root({"dev.git": {}, "dev.java": {}, "dev.rust": {}}))
+    return manager, journal.InstallJournal.for_manager(manager)
+
+def test_only_explicit_successes_count_as_completed(make_root):
+    manager, install_journal = setup(make_root)
+    install_journal.record("dev.git", manager.get_module("dev.git"), True, 1.0)
+    install_journal.record("dev.java:21", manager.get_module("dev.java"), None, 1.0)
+    install_journal.record("dev.rust", manager.get_module("dev.rust"), False, 1.0)
+    items = ["dev.git", "dev.java:21", "dev.rust"]
+    assert install_journal.completed(manager, items) == {"dev.git"}
+
+    # A new journal object reads the same state back from disk
+    reread = journal.InstallJournal.for_manager(manager)
+    assert reread.completed(manager, items) == {"dev.git"}
+    assert reread.last("dev.java:21")["ok"] is False
+
+def test_a_later_failure_or_changed_definition_reruns_the_module(make_root):
+    manager, install_journal = setup(make_root)
+    git, rust = manager.get_module("dev.git"), manager.get_module("dev.rust")
+    install_journal.record("dev.git", git, True, 1.0)
+    install_journal.record("dev.rust", rust, True, 1.0)
+    install_journal.record("dev.git", git, False, 1.0)
+    rust.meta_path.write_text(json.dumps({"id": "dev.rust", "name": "Rust 2"}), encoding="utf-8")
+    assert install_journal.completed(manager, ["dev.git", "dev.rust"]) == set()
+
+def test_a_torn_last_line_is_skipped_and_appended_past(make_root):
+    manager, install_journal = setup(make_root)
+    install_journal.record("dev.git", manager.get_module("dev.git"), True, 1.0)
+    with open(install_journal.path, "a", encoding="utf-8") as f:
+        f.write('{"item": "dev.rust", "ok')
+
+    resumed = journal.InstallJournal.for_manager(manager)
+    assert resumed.completed(manager, ["dev.git", "dev.rust"]) == {"dev.git"}
+    resumed.record("dev.rust", manager.get_module("dev.rust"), True, 2.0)
+    again = journal.InstallJournal.for_manager(manager)
+    assert again.completed(manager, ["dev.git", "dev.rust"]) == {"dev.git", "dev.rust"}
+
+def test_long_journals_are_compacted_to_the_latest_records(make_root):
+    manager, install_journal = setup(make_root)
+    git = manager.get_module("dev.git")
+    for i in range(journal.COMPACT_RATIO * 2 + 1):
+        install_journal.record("dev.git", git, True, float(i))
+
+    journal.InstallJournal.for_manager(manager).last("dev.git")
+    lines = install_journal.path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["seconds"] == float(journal.COMPACT_RATIO * 2)
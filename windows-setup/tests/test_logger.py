@@ -0,0 +1,63 @@
+import json
+import pytest
+from core import logger
+
+@pytest.fixture(autouse=True)
+def fresh_logger(monkeypatch):
+    monkeypatch.setattr(logger, "_level", logger.LEVELS["info"])
+    monkeypatch.setattr(logger, "_format", "text")
+    monkeypatch.setattr(logger, "_console", True)
+    monkeypatch.setattr(logger, "_sink", None)
+    monkeypatch.setattr(logger, "_live", None)
+    monkeypatch.setattr(logger, "_env_checked", True)
+    for var in ("OMSS_LOG_LEVEL", "OMSS_LOG_FORMAT", "OMSS_LOG_DIR", "OMSS_LOG_MODULE"):
+        monkeypatch.delenv(var, raising=False)
+    yield
+    logger.shutdown()
+
+def test_records_below_the_level_are_dropped(capsys):
+    logger.configure(level="warn")
+    logger.info("hidden")
+    logger.debug("hidden too")
+    logger.warn("shown")
+    logger.error("also shown")
+    out = capsys.readouterr().out
+    assert "hidden" not in out
+    assert "shown" in out and "also shown" in out
+    with pytest.raises(ValueError):
+        logger.configure(level="verbose")
+
+def test_json_format_keeps_stdout_to_json_records(capsys):
+    logger.configure(fmt="json")
+    with logger.context("dev.git"):
+        logger.success("Installed Git")
+    logger.console("  ✔ dev.git  2.44.0")
+    captured = capsys.readouterr()
+    records = [json.loads(line) for line in captured.out.splitlines()]
+    assert [(r["level"], r["msg"], r.get("module")) for r in records] == [("success", "Installed Git", "dev.git")]
+    assert "dev.git  2.44.0" in captured.err
+
+def test_file_sink_writes_run_and_module_logs(tmp_path, capsys):
+    logger.configure(log_dir=tmp_path, console=False)
+    run_dir = logger._sink.dir
+    with logger.context("dev.rust"):
+        logger.info("Installing Rust")
+    logger.output("dev.rust", f"{logger.GREEN}rustup installed{logger.RESET}")
+    logger.warn("No module here")
+    logger.shutdown()
+
+    assert capsys.readouterr().out == ""
+    records = [json.loads(line) for line in open(f"{run_dir}/run.jsonl", encoding="utf-8")]
+    assert [r["msg"] for r in records] == ["Installing Rust", "rustup installed", "No module here"]
+    assert records[1]["event"] == "output"
+    module_log = open(f"{run_dir}/dev.rust.log", encoding="utf-8").read().splitlines()
+    assert len(module_log) == 2
+    assert module_log[0].endswith("INFO    Installing Rust")
+    assert module_log[1].endswith("INFO    rustup installed")
+
+def test_child_sinks_leave_module_logs_to_the_parent(tmp_path):
+    sink = logger.FileSink(str(tmp_path), run_log="run-1.jsonl", module_logs=False)
+    sink.put({"time": "t", "level": "info", "msg": "from a child", "module": "dev.git"})
+    sink.close()
+    assert (tmp_path / "run-1.jsonl").exists()
+    assert not (tmp_path / "dev.git.log").exists()
@@ -0,0 +1,73 @@
+import os
+import sys
+import pytest
+from core import package_manager
+
+needs_shebang = pytest.mark.skipif(os.name == "nt", reason="the fake winget is a script with a shebang")
+
+FAKE_WINGET = """#!{python}
+import sys, json
+args = sys.argv[1:]
+with open({calls!r}, "a") as f:
+    f.write(" ".join(args) + "\\n")
+if args[0] == "export":
+    packages = [{{"PackageIdentifier": "Git.Git", "Version": "2.44.0"}}, {{"PackageIdentifier": "Google.Chrome"}}]
+    with open(args[args.index("-o") + 1], "w") as f:
+        json.dump({{"Sources": [{{"Packages": packages}}]}}, f)
+    # winget exits non-zero when some packages have no source; the file is still written
+    sys.exit(1)
+"""
+
+@pytest.fixture
+def fake_winget(tmp_path, monkeypatch):
+    calls = tmp_path / "calls"
+    winget = tmp_path / "winget"
+    winget.write_text(FAKE_WINGET.format(python=sys.executable, calls=str(calls)), encoding="utf-8")
+    winget.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ.get("PATH", ""))
+    for var in (package_manager.OFFLINE_VAR, "OMSS_RECORD", "OMSS_REPLAY"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(package_manager, "_winget_inventory", None)
+    return calls
+
+@needs_shebang
+def test_inventory_is_parsed_from_one_winget_export(fake_winget):
+    inventory = package_manager.load_winget_inventory()
+    assert inventory == {"git.git": "2.44.0", "google.chrome": ""}
+    assert package_manager.get_winget_version("Git.Git") == "2.44.0"
+    assert package_manager.get_winget_version("Google.Chrome") == ""
+    assert package_manager.get_winget_version("Missing.Package") is None
+
+    calls = fake_winget.read_text().splitlines()
+    assert len(calls) == 1
+    assert calls[0].startswith("export ") and "--source winget" in calls[0]
+
+@needs_shebang
+def test_offline_runs_skip_the_export(fake_winget, monkeypatch):
+    monkeypatch.setenv(package_manager.OFFLINE_VAR, "1")
+    assert package_manager.load_winget_inventory() == {}
+    assert not fake_winget.exists()
+
+def test_ps_module_command_quotes_its_arguments():
+    script = package_manager.ps_module_install_command("It's; Remove-Item", scope="AllUsers")[-1]
+    assert "-Name 'It''s; Remove-Item'" in script
+    assert "-Scope 'AllUsers'" in script
+    assert "Write-Output 'PS Module It''s; Remove-Item is already installed.'" in script
+
+@needs_shebang
+def test_source_refresh_runs_once_per_run(fake_winget, tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    monkeypatch.delenv(package_manager.SOURCE_REFRESHED_VAR, raising=False)
+    package_manager.refresh_winget_sources(ttl=0)
+    package_manager.refresh_winget_sources(ttl=0)
+    assert len(fake_winget.read_text().splitlines()) == 1
+
+    # The next run checks again: within the TTL the stamp skips the update, past it the update runs
+    package_manager.end_source_refresh()
+    assert package_manager.SOURCE_REFRESHED_VAR not in os.environ
+    package_manager.refresh_winget_sources(ttl=3600)
+    package_manager.end_source_refresh()
+    package_manager.refresh_winget_sources(ttl=0)
+    package_manager.end_source_refresh()
+    calls = fake_winget.read_text().splitlines()
+    assert calls == ["source update --name winget --disable-interactivity"] * 2
@@ -0,0 +1,68 @@
+import pytest
+from core import planner, journal, detect, package_manager
+from core.module import ModuleManager
+
+UNKNOWN = {"installed": None, "version": None, "source": None}
+
+@pytest.fixture
+def manager(make_root, monkeypatch):
+    monkeypatch.delenv(package_manager.OFFLINE_VAR, raising=False)
+    return ModuleManager(make_root({
+        "a.base": {},
+        "a.mid": {"requires": ["a.base"]},
+        "a.top": {"requires": ["a.mid"]},
+        "a.other": {},
+        "gui.chrome": {"installMethod": "winget", "wingetId": "Google.Chrome"},
+    }))
+
+def scanned(monkeypatch, status):
+    monkeypatch.setattr(detect, "scan", lambda manager, items, use_cache=True:
+                        {item: status.get(item, UNKNOWN) for item in items})
+
+def record(manager, seconds):
+    install_journal = journal.InstallJournal.for_manager(manager)
+    for item, value in seconds.items():
+        install_journal.record(item, manager.get_module(item), True, value)
+
+def by_item(plan):
+    return {e["item"]: e for e in plan["items"]}
+
+def test_eta_simulates_the_dependency_graph_on_the_given_jobs(manager, monkeypatch):
+    scanned(monkeypatch, {})
+    record(manager, {"a.base": 10, "a.mid": 20, "a.top": 5, "a.other": 30})
+    items = ["a.base", "a.other", "a.mid", "a.top"]
+
+    plan = planner.build_plan(manager, items, jobs=2, force=True)
+    assert {e["action"] for e in plan["items"]} == {planner.UPGRADE}
+    assert plan["summary"]["eta_seconds"] == 35.0  # base -> mid -> top, other alongside
+    assert plan["summary"]["serial_seconds"] == 65.0
+    assert planner.build_plan(manager, items, jobs=1, force=True)["summary"]["eta_seconds"] == 65.0
+    assert by_item(plan)["a.top"]["depth"] == 2
+
+    # Without --force the journal marks them all done
+    plan = planner.build_plan(manager, items, jobs=2)
+    assert plan["summary"][planner.SKIP] == 4 and plan["summary"]["eta_seconds"] == 0.0
+
+def test_modules_without_history_are_estimated_from_the_median(manager, monkeypatch):
+    scanned(monkeypatch, {})
+    record(manager, {"a.base": 10, "a.mid": 30})
+    plan = planner.build_plan(manager, ["a.base", "a.mid", "a.other"], jobs=1, force=True)
+    assert by_item(plan)["a.other"]["estimate"] is None
+    assert plan["summary"]["without_history"] == 1
+    assert plan["summary"]["serial_seconds"] == 60.0
+
+def test_outdated_winget_packages_are_upgrades(manager, monkeypatch):
+    scanned(monkeypatch, {"gui.chrome": {"installed": True, "version": "120.0.6099.71", "source": "winget"}})
+    monkeypatch.setattr(package_manager, "winget_available_version", lambda package_id: "121.0.6167.85")
+    entry = by_item(planner.build_plan(manager, ["gui.chrome"]))["gui.chrome"]
+    assert entry["action"] == planner.UPGRADE
+    assert entry["reason"] == "120.0.6099.71 installed, 121.0.6167.85 available"
+
+    monkeypatch.setattr(package_manager, "winget_available_version", lambda package_id: "120.0.6099.71")
+    assert by_item(planner.build_plan(manager, ["gui.chrome"]))["gui.chrome"]["action"] == planner.SKIP
+
+def test_unknown_status_is_not_reported_as_missing(manager, monkeypatch):
+    scanned(monkeypatch, {"gui.chrome": {"installed": None, "version": None, "source": "winget"}})
+    entry = by_item(planner.build_plan(manager, ["gui.chrome"]))["gui.chrome"]
+    assert entry["action"] == planner.INSTALL
+    assert entry["reason"].startswith("status unknown")
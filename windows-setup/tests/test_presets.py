@@ -0,0 +1,71 @@
+import os
+import json
+from core import presets
+from core.module import ModuleManager
+
+def write_preset(path, modules):
+    path.write_text(json.dumps({"name": path.stem, "modules": modules}), encoding="utf-8")
+
+def test_entries_accept_ids_and_versioned_objects():
+    assert presets.entry_key("dev.git") == ("dev.git", True)
+    assert presets.entry_key({"id": "dev.java", "params": {"version": "21"}}) == ("dev.java:21", True)
+    assert presets.entry_key({"id": "dev.java", "params": {"selected": False}}) == ("dev.java", False)
+
+def test_presets_are_parsed_once_until_they_change(tmp_path):
+    write_preset(tmp_path / "one.json", ["dev.git", {"id": "dev.java", "params": {"version": "21"}}])
+    write_preset(tmp_path / "two.json", ["dev.git"])
+    store = presets.PresetStore(tmp_path)
+    first = store.all()
+    assert [p.name for p in first] == ["one", "two"]
+    assert set(store.containing("dev.git")) == {str(tmp_path / "one.json"), str(tmp_path / "two.json")}
+    generation = store.generation
+
+    assert store.all() == first
+    assert store.generation == generation
+
+    path = tmp_path / "two.json"
+    write_preset(path, ["dev.java:21", "gui.chrome"])
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert store.get(path).keys == {"dev.java:21", "gui.chrome"}
+    assert store.generation > generation
+    assert set(store.containing("dev.git")) == {str(tmp_path / "one.json")}
+    assert set(store.containing("dev.java:21")) == {str(tmp_path / "one.json"), str(path)}
+
+def test_a_directory_scan_builds_the_key_map_once(tmp_path, monkeypatch):
+    for i in range(20):
+        write_preset(tmp_path / f"p{i:02}.json", [f"dev.m{i}"])
+    store = presets.PresetStore(tmp_path)
+    builds = []
+    by_key = presets.PresetStore.containing
+
+    def counting(self, key):
+        if self._by_key is None:
+            builds.append(key)
+        return by_key(self, key)
+    monkeypatch.setattr(presets.PresetStore, "containing", counting)
+
+    store.all()
+    assert store.containing("dev.m3") == {str(tmp_path / "p03.json")}
+    assert store.containing("dev.m4") == {str(tmp_path / "p04.json")}
+    assert len(builds) == 1
+
+def test_preset_activity_follows_the_selection(make_root):
+    root = make_root({"dev.git": {}, "dev.rust": {}, "gui.chrome": {}},
+                     presets={"base": ["dev.git", "dev.rust"], "gui": ["gui.chrome"]})
+    manager = ModuleManager(root)
+    base = root / "presets" / "base.json"
+    manager.presets.all()
+    assert not manager.is_preset_active(base)
+
+    manager.load_preset(base)
+    assert manager.is_preset_active(base)
+    assert not manager.is_preset_active(root / "presets" / "gui.json")
+
+    manager.toggle("dev.rust")
+    assert not manager.is_preset_active(base)
+    manager.toggle("dev.rust")
+    assert manager.is_preset_active(base)
+
+    manager.unload_preset(base)
+    assert manager.selected == set()
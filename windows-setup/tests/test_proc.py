@@ -0,0 +1,69 @@
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+import pytest
+from core import proc
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for var in (proc.RECORD_VAR, proc.REPLAY_VAR, proc.SCALE_VAR):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(proc, "_recordings", {})
+    monkeypatch.setattr(proc, "_served", {})
+
+def test_key_drops_machine_specific_parts():
+    tmp = tempfile.gettempdir()
+    assert proc.key([r"C:\Python311\python3.11.EXE", "-V"]) == ["python", "-V"]
+    assert proc.key("winget show --id Git.Git") == ["winget", "show", "--id", "Git.Git"]
+    assert proc.key(["winget", "export", "-o", os.path.join(tmp, "omss-winget-a1b2", "installed.json")]) == \
+        ["winget", "export", "-o", "<tmp>/installed.json"]
+    assert proc.key(["pwsh", "-File", os.path.join(proc.ROOT_DIR, "modules", "dev", "git", "install.ps1")]) == \
+        ["pwsh", "-File", "<root>/modules/dev/git/install.ps1"]
+
+def test_recorded_calls_replay_in_order_with_their_outputs(tmp_path, monkeypatch):
+    recording = tmp_path / "calls.jsonl"
+    # Appends a line to the file it is given and prints how many it holds
+    script = "import sys; f = open(sys.argv[1], 'a+'); f.write('x'); f.seek(0); print(len(f.read()))"
+    out_dir = tempfile.mkdtemp()
+    other_dir = os.path.join(tempfile.gettempdir(), "omss-elsewhere")
+    try:
+        out_file = os.path.join(out_dir, "out.txt")
+        proc.configure(record=str(recording))
+        for n in (1, 2):
+            result = proc.run([sys.executable, "-c", script, out_file], outputs=[out_file],
+                              capture_output=True, text=True)
+            assert result.stdout == f"{n}\n"
+        lines = []
+        assert proc.stream([sys.executable, "-c", "print('a'); print('b')"], lines.append) == 0
+        assert lines == ["a", "b"]
+
+        monkeypatch.delenv(proc.RECORD_VAR)
+        proc.configure(replay=str(recording), scale=0)
+        # Only the key matters: another interpreter path and temp directory still match
+        other_file = os.path.join(other_dir, "out.txt")
+        os.makedirs(other_dir)
+        served = [proc.run(["python", "-c", script, other_file], outputs=[other_file],
+                           capture_output=True, text=True).stdout for _ in range(3)]
+        assert served == ["1\n", "2\n", "2\n"]
+        with open(other_file, encoding="utf-8") as f:
+            assert f.read() == "xx"
+        assert proc.run(["python", "-c", script, other_file], capture_output=True).stdout == b"2\n"
+
+        lines = []
+        assert proc.stream(["python", "-c", "print('a'); print('b')"], lines.append) == 0
+        assert lines == ["a", "b"]
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        shutil.rmtree(other_dir, ignore_errors=True)
+
+def test_replay_of_an_unrecorded_command_fails_like_a_missing_program(tmp_path):
+    recording = tmp_path / "calls.jsonl"
+    recording.write_text('{"key": ["winget", "--version"], "returncode": 1, "stdout": "", "stderr": "",'
+                         ' "seconds": 0}\n', encoding="utf-8")
+    proc.configure(replay=str(recording), scale=0)
+    with pytest.raises(FileNotFoundError):
+        proc.run(["winget", "list"])
+    with pytest.raises(subprocess.CalledProcessError):
+        proc.run([r"C:\Tools\winget.exe", "--version"], check=True)
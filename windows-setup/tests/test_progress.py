@@ -0,0 +1,38 @@
+import io
+import pytest
+from core import progress, logger
+
+@pytest.mark.parametrize("line, percent", [
+    ("  ██████▒▒▒▒▒▒  45%", 45.0),
+    ("   ▒▒▒▒▒▒▒▒  0.5%", 0.5),
+    ("  ██████████  100%", 100.0),
+    ("  ███▒▒▒▒▒▒▒  2.00 MB / 10.0 MB", 20.0),
+    ("  ██████████  1.00 GB / 1.00 GB", 100.0),
+    ("  512 KB / 1.00 MB", 50.0),
+    ("  -", None),
+    ("Successfully installed", None),
+    ("Downloading https://example.com/setup-45%.exe", None),
+    ("Progress: 45%", None),
+    ("  0 B / 0 B", None),
+])
+def test_parse_percent(line, percent):
+    assert progress.parse_percent(line) == percent
+
+def test_format_elapsed():
+    assert progress.format_elapsed(9.7) == "9s"
+    assert progress.format_elapsed(61) == "1m01s"
+
+def test_progress_frames_update_the_running_task_without_printing(monkeypatch):
+    stream = io.StringIO()
+    printed = []
+    monkeypatch.setattr(logger, "console", printed.append)
+    with progress.ProgressRenderer(stream=stream, interactive=False) as renderer:
+        renderer.add("dev.git", "Git")
+        with logger.context("dev.git"):
+            for line in ("  ███▒▒▒▒▒▒▒  30%", "Found Git [Git.Git]", "  ██████████  80%"):
+                progress.task_output(line)
+        renderer.finish("dev.git")
+    assert printed == ["Found Git [Git.Git]"]
+    lines = stream.getvalue().splitlines()
+    assert lines[:3] == ["▶ Git", "  Git: 25%", "  Git: 75%"]
+    assert lines[3].startswith("✔ Git (")
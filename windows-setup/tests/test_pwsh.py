@@ -0,0 +1,69 @@
+import sys
+import pytest
+from core import pwsh
+
+# Speaks the request/response protocol of pwsh.SERVER_SCRIPT; logs each request
+STUB = """
+import sys, base64
+installed = {{"psreadline"}}
+for request in sys.stdin:
+    with open({requests!r}, "a") as f:
+        f.write(request)
+    request_id, encoded = request.rstrip("\\n").split(" ", 1)
+    script = base64.b64decode(encoded).decode("utf-8")
+    rc = 0
+    if script == "exit":
+        sys.exit(0)
+    elif script.startswith("Get-Module"):
+        for name in script.split(" ")[3].split(","):
+            if name.strip("'").lower() in installed:
+                print(name.strip("'"))
+    elif script.startswith("Install-Module"):
+        name = script.split(" ")[2].strip("'")
+        print("installing " + name)
+        rc = 1 if name == "Broken" else 0
+    else:
+        print("echo: " + script)
+    print("__OMSS_END__ " + request_id + " " + str(rc), flush=True)
+"""
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    for var in ("OMSS_RECORD", "OMSS_REPLAY"):
+        monkeypatch.delenv(var, raising=False)
+    requests = tmp_path / "requests"
+    stub = tmp_path / "stub_pwsh.py"
+    stub.write_text(STUB.format(requests=str(requests)), encoding="utf-8")
+    session = pwsh.PwshSession(cmd=[sys.executable, str(stub)])
+    session.requests = requests
+    yield session
+    session.close()
+
+def test_run_returns_output_and_exit_code(session):
+    lines = []
+    result = session.run("Write-Output 'hi'", on_line=lines.append)
+    assert result.returncode == 0
+    assert result.stdout == "echo: Write-Output 'hi'"
+    assert lines == ["echo: Write-Output 'hi'"]
+
+    result = session.run("Install-Module -Name 'Broken'")
+    assert result.returncode == 1
+    # Both requests went to the same worker process
+    assert len(session.requests.read_text().splitlines()) == 2
+
+def test_available_modules_is_one_batched_query_then_cached(session):
+    assert session.available_modules(["PSReadLine", "Terminal-Icons"]) == {"PSReadLine"}
+    assert session.available_modules(["psreadline", "Terminal-Icons"]) == {"psreadline"}
+    assert len(session.requests.read_text().splitlines()) == 1
+
+    session.mark_available("Terminal-Icons")
+    assert session.available_modules(["Terminal-Icons"]) == {"Terminal-Icons"}
+
+def test_worker_is_restarted_after_it_exits(session):
+    session.run("first")
+    with pytest.raises(OSError):
+        session.run("exit")
+    assert session.run("second").stdout == "echo: second"
+
+    session.close()
+    assert session.run("third").stdout == "echo: third"
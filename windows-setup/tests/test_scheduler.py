@@ -0,0 +1,56 @@
+import threading
+from core import scheduler
+from core.module import ModuleManager
+
+def manager_for(make_root, requires):
+    return ModuleManager(make_root({mod_id: {"requires": deps} for mod_id, deps in requires.items()}))
+
+def test_items_start_after_their_dependencies(make_root):
+    manager = manager_for(make_root, {"a.base": [], "a.mid": ["a.base"], "a.top": ["a.mid"], "a.other": []})
+    items = ["a.base", "a.other", "a.mid", "a.top"]
+    order = []
+    lock = threading.Lock()
+
+    def task(item):
+        with lock:
+            order.append(item)
+        return True
+
+    results = scheduler.Scheduler(manager, items, jobs=4).run(task)
+    assert results == {item: scheduler.SUCCESS for item in items}
+    assert order.index("a.base") < order.index("a.mid") < order.index("a.top")
+
+def test_failure_skips_dependents_but_not_independent_items(make_root):
+    manager = manager_for(make_root, {"a.base": [], "a.mid": ["a.base"], "a.top": ["a.mid"], "a.other": []})
+    results = scheduler.Scheduler(manager, ["a.base", "a.other", "a.mid", "a.top"], jobs=2).run(
+        lambda item: item != "a.base")
+    assert results == {"a.base": scheduler.FAILED, "a.other": scheduler.SUCCESS,
+                       "a.mid": scheduler.SKIPPED, "a.top": scheduler.SKIPPED}
+
+def test_none_counts_as_success_and_exceptions_as_failure(make_root):
+    manager = manager_for(make_root, {"a.one": [], "a.two": ["a.one"], "a.three": []})
+
+    def task(item):
+        if item == "a.three":
+            raise RuntimeError("boom")
+        return None
+
+    results = scheduler.Scheduler(manager, ["a.one", "a.two", "a.three"]).run(task)
+    assert results == {"a.one": scheduler.SUCCESS, "a.two": scheduler.SUCCESS, "a.three": scheduler.FAILED}
+
+def test_cycles_are_broken_in_plan_order(make_root):
+    manager = manager_for(make_root, {"a.x": ["a.y"], "a.y": ["a.x"], "a.z": ["a.y"]})
+    items = ["a.y", "a.x", "a.z"]
+    graph = scheduler.build_graph(manager, items)
+    assert graph == {"a.y": set(), "a.x": {"a.y"}, "a.z": {"a.y"}}
+
+    order = []
+    results = scheduler.Scheduler(manager, items, jobs=1).run(lambda item: order.append(item) or True)
+    assert order == items
+    assert set(results.values()) == {scheduler.SUCCESS}
+
+def test_variants_wait_for_every_planned_variant_of_a_dependency(make_root):
+    manager = manager_for(make_root, {"dev.java": [], "dev.gradle": ["dev.java"]})
+    graph = scheduler.build_graph(manager, ["dev.java:17", "dev.java:21", "dev.gradle"])
+    assert graph["dev.gradle"] == {"dev.java:17", "dev.java:21"}
+    assert graph["dev.java:21"] == set()
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+from core.search import SearchIndex
+
+def module(mod_id, name, description="", category="dev"):
+    return SimpleNamespace(id=mod_id, name=name, description=description, category=category)
+
+MODULES = {m.id: m for m in (
+    module("dev.git", "Git", "분산 버전 관리 시스템"),
+    module("dev.nodejs", "Node.js", "JavaScript 런타임"),
+    module("dev.python", "Python", "파이썬 개발 환경"),
+    module("gui.chrome", "Google Chrome", "웹 브라우저", category="gui"),
+    module("tools.gsudo", "gsudo", "sudo for Windows", category="tools"),
+)}
+
+def test_empty_query_matches_everything():
+    assert SearchIndex(MODULES).search("  ") == {mod_id: 0 for mod_id in MODULES}
+
+def test_exact_and_prefix_hits_outrank_infix_hits():
+    scores = SearchIndex(MODULES).search("git")
+    assert set(scores) == {"dev.git"}
+    index = SearchIndex({m.id: m for m in (
+        module("dev.java", "Java"),
+        module("dev.javascript", "JavaScript tools"),
+        module("dev.ajava", "Ajava"),
+    )})
+    scores = index.search("java")
+    assert scores["dev.java"] > scores["dev.javascript"] > scores["dev.ajava"] > 0
+
+def test_korean_words_are_found_through_bigrams():
+    assert set(SearchIndex(MODULES).search("버전")) == {"dev.git"}
+    assert set(SearchIndex(MODULES).search("브라우저")) == {"gui.chrome"}
+
+def test_every_word_must_match():
+    index = SearchIndex(MODULES)
+    assert set(index.search("python 환경")) == {"dev.python"}
+    assert index.search("python 브라우저") == {}
+
+def test_fuzzy_subsequences_rank_below_substrings():
+    scores = SearchIndex(MODULES).search("ndjs")
+    assert set(scores) == {"dev.nodejs"}
+    assert scores["dev.nodejs"] < 30
+
+def test_category_names_are_searchable():
+    categories = {"gui": {"name": "GUI Apps"}}
+    assert set(SearchIndex(MODULES, categories).search("apps")) == {"gui.chrome"}
+
+def test_scattered_bigrams_still_get_a_fuzzy_score():
+    # Every bigram of "gogle" is in "google chrome", but not as one substring
+    scores = SearchIndex(MODULES).search("gogle")
+    assert set(scores) == {"gui.chrome"}
+    assert scores["gui.chrome"] < 30
@@ -0,0 +1,89 @@
+import json
+import threading
+import pytest
+from core import system
+
+@pytest.fixture(autouse=True)
+def isolated_env(monkeypatch):
+    # Transactions apply their changes to os.environ right away
+    monkeypatch.setenv("PATH", "/usr/bin")
+    monkeypatch.setenv("OMSS_TEST_VAR", "")
+    monkeypatch.delenv(system.ENV_QUEUE_VAR, raising=False)
+
+def test_commit_dedupes_paths_after_normalizing():
+    backend = system.MemoryBackend({"User": {"Path": "C:\\Tools;C:\\Program Files\\Git\\cmd\\"}})
+    tx = system.EnvTransaction(backend)
+    tx.add_path("c:\\tools\\")
+    tx.add_path(r"C:\Program Files\Git\cmd")
+    tx.add_path(r"C:\New")
+    tx.add_path(r"c:\new")
+
+    assert tx.commit() is True
+    assert backend.read("User", "PATH") == r"C:\Tools;C:\Program Files\Git\cmd\;C:\New"
+    assert backend.writes == 1
+    assert backend.broadcasts == 1
+
+def test_commit_writes_only_changes_queued_since_the_last_commit():
+    backend = system.MemoryBackend({"User": {"OMSS_TEST_VAR": "same"}})
+    tx = system.EnvTransaction(backend)
+    tx.set_env("OMSS_TEST_VAR", "same")
+    assert tx.commit() is False
+    assert (backend.writes, backend.broadcasts) == (0, 0)
+
+    tx.set_env("OMSS_TEST_VAR", "new", scope="Machine")
+    assert tx.commit() is True
+    assert tx.commit() is False
+    assert backend.read("Machine", "omss_test_var") == "new"
+    assert (backend.writes, backend.broadcasts) == (1, 1)
+
+def test_absorb_leaves_a_partial_last_line_for_the_next_call(tmp_path):
+    queue_file = tmp_path / "queue.jsonl"
+    first = json.dumps({"op": "set", "name": "OMSS_TEST_VAR", "value": "1", "scope": "User"})
+    second = json.dumps({"op": "path", "path": r"C:\One", "scope": "User"})
+    third = json.dumps({"op": "path", "path": r"C:\Two", "scope": "User"})
+    queue_file.write_text(first + "\n" + second + "\n" + third[:10], encoding="utf-8")
+
+    backend = system.MemoryBackend()
+    tx = system.EnvTransaction(backend)
+    tx.absorb(queue_file)
+    assert tx.paths["User"] == [r"C:\One"]
+
+    with open(queue_file, "a", encoding="utf-8") as f:
+        f.write(third[10:] + "\n")
+    tx.absorb(queue_file)
+    tx.commit()
+    assert backend.read("User", "OMSS_TEST_VAR") == "1"
+    assert backend.read("User", "Path") == r"C:\One;C:\Two"
+
+def test_transaction_commits_changes_queued_by_child_processes():
+    backend = system.MemoryBackend()
+    with system.transaction(backend):
+        queue_file = system.os.environ[system.ENV_QUEUE_VAR]
+        # What an installer script running as a child process appends
+        with open(queue_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "path", "path": r"C:\Child", "scope": "User"}) + "\n")
+    assert backend.read("User", "Path") == r"C:\Child"
+    assert system.ENV_QUEUE_VAR not in system.os.environ
+
+def test_per_module_commits_broadcast_once_at_the_end():
+    backend = system.MemoryBackend()
+    with system.transaction(backend) as tx:
+        for name in ("C:\\A", "C:\\B"):
+            tx.add_path(name)
+            assert tx.commit(broadcast=False) is True
+        assert (backend.writes, backend.broadcasts) == (2, 0)
+    assert backend.broadcasts == 1
+
+def test_concurrent_absorbs_read_each_queued_line_once(tmp_path):
+    queue_file = tmp_path / "queue.jsonl"
+    with open(queue_file, "w", encoding="utf-8") as f:
+        for i in range(200):
+            f.write(json.dumps({"op": "path", "path": f"C:\\P{i}", "scope": "User"}) + "\n")
+
+    tx = system.EnvTransaction(system.MemoryBackend())
+    threads = [threading.Thread(target=tx.absorb, args=(queue_file,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(tx.paths["User"]) == sorted(f"C:\\P{i}" for i in range(200))
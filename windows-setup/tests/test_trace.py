@@ -0,0 +1,61 @@
+import json
+import pytest
+from core import trace, logger
+
+@pytest.fixture(autouse=True)
+def no_spans(monkeypatch):
+    monkeypatch.setattr(trace, "_spans", [])
+
+def add(name, cat, start, end, track="main", **args):
+    trace._spans.append((name, cat, start, end, track, args))
+
+def test_span_records_its_track_and_args():
+    with trace.span("install dev.git", "module", item="dev.git"):
+        pass
+    with trace.span("winget export", "winget", track="dev.git"):
+        pass
+    (name, cat, start, end, track, args), second = trace.spans()
+    assert (name, cat, args) == ("install dev.git", "module", {"item": "dev.git"})
+    assert end >= start and track
+    assert second[4] == "dev.git"
+    assert [s[0] for s in trace.spans("winget")] == ["winget export"]
+
+def test_critical_path_follows_the_longest_dependency_chain():
+    graph = {"a": set(), "b": {"a"}, "c": {"a"}, "d": {"b", "c"}}
+    durations = {"a": 1.0, "b": 5.0, "c": 2.0, "d": 1.0}
+    assert trace.critical_path(graph, durations) == (7.0, ["a", "b", "d"])
+    # A leftover cycle does not loop forever
+    assert trace.critical_path({"x": {"y"}, "y": {"x"}}, {"x": 1.0, "y": 2.0})[0] == 3.0
+
+def test_nested_spans_count_only_their_own_time():
+    add("install dev.git", "module", 0.0, 10.0, item="dev.git")
+    add("wait for msi lock", "installer", 1.0, 9.0)
+    add("installer Git.Git", "installer", 4.0, 9.0)
+    add("winget export", "winget", 9.5, 10.0)
+    # Another thread: not nested, even though the times overlap
+    add("pwsh Install-Module", "pwsh", 2.0, 3.0, track="worker")
+
+    times = trace.self_times()
+    assert times["installer"] == pytest.approx(8.0)
+    assert times["winget"] == pytest.approx(0.5)
+    assert times["pwsh"] == pytest.approx(1.0)
+    assert times["module"] == pytest.approx(1.5)
+    assert trace.module_durations() == {"dev.git": 10.0}
+
+def test_report_and_chrome_trace(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(logger, "_format", "text")
+    add("install a", "module", 0.0, 4.0, item="a")
+    add("install b", "module", 4.0, 6.0, item="b")
+    add("winget install", "winget", 4.5, 5.5)
+    trace.report({"a": set(), "b": {"a"}}, wall_seconds=6.0)
+    out = capsys.readouterr().out
+    assert "Critical path :      6.0 s  a -> b" in out
+    assert "1.0 s  winget" in out
+
+    path = tmp_path / "trace.json"
+    trace.write_chrome_trace(path)
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert [(e["name"], e["dur"]) for e in spans] == [("install a", 4_000_000), ("install b", 2_000_000),
+                                                     ("winget install", 1_000_000)]
+    assert any(e["ph"] == "M" and e["args"] == {"name": "main"} for e in events)